@@ -1,14 +1,30 @@
 import streamlit as st
-from googleapiclient.discovery import build
 import pandas as pd
-from io import BytesIO
-import time
 from googleapiclient.errors import HttpError
-from youtube_transcript_api import YouTubeTranscriptApi, TranscriptsDisabled, NoTranscriptFound
-from openai import OpenAI
 import os
 import re
 
+from utils.concurrency import DEFAULT_MAX_WORKERS, RateLimiter, run_in_pool
+from utils.export import EXCEL_MIME, to_excel_bytes
+from utils.llm import cached_chat_completion, get_openai_client
+from utils.quota import estimate_top_tags, estimate_video_ids
+from utils.seo_schema import SEO_RESPONSE_FORMAT, parse_seo, seo_error
+from utils.tracing import traced
+from utils.ui import IGNORE_QUOTA_LABEL, show_quota_estimate, stop_if_over_quota
+from utils.youtube_handler import (
+    add_transcript_summary,
+    estimate_channel_job,
+    fetch_transcript_result,
+    fetch_transcripts,
+    get_channel_batch_info,
+    get_video_info,
+    get_videos_info,
+    get_youtube,
+    top_tags_for_topic,
+)
+
+SEO_PROMPT_VERSION = "ytapp-seo-v3"
+
 # Page setup
 st.set_page_config(page_title="YouTube Channel Video Exporter", layout="centered")
 st.title("📊 YouTube Channel Video Exporter + SEO Generator + Transcript")
@@ -35,78 +51,31 @@ with st.form(key="form"):
         uploaded_file = st.file_uploader("📄 Upload CSV or TXT with YouTube Video URLs", type=["csv", "txt"])
 
     enable_seo = st.checkbox("✨ Enable SEO Tagging using ChatGPT")
+    force_refresh = st.checkbox("🔄 Force refresh (ignore cached SEO)")
     enable_transcript = st.checkbox("📝 Generate Transcripts")
+    max_workers = st.number_input("⚙️ Max concurrent SEO requests", min_value=1, max_value=32, value=DEFAULT_MAX_WORKERS, step=1)
+    ignore_quota = st.checkbox(IGNORE_QUOTA_LABEL)
     submit = st.form_submit_button("📥 Fetch Video(s)")
 
 # Use provided API key or fallback to secrets
 effective_openai_key = openai_key_input or st.secrets.get("OPENAI_API_KEY", "")
-client = OpenAI(api_key=effective_openai_key) if effective_openai_key else None
+client = get_openai_client(effective_openai_key)
 
 # Helper functions
-def get_upload_playlist(youtube, channel_id):
-    data = youtube.channels().list(part="contentDetails", id=channel_id).execute()
-    return data["items"][0]["contentDetails"]["relatedPlaylists"]["uploads"]
-
-def get_video_ids(youtube, playlist_id, max_videos=10000):
-    videos = []
-    next_token = None
-    while len(videos) < max_videos:
-        res = youtube.playlistItems().list(
-            part="contentDetails,snippet",
-            playlistId=playlist_id,
-            maxResults=min(50, max_videos - len(videos)),
-            pageToken=next_token
-        ).execute()
-        for item in res["items"]:
-            videos.append({
-                "video_id": item["contentDetails"]["videoId"],
-                "published_at": item["contentDetails"].get("videoPublishedAt") or item["snippet"]["publishedAt"]
-            })
-        next_token = res.get("nextPageToken")
-        if not next_token:
-            break
-    return videos
-
-def get_video_info(youtube, video_id):
-    res = youtube.videos().list(part="snippet,statistics", id=video_id).execute()
-    if not res["items"]:
-        return {"video_id": video_id, "error": "Video not found or unavailable"}
-    item = res["items"][0]
-    return {
-        "video_id": video_id,
-        "title": item["snippet"]["title"],
-        "description": item["snippet"]["description"],
-        "tags": ", ".join(item["snippet"].get("tags", [])),
-        "views": item["statistics"].get("viewCount", "0"),
-        "published_date": item["snippet"]["publishedAt"],
-        "url": f"https://www.youtube.com/watch?v={video_id}"
-    }
-
 def get_top_video_tags(youtube, search_query, max_results=20):
     try:
-        search_res = youtube.search().list(
-            q=search_query,
-            part="snippet",
-            type="video",
-            order="viewCount",
-            maxResults=max_results
-        ).execute()
-        video_ids = [item["id"]["videoId"] for item in search_res["items"]]
-        tags = []
-        for vid in video_ids:
-            res = youtube.videos().list(part="snippet", id=vid).execute()
-            if res["items"]:
-                tags.extend(res["items"][0]["snippet"].get("tags", []))
-        tag_freq = pd.Series(tags).value_counts()
-        return tag_freq.index.tolist()[:20]
+        return top_tags_for_topic(lambda: youtube, search_query, max_results)
     except Exception as e:
         return [f"Error: {str(e)}"]
 
-def generate_seo_tags(video, top_tags=None):
+@traced("seo", video_id=lambda video, *args, **kwargs: video.get("video_id"))
+def generate_seo_tags(video, top_tags=None, limiter=None):
     if not client:
-        return "❌ OpenAI API key is missing or not set."
+        return {"seo_error": "❌ OpenAI API key is missing or not set."}
 
     tags_string = ", ".join(top_tags) if top_tags else ""
+    summary = video.get("transcript_summary", "")
+    transcript_line = f"Transcript summary: {summary}\n" if summary else ""
     prompt = f"""
     You are an expert YouTube SEO optimizer. Given this video metadata:
 
@@ -114,32 +83,53 @@ def generate_seo_tags(video, top_tags=None):
     Description: {video['description']}
     Tags: {video['tags']}
     Views: {video['views']}
-
+    {transcript_line}
     Top trending tags: {tags_string}
 
     Generate:
     - A compelling SEO-optimized YouTube title (under 70 characters, with keywords early)
     - A 150-word keyword-rich video description (2 paragraphs max)
     - A list of 10 relevant SEO hashtags
-    - A list of 10 comma-separated long-tail keywords
+    - A list of 10 long-tail keywords
     """
     try:
-        response = client.chat.completions.create(
-            model="gpt-4o",
-            messages=[{"role": "user", "content": prompt}]
-        )
-        return response.choices[0].message.content
+        cache_fields = {
+            "template": SEO_PROMPT_VERSION,
+            "title": video["title"],
+            "description": video["description"],
+            "tags": video["tags"],
+            "transcript_summary": summary,
+            "top_tags": top_tags or [],
+        }
+        return cached_chat_completion(client, prompt, cache_fields, model="gpt-4o", limiter=limiter,
+                                      force_refresh=force_refresh, parse=parse_seo,
+                                      response_format=SEO_RESPONSE_FORMAT)
     except Exception as e:
-        return f"OpenAI Error: {e}"
-
-def fetch_transcript(video_id):
-    try:
-        transcript = YouTubeTranscriptApi.get_transcript(video_id)
-        return " ".join([seg["text"] for seg in transcript])
-    except (TranscriptsDisabled, NoTranscriptFound):
-        return "Transcript not found"
-    except Exception:
-        return "Transcript not found"
+        return seo_error(e)
+
+def add_seo_outputs(videos, top_tags):
+    limiter = RateLimiter()
+    pending = [v for v in videos if "error" not in v]
+    progress = st.progress(0.0, text="✨ Generating SEO...")
+    outputs = run_in_pool(
+        lambda v: generate_seo_tags(add_transcript_summary(v, client, limiter, force_refresh), top_tags, limiter),
+        pending,
+        max_workers=max_workers,
+        on_progress=lambda done, total: progress.progress(done / total, text=f"✨ Generating SEO... {done}/{total}")
+    )
+    for video, output in zip(pending, outputs):
+        video.update(output)
+
+def add_transcripts(videos):
+    ids = [v["video_id"] for v in videos if "error" not in v]
+    progress = st.progress(0.0, text="📝 Fetching transcripts...")
+    transcripts = fetch_transcripts(
+        ids,
+        on_progress=lambda done, total: progress.progress(done / total, text=f"📝 Fetching transcripts... {done}/{total}")
+    )
+    for video in videos:
+        if video["video_id"] in transcripts:
+            video["transcript_status"], video["transcript"] = transcripts[video["video_id"]]
 
 def extract_video_ids_from_urls(file):
     content = file.read().decode("utf-8")
@@ -157,7 +147,16 @@ if submit:
         st.error("❌ Please enter your YouTube API Key.")
     else:
         try:
-            youtube = build("youtube", "v3", developerKey=yt_api_key)
+            if mode == "Batch Mode" and channel_id:
+                job_calls = estimate_channel_job(channel_id, start_index, num_videos)
+            elif mode == "Upload URLs" and uploaded_file:
+                job_calls = estimate_video_ids(len(uploaded_file.getvalue().splitlines()))
+            else:
+                job_calls = estimate_video_ids(1)
+            summary = show_quota_estimate(yt_api_key, job_calls, estimate_top_tags() if seo_topic else {})
+            stop_if_over_quota(summary, ignore_quota)
+
+            youtube = get_youtube(yt_api_key)
             top_tags = get_top_video_tags(youtube, seo_topic) if seo_topic else []
 
             if seo_topic and top_tags:
@@ -169,19 +168,12 @@ if submit:
                 if not channel_id:
                     st.error("❌ Please enter Channel ID.")
                 else:
-                    playlist_id = get_upload_playlist(youtube, channel_id)
                     with st.spinner("📡 Fetching videos..."):
-                        video_meta = get_video_ids(youtube, playlist_id, max_videos=start_index + num_videos)
-                        video_meta_sorted = sorted(video_meta, key=lambda x: x["published_at"], reverse=True)
-                        selected_batch = video_meta_sorted[start_index:start_index + num_videos]
-                        for v in selected_batch:
-                            info = get_video_info(youtube, v["video_id"])
-                            if enable_seo:
-                                info["seo_output"] = generate_seo_tags(info, top_tags)
-                                time.sleep(5)
-                            if enable_transcript:
-                                info["transcript"] = fetch_transcript(v["video_id"])
-                            video_details.append(info)
+                        video_details = get_channel_batch_info(youtube, channel_id, start_index, num_videos)
+                        if enable_transcript:
+                            add_transcripts(video_details)
+                        if enable_seo:
+                            add_seo_outputs(video_details, top_tags)
 
             elif mode == "Single Video":
                 if not video_id_input:
@@ -192,11 +184,11 @@ if submit:
                         if "error" in info:
                             st.error(f"❌ {info['error']}")
                         else:
-                            if enable_seo:
-                                info["seo_output"] = generate_seo_tags(info, top_tags)
-                                time.sleep(5)
                             if enable_transcript:
-                                info["transcript"] = fetch_transcript(video_id_input)
+                                info["transcript_status"], info["transcript"] = fetch_transcript_result(video_id_input)
+                            if enable_seo:
+                                add_transcript_summary(info, client, force_refresh=force_refresh)
+                                info.update(generate_seo_tags(info, top_tags))
                             video_details.append(info)
 
             elif mode == "Upload URLs":
@@ -205,29 +197,24 @@ if submit:
                 else:
                     video_ids = extract_video_ids_from_urls(uploaded_file)
                     with st.spinner("📄 Processing uploaded video URLs..."):
-                        for vid in video_ids:
-                            info = get_video_info(youtube, vid)
-                            if enable_seo:
-                                info["seo_output"] = generate_seo_tags(info, top_tags)
-                                time.sleep(5)
-                            if enable_transcript:
-                                info["transcript"] = fetch_transcript(vid)
-                            video_details.append(info)
+                        infos = get_videos_info(youtube, video_ids)
+                        video_details = [dict(infos[vid]) for vid in video_ids]
+                        if enable_transcript:
+                            add_transcripts(video_details)
+                        if enable_seo:
+                            add_seo_outputs(video_details, top_tags)
 
             if video_details:
                 df = pd.DataFrame(video_details)
                 st.dataframe(df)
 
-                output = BytesIO()
-                with pd.ExcelWriter(output, engine='xlsxwriter') as writer:
-                    df.to_excel(writer, index=False, sheet_name="Videos")
-                output.seek(0)
+                output = to_excel_bytes(video_details, sheet_name="Videos")
 
                 st.download_button(
                     label=f"⬇️ Download Excel",
                     data=output,
                     file_name="youtube_videos.xlsx",
-                    mime="application/vnd.openxmlformats-officedocument.spreadsheetml.sheet"
+                    mime=EXCEL_MIME
                 )
 
         except HttpError as e:
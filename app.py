@@ -1,10 +1,30 @@
 import streamlit as st
-from googleapiclient.discovery import build
 import pandas as pd
-from io import BytesIO
-from youtube_transcript_api import YouTubeTranscriptApi, TranscriptsDisabled, NoTranscriptFound
-from openai import OpenAI
 import re
+import threading
+
+from utils.concurrency import DEFAULT_MAX_WORKERS, RateLimiter, run_in_pool
+from utils.export import EXCEL_MIME, to_excel_bytes
+from utils.image_store import DEFAULT_IMAGE_WORKERS, ImageStore, generate_thumbnail
+from utils.llm import cached_chat_completion, get_openai_client
+from utils.quota import estimate_topic_analysis, estimate_video_ids
+from utils.seo_schema import SEO_RESPONSE_FORMAT, format_seo, parse_seo, seo_error
+from utils.tracing import start_trace, stop_trace, traced
+from utils.ui import live_stage_breakdown, show_quota_estimate, show_stage_breakdown
+from utils.youtube_handler import (
+    add_transcript_summary,
+    estimate_channel_job,
+    DEFAULT_SEO_BATCH_SIZE,
+    fetch_transcript_result,
+    generate_seo_tags_batch,
+    get_channel_batch_info,
+    get_video_info,
+    get_videos_info,
+    get_youtube,
+    group_topic_results,
+    search_topics,
+    seo_batches,
+)
 
 # ---------------- Page Setup ----------------
 st.set_page_config(page_title="YouTube Analysis", layout="centered")
@@ -14,72 +34,26 @@ st.markdown(
     "Optionally generate SEO titles/descriptions, transcripts, and images from video titles."
 )
 
+SEO_PROMPT_VERSION = "app-seo-v3"
+image_store = ImageStore()
+
 # ---------------- Tabs ----------------
 tabs = st.tabs(["Video Export", "SEO Topic Analysis"])
 
 # ---------------- Helper Functions ----------------
-def get_upload_playlist(youtube, channel_id):
-    data = youtube.channels().list(part="contentDetails", id=channel_id).execute()
-    if not data.get("items"):
-        raise ValueError(f"No channel found for ID: {channel_id}")
-    return data["items"][0]["contentDetails"]["relatedPlaylists"]["uploads"]
-
-def get_video_ids(youtube, playlist_id, max_videos=1000):
-    videos = []
-    next_token = None
-    while len(videos) < max_videos:
-        res = youtube.playlistItems().list(
-            part="contentDetails,snippet",
-            playlistId=playlist_id,
-            maxResults=min(50, max_videos - len(videos)),
-            pageToken=next_token
-        ).execute()
-        for item in res["items"]:
-            videos.append({
-                "video_id": item["contentDetails"]["videoId"],
-                "published_at": item["contentDetails"].get("videoPublishedAt") or item["snippet"]["publishedAt"]
-            })
-        next_token = res.get("nextPageToken")
-        if not next_token:
-            break
-    return videos
-
-def get_video_info(youtube, video_id):
-    res = youtube.videos().list(part="snippet,statistics", id=video_id).execute()
-    if not res["items"]:
-        return {"video_id": video_id, "error": "Video not found"}
-    item = res["items"][0]
-    views = int(item["statistics"].get("viewCount", 0))
-    return {
-        "video_id": video_id,
-        "title": item["snippet"]["title"],
-        "description": item["snippet"]["description"],
-        "tags": ", ".join(item["snippet"].get("tags", [])),
-        "views": views,
-        "published_date": item["snippet"]["publishedAt"],
-        "url": f"https://www.youtube.com/watch?v={video_id}"
-    }
-
-def fetch_transcript(video_id):
-    try:
-        transcript_list = YouTubeTranscriptApi.list_transcripts(video_id)
-        transcript = transcript_list.find_transcript(['en']).fetch()
-        return " ".join([seg["text"] for seg in transcript])
-    except (TranscriptsDisabled, NoTranscriptFound):
-        return "Transcript not found"
-    except Exception:
-        return "Transcript not found"
-
-def generate_seo_tags(client, video):
+@traced("seo", video_id=lambda client, video, *args, **kwargs: video.get("video_id"))
+def generate_seo_tags(client, video, limiter=None, force_refresh=False):
     if not client:
-        return "OpenAI API key missing"
+        return {"seo_error": "OpenAI API key missing"}
+    summary = video.get("transcript_summary", "")
+    transcript_line = f"Transcript summary: {summary}\n" if summary else ""
     prompt = f"""
     You are a YouTube SEO expert. Video info:
 
     Title: {video['title']}
     Description: {video['description']}
     Views: {video['views']}
-
+    {transcript_line}
     Generate:
     - SEO title (≤70 chars)
     - 150-word description
@@ -87,27 +61,22 @@ def generate_seo_tags(client, video):
     - 10 long-tail keywords
     """
     try:
-        response = client.chat.completions.create(
-            model="gpt-4o",
-            messages=[{"role": "user", "content": prompt}]
-        )
-        return response.choices[0].message.content
+        cache_fields = {
+            "template": SEO_PROMPT_VERSION,
+            "title": video["title"],
+            "description": video["description"],
+            "transcript_summary": summary,
+        }
+        return cached_chat_completion(client, prompt, cache_fields, model="gpt-4o", limiter=limiter,
+                                      force_refresh=force_refresh, parse=parse_seo,
+                                      response_format=SEO_RESPONSE_FORMAT)
     except Exception as e:
-        return f"Error generating SEO: {e}"
+        return seo_error(e)
 
-def generate_image(client, prompt, size):
+def generate_image(client, prompt, size, slots=None, force_refresh=False):
     if not client:
         return None
-    try:
-        response = client.images.generate(
-            model="gpt-image-1",
-            prompt=f"Thumbnail for: {prompt}",
-            size=size
-        )
-        return response.data[0].url
-    except Exception as e:
-        st.warning(f"Image generation failed for '{prompt}': {e}")
-        return None
+    return generate_thumbnail(client, prompt, size, image_store, slots, force_refresh)
 
 def extract_video_ids_from_urls(file):
     content = file.read().decode("utf-8")
@@ -119,13 +88,25 @@ def extract_video_ids_from_urls(file):
             ids.append(match.group(1))
     return ids
 
-def process_video(video, client, enable_seo, enable_transcript, enable_images, image_size):
-    if enable_seo:
-        video["seo_output"] = generate_seo_tags(client, video)
+def process_video(video, client, enable_seo, enable_transcript, enable_images, image_size, limiter=None,
+                  force_refresh=False, image_slots=None):
+    if "error" in video:
+        return video
     if enable_transcript:
-        video["transcript"] = fetch_transcript(video["video_id"])
+        video["transcript_status"], video["transcript"] = fetch_transcript_result(video["video_id"])
+    if enable_seo:
+        # Long transcripts reach the SEO prompt as a map-reduce summary, never in full
+        add_transcript_summary(video, client, limiter, force_refresh)
+        video.update(generate_seo_tags(client, video, limiter, force_refresh))
     if enable_images:
-        video["image_url"] = generate_image(client, video["title"], image_size)
+        # Runs on a worker thread, so failures are reported by the main script instead of st.warning here
+        try:
+            video["image_path"] = generate_image(client, video["title"], image_size, image_slots, force_refresh)
+            if video["image_path"]:
+                video["image_preview"] = image_store.preview(video["image_path"])
+        except Exception as e:
+            video["image_path"] = None
+            video["image_error"] = f"Image generation failed for '{video['title']}': {e}"
     return video
 
 # ---------------- Tab 1: Video Export ----------------
@@ -145,23 +126,39 @@ with tabs[0]:
         uploaded_file_tab1 = st.file_uploader("Upload CSV/TXT with Video URLs", type=["csv", "txt"], key="tab1_file")
 
     enable_seo = st.checkbox("Enable SEO suggestions", key="tab1_seo")
+    force_refresh = st.checkbox("Force refresh cached SEO", key="tab1_refresh")
     enable_images = st.checkbox("Enable AI Thumbnail", key="tab1_img")
     enable_transcript = st.checkbox("Enable Transcript", key="tab1_transcript")
+    max_workers = st.number_input("Max concurrent requests", min_value=1, max_value=32,
+                                  value=DEFAULT_MAX_WORKERS, step=1, key="tab1_workers")
+    record_trace = st.checkbox("Record a Chrome trace of the run", key="tab1_trace")
 
     image_size = "1024x1024"
+    image_workers = DEFAULT_IMAGE_WORKERS
+    embed_images = False
     if enable_images:
         image_size = st.selectbox(
             "Select Image Size",
             ["1024x1024", "1024x1536", "1536x1024", "auto"],
             index=0
         )
+        image_workers = st.number_input("Max concurrent image requests", min_value=1, max_value=16,
+                                        value=DEFAULT_IMAGE_WORKERS, step=1, key="tab1_img_workers")
+        embed_images = st.checkbox("Embed thumbnails in the Excel file (otherwise link the local files)",
+                                   key="tab1_img_embed")
+
+    if mode_tab1 == "Batch Mode" and channel_id:
+        show_quota_estimate(youtube_api_key, estimate_channel_job(channel_id, 0, num_videos))
+    elif mode_tab1 == "Upload URLs" and uploaded_file_tab1:
+        show_quota_estimate(youtube_api_key, estimate_video_ids(len(uploaded_file_tab1.getvalue().splitlines())))
 
     if st.button("Fetch Videos", key="tab1_btn"):
         if not youtube_api_key:
             st.error("YouTube API Key required")
         else:
-            youtube = build("youtube", "v3", developerKey=youtube_api_key)
-            client = OpenAI(api_key=openai_api_key) if openai_api_key else None
+            tracer = start_trace(record_trace)
+            youtube = get_youtube(youtube_api_key)
+            client = get_openai_client(openai_api_key)
             videos_to_process = []
 
             if mode_tab1 == "Single Video":
@@ -170,21 +167,29 @@ with tabs[0]:
                 else:
                     videos_to_process = [get_video_info(youtube, video_id_input)]
             elif mode_tab1 == "Batch Mode":
-                playlist_id = get_upload_playlist(youtube, channel_id)
-                videos_meta = get_video_ids(youtube, playlist_id, max_videos=num_videos)
-                videos_to_process = [get_video_info(youtube, v["video_id"]) for v in videos_meta[:num_videos]]
+                videos_to_process = get_channel_batch_info(youtube, channel_id, 0, num_videos)
             else:
                 if uploaded_file_tab1:
                     video_ids = extract_video_ids_from_urls(uploaded_file_tab1)
-                    videos_to_process = [get_video_info(youtube, vid) for vid in video_ids]
+                    infos = get_videos_info(youtube, video_ids)
+                    videos_to_process = [dict(infos[vid]) for vid in video_ids]
 
-            video_details = []
-            for v in videos_to_process:
-                video_details.append(process_video(v, client, enable_seo, enable_transcript, enable_images, image_size))
+            limiter = RateLimiter()
+            image_slots = threading.BoundedSemaphore(image_workers)
+            video_details = run_in_pool(
+                lambda v: process_video(v, client, enable_seo, enable_transcript, enable_images, image_size, limiter,
+                                        force_refresh, image_slots),
+                videos_to_process,
+                max_workers=max_workers,
+                on_progress=live_stage_breakdown(tracer, st.progress(0.0))
+            )
 
             # Display details
             for video in video_details:
                 st.markdown("---")
+                if "error" in video:
+                    st.warning(f"{video['video_id']}: {video['error']}")
+                    continue
                 st.markdown(f"**Title:** [{video['title']}]({video['url']})")
                 st.markdown(f"**Views:** {video['views']} | **Published:** {video['published_date']}")
                 st.markdown(f"**Current Description:** {video['description']}")
@@ -192,27 +197,32 @@ with tabs[0]:
                 if enable_transcript and video.get("transcript"):
                     with st.expander("Transcript"):
                         st.write(video["transcript"][:300] + "...")
-                if enable_seo and video.get("seo_output"):
+                        if video.get("transcript_summary"):
+                            st.markdown(f"**Summary:** {video['transcript_summary']}")
+                elif enable_transcript:
+                    st.caption(f"Transcript unavailable ({video.get('transcript_status')})")
+                if enable_seo and (video.get("seo_title") or video.get("seo_error")):
                     with st.expander("SEO Output"):
-                        st.write(video["seo_output"])
+                        st.markdown(format_seo(video))
+                if video.get("image_error"):
+                    st.warning(video["image_error"])
 
             # Show thumbnails in a grid view
             if enable_images:
                 st.subheader("🖼️ Generated Thumbnails")
                 cols = st.columns(3)
                 for idx, video in enumerate(video_details):
-                    if video.get("image_url"):
+                    if video.get("image_preview"):
                         with cols[idx % 3]:
-                            st.image(video["image_url"], caption=video["title"], use_container_width=True)
+                            st.image(video["image_preview"], caption=video["title"], use_container_width=True)
 
             if video_details:
-                df = pd.DataFrame(video_details)
-                output = BytesIO()
-                with pd.ExcelWriter(output, engine='xlsxwriter') as writer:
-                    df.to_excel(writer, index=False)
-                output.seek(0)
-                st.download_button("⬇️ Download Excel", output, "youtube_videos.xlsx",
-                                   "application/vnd.openxmlformats-officedocument.spreadsheetml.sheet")
+                output = to_excel_bytes(video_details, sheet_name="Sheet1",
+                                        image_mode="embed" if embed_images else "link")
+                st.download_button("⬇️ Download Excel", output, "youtube_videos.xlsx", EXCEL_MIME)
+
+            stop_trace()
+            show_stage_breakdown(tracer, "youtube_trace.json")
 
 # ---------------- Tab 2: SEO Topic Analysis ----------------
 with tabs[1]:
@@ -222,6 +232,17 @@ with tabs[1]:
     topics_input = st.text_area("Enter Topic/Keyword(s) (comma-separated)", key="tab2_topics")
     uploaded_file_tab2 = st.file_uploader("Or upload Excel/CSV with topics", type=["csv", "xlsx"], key="tab2_file")
     top_n = st.number_input("Number of top videos to fetch per keyword", min_value=1, max_value=50, value=10, step=1)
+    max_workers_tab2 = st.number_input("Max concurrent SEO requests", min_value=1, max_value=32,
+                                       value=DEFAULT_MAX_WORKERS, step=1, key="tab2_workers")
+    search_workers_tab2 = st.number_input("Max concurrent topic searches", min_value=1, max_value=32,
+                                          value=DEFAULT_MAX_WORKERS, step=1, key="tab2_search_workers")
+    force_refresh_tab2 = st.checkbox("Force refresh cached SEO", key="tab2_refresh")
+    seo_batch_size_tab2 = st.number_input("Videos per SEO request", min_value=1, max_value=20,
+                                          value=DEFAULT_SEO_BATCH_SIZE, step=1, key="tab2_batch")
+
+    if topics_input and not uploaded_file_tab2:
+        num_topics = len([t for t in topics_input.split(",") if t.strip()])
+        show_quota_estimate(youtube_api_key_tab2, estimate_topic_analysis(num_topics, top_n))
 
     if st.button("Analyze SEO Topics", key="tab2_btn"):
         if uploaded_file_tab2:
@@ -231,31 +252,55 @@ with tabs[1]:
                 df_topics = pd.read_csv(uploaded_file_tab2)
             topics = df_topics.iloc[:, 0].astype(str).tolist()
         else:
-            topics = [t.strip() for t in topics_input.split(",") if t.strip()]
+            topics = topics_input.split(",")
+        topics = list(dict.fromkeys(t.strip() for t in topics if t.strip()))
 
         if not youtube_api_key_tab2:
             st.error("YouTube API Key required")
         else:
-            youtube = build("youtube", "v3", developerKey=youtube_api_key_tab2)
-            client = OpenAI(api_key=openai_api_key_tab2) if openai_api_key_tab2 else None
+            youtube = get_youtube(youtube_api_key_tab2)
+            client = get_openai_client(openai_api_key_tab2)
+
+            # Search every topic concurrently, then fetch and process each distinct video once
+            progress = st.progress(0.0, text="Searching topics...")
+            topic_results = search_topics(
+                youtube_api_key_tab2, topics, top_n, max_workers=search_workers_tab2,
+                on_progress=lambda done, total: progress.progress(done / total, text=f"Searched {done}/{total} topics")
+            )
+            progress.empty()
+            for topic, _, error in topic_results:
+                if error:
+                    st.warning(f"Search failed for '{topic}': {error}")
+
+            grouped = group_topic_results(topic_results)
+            infos = get_videos_info(youtube, list(grouped))
             all_results = []
+            for vid, matches in grouped.items():
+                info = dict(infos[vid])
+                info["keywords"] = [topic for topic, _ in matches]
+                info["best_rank"] = min(rank for _, rank in matches)
+                all_results.append(info)
+            st.info(f"{sum(len(ids) for _, ids, _ in topic_results)} search results, "
+                    f"{len(all_results)} distinct videos across {len(topics)} topics.")
 
-            for topic in topics:
-                search_res = youtube.search().list(q=topic, part="snippet", type="video", order="viewCount", maxResults=top_n).execute()
-                video_ids = [item["id"]["videoId"] for item in search_res["items"]]
-                for vid in video_ids:
-                    info = get_video_info(youtube, vid)
-                    info["keyword"] = topic
-                    if client:
-                        info["seo_suggestion"] = generate_seo_tags(client, info)
-                    all_results.append(info)
+            if client:
+                limiter = RateLimiter()
+                pending = [info for info in all_results if "error" not in info]
+                batches = seo_batches(pending, seo_batch_size_tab2)
+                outputs = run_in_pool(
+                    # The handler's own single-video fallback caches under the same per-video key as packed
+                    # answers, so a video answered either way is a cache hit next time
+                    lambda batch: generate_seo_tags_batch(batch, client, limiter=limiter,
+                                                          force_refresh=force_refresh_tab2),
+                    batches,
+                    max_workers=max_workers_tab2
+                )
+                for batch, batch_outputs in zip(batches, outputs):
+                    for info, output in zip(batch, batch_outputs):
+                        info.update(output)
 
             if all_results:
                 df_res = pd.DataFrame(all_results)
                 st.dataframe(df_res)
-                output = BytesIO()
-                with pd.ExcelWriter(output, engine='xlsxwriter') as writer:
-                    df_res.to_excel(writer, index=False)
-                output.seek(0)
-                st.download_button("⬇️ Download SEO Analysis", output, "seo_analysis.xlsx",
-                                   "application/vnd.openxmlformats-officedocument.spreadsheetml.sheet")
+                output = to_excel_bytes(all_results, sheet_name="Sheet1")
+                st.download_button("⬇️ Download SEO Analysis", output, "seo_analysis.xlsx", EXCEL_MIME)
@@ -1,7 +1,5 @@
 import streamlit as st
 import pandas as pd
-from io import BytesIO
-from openai import OpenAI
 from googleapiclient.discovery import build
 from googleapiclient.errors import HttpError
 from youtube_transcript_api import YouTubeTranscriptApi, TranscriptsDisabled, NoTranscriptFound
@@ -9,8 +7,19 @@ import os
 import re
 
 # Custom imports
-from utils.instagram_handler import handle_instagram_single, handle_instagram_urls, get_top_instagram_hashtags
+from utils.concurrency import DEFAULT_MAX_WORKERS
+from utils.export import EXCEL_MIME, to_excel_bytes
+from utils.llm import get_openai_client
+from utils.hashtag_index import get_hashtag_index, parse_posts
+from utils.instagram_handler import (
+    INSTAGRAM_FETCHERS, handle_instagram_single, handle_instagram_urls, get_top_instagram_hashtags
+)
+from utils.quota import estimate_top_tags, estimate_video_ids
+from utils.tracing import start_trace, stop_trace
+from utils.ui import live_stage_breakdown, show_quota_estimate, show_stage_breakdown
 from utils.youtube_handler import (
+    DEFAULT_SEO_BATCH_SIZE,
+    estimate_channel_job,
     handle_youtube_batch,
     handle_youtube_single,
     handle_youtube_urls,
@@ -27,58 +36,14 @@ app = st.radio("Select Platform", ["YouTube", "Instagram"], horizontal=True)
 openai_key = st.text_input("🔐 OpenAI API Key", type="password")
 seo_topic = st.text_input("📈 (Optional) SEO Topic for trending tags")
 enable_seo = st.checkbox("✨ Enable SEO Tagging", value=True)
+force_refresh = st.checkbox("🔄 Force refresh (ignore cached SEO)")
+run_id = st.text_input("🧾 Run ID (optional — reuse it to resume an interrupted export)").strip() or None
+max_workers = st.number_input("⚙️ Max concurrent SEO requests", min_value=1, max_value=32, value=DEFAULT_MAX_WORKERS, step=1)
+seo_batch_size = st.number_input("📦 Videos per SEO request (1 = one request per video)", min_value=1, max_value=20,
+                                 value=DEFAULT_SEO_BATCH_SIZE, step=1)
+record_trace = st.checkbox("⏱️ Record a Chrome trace of the run")
 
-client = None
-if openai_key:
-    client = OpenAI(api_key=openai_key)
-
-# Updated SEO generation function
-
-def generate_seo_tags(video, top_tags=None, platform="youtube"):
-    if not client:
-        return "❌ OpenAI API key is missing or not set."
-
-    tags_string = ", ".join(top_tags) if top_tags else ""
-    link_line = "[Download Naukri APP](https://play.google.com/store/apps/details?id=naukriApp.appModules.login&hl=en&utm_source=youtube&utm_medium=videos)"
-
-    if platform == "youtube":
-        prompt = f"""
-You are an expert YouTube SEO strategist.
-
-Title: {video['title']}
-Description: {video['description']}
-Tags: {video['tags']}
-Views: {video['views']}
-
-Top tags: {tags_string}
-
-Generate:
-1. A catchy SEO-optimized YouTube title (max 70 characters)
-2. A 2-paragraph SEO-rich video description (150 words max). End with this sentence: \n{link_line}
-3. A list of 10 relevant SEO hashtags
-4. A comma-separated list of 10 long-tail keywords
-"""
-    else:
-        prompt = f"""
-You are an expert Instagram SEO strategist.
-
-Post Content: {video['description']}
-Top Instagram hashtags: {tags_string}
-
-Generate:
-1. A high-performing SEO-friendly Instagram caption (under 150 words). Make it emotionally engaging. End with this sentence: \n{link_line}
-2. A list of 10 Instagram hashtags
-3. A comma-separated list of 10 long-tail keywords
-"""
-
-    try:
-        response = client.chat.completions.create(
-            model="gpt-4o",
-            messages=[{"role": "user", "content": prompt}]
-        )
-        return response.choices[0].message.content
-    except Exception as e:
-        return f"OpenAI Error: {e}"
+client = get_openai_client(openai_key)
 
 # ----------- YOUTUBE ----------- #
 if app == "YouTube":
@@ -86,49 +51,81 @@ if app == "YouTube":
     yt_mode = st.radio("Select Mode", ["Batch Mode", "Single Video", "Upload URLs"], horizontal=True)
 
     top_tags = get_top_video_tags(yt_api_key, seo_topic) if seo_topic else []
+    # The trending-tag lookup (search + videos.list) is charged on top of every mode's own calls
+    topic_calls = estimate_top_tags() if seo_topic else {}
     if seo_topic and top_tags:
         st.markdown(f"🔝 **Top YouTube tags for {seo_topic}:**")
         st.write(", ".join(top_tags))
 
     results = []
+    tracer = None
     if yt_mode == "Batch Mode":
         channel_id = st.text_input("📡 YouTube Channel ID (e.g. UC_xxx...)")
         batch_number = st.selectbox("📦 Select Batch (500 videos each)", options=list(range(1, 21)), index=0)
         start_index = (batch_number - 1) * 500
         num_videos = st.number_input("🎬 Number of videos to fetch", min_value=1, max_value=500, value=500, step=1)
+        if channel_id:
+            show_quota_estimate(yt_api_key, estimate_channel_job(channel_id, start_index, num_videos), topic_calls)
         if st.button("📥 Fetch Batch"):
-            results = handle_youtube_batch(yt_api_key, channel_id, start_index, num_videos, enable_seo, client, top_tags)
+            tracer = start_trace(record_trace)
+            results = handle_youtube_batch(yt_api_key, channel_id, start_index, num_videos, enable_seo, client, top_tags,
+                                           max_workers=max_workers, force_refresh=force_refresh, run_id=run_id,
+                                           on_progress=live_stage_breakdown(tracer, st.progress(0.0)),
+                                           seo_batch_size=seo_batch_size)
 
     elif yt_mode == "Single Video":
         video_id_input = st.text_input("🎥 Enter Video ID (e.g. dQw4w9WgXcQ)")
+        if video_id_input:
+            show_quota_estimate(yt_api_key, estimate_video_ids(1), topic_calls)
         if st.button("📥 Fetch Single"):
-            results = handle_youtube_single(yt_api_key, video_id_input, enable_seo, client, top_tags)
+            tracer = start_trace(record_trace)
+            results = handle_youtube_single(yt_api_key, video_id_input, enable_seo, client, top_tags,
+                                            force_refresh=force_refresh)
 
     elif yt_mode == "Upload URLs":
         uploaded_file = st.file_uploader("📄 Upload CSV or TXT with YouTube Video URLs", type=["csv", "txt"])
+        if uploaded_file:
+            show_quota_estimate(yt_api_key, estimate_video_ids(len(uploaded_file.getvalue().splitlines())),
+                                topic_calls)
         if uploaded_file and st.button("📥 Process URLs"):
-            results = handle_youtube_urls(yt_api_key, uploaded_file, enable_seo, client, top_tags)
+            tracer = start_trace(record_trace)
+            results = handle_youtube_urls(yt_api_key, uploaded_file, enable_seo, client, top_tags,
+                                          max_workers=max_workers, force_refresh=force_refresh, run_id=run_id,
+                                          on_progress=live_stage_breakdown(tracer, st.progress(0.0)),
+                                          seo_batch_size=seo_batch_size)
 
     if results:
         df = pd.DataFrame(results)
         st.dataframe(df)
 
-        output = BytesIO()
-        with pd.ExcelWriter(output, engine='xlsxwriter') as writer:
-            df.to_excel(writer, index=False, sheet_name="YouTube SEO")
-        output.seek(0)
+        output = to_excel_bytes(results, sheet_name="YouTube SEO")
 
         st.download_button(
             label="⬇️ Download YouTube SEO Report",
             data=output,
             file_name="youtube_seo.xlsx",
-            mime="application/vnd.openxmlformats-officedocument.spreadsheetml.sheet"
+            mime=EXCEL_MIME
         )
 
+    if tracer:
+        stop_trace()
+        show_stage_breakdown(tracer, "youtube_trace.json")
+
 # ----------- INSTAGRAM ----------- #
 elif app == "Instagram":
     ig_mode = st.radio("Select Mode", ["Single Video", "Batch (CSV/TXT)", "About"], horizontal=True)
     ig_api_key = st.text_input("📷 Instagram API Key (optional)", type="password")
+    ig_fetcher = st.selectbox("Post data source", list(INSTAGRAM_FETCHERS))
+
+    with st.expander("#️⃣ Import posts into the hashtag trend index"):
+        dataset = st.file_uploader("Upload .jsonl, .json or .csv (caption, hashtags, timestamp)",
+                                   type=["jsonl", "json", "csv"], key="hashtag_dataset")
+        if dataset and st.button("Import posts"):
+            posts = parse_posts(dataset.read().decode("utf-8"), dataset.name.rsplit(".", 1)[-1].lower())
+            index = get_hashtag_index()
+            index.add_posts(posts)
+            index.save()
+            st.success(f"Imported {len(posts)} posts ({index.posts} indexed in total).")
 
     top_tags = get_top_instagram_hashtags(seo_topic) if seo_topic else []
     if seo_topic and top_tags:
@@ -139,12 +136,13 @@ elif app == "Instagram":
     if ig_mode == "Single Video":
         url = st.text_input("Paste Instagram Post URL:")
         if url and st.button("📥 Fetch Post"):
-            results = handle_instagram_single(url, enable_seo, client, openai_key, top_tags, ig_api_key)
+            results = handle_instagram_single(url, enable_seo, client, openai_key, top_tags, ig_api_key, ig_fetcher)
 
     elif ig_mode == "Batch (CSV/TXT)":
         file = st.file_uploader("Upload .csv or .txt file with Instagram post URLs")
         if file and st.button("📥 Process File"):
-            results = handle_instagram_urls(file, enable_seo, client, openai_key, top_tags, ig_api_key)
+            results = handle_instagram_urls(file, enable_seo, client, openai_key, top_tags, ig_api_key,
+                                            max_workers=max_workers, record_trace=record_trace, fetcher=ig_fetcher)
 
     else:
         st.markdown("""
@@ -163,14 +161,11 @@ elif app == "Instagram":
         df = pd.DataFrame(results)
         st.dataframe(df)
 
-        output = BytesIO()
-        with pd.ExcelWriter(output, engine='xlsxwriter') as writer:
-            df.to_excel(writer, index=False, sheet_name="Instagram SEO")
-        output.seek(0)
+        output = to_excel_bytes(results, sheet_name="Instagram SEO")
 
         st.download_button(
             label="⬇️ Download Instagram SEO Report",
             data=output,
             file_name="instagram_seo.xlsx",
-            mime="application/vnd.openxmlformats-officedocument.spreadsheetml.sheet"
+            mime=EXCEL_MIME
         )
@@ -0,0 +1,356 @@
+# benchmarks/fake_server.py
+#
+# Local stand-in for the YouTube Data API, OpenAI chat completions and the transcript endpoint.
+#
+#   python -m benchmarks.fake_server --port 8765 --latency-ms 40 --rate-limit-rate 0.01
+#
+# YouTube:     GET  /youtube/v3/{videos,playlistItems,search,channels}
+# OpenAI:      POST /v1/chat/completions, POST /v1/files, POST /v1/batches,
+#              GET  /v1/batches/<id>, GET /v1/files/<id>/content
+# Transcripts: GET  /transcripts/<video_id>
+#
+# Point the CLI at it with YOUTUBE_API_ENDPOINT=http://127.0.0.1:8765/ OPENAI_BASE_URL=http://127.0.0.1:8765/v1
+
+import argparse
+import email
+import itertools
+import json
+import random
+import re
+import threading
+import time
+import zlib
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from urllib.parse import parse_qs, urlparse
+
+# Every fake channel has this many uploads, newest first; video N is published N minutes after 2017-07-14
+CHANNEL_SIZE = 20000
+
+
+class FakeConfig:
+    def __init__(self, latency_ms=30, jitter_ms=10, rate_limit_rate=0.0, error_rate=0.0,
+                 llm_latency_ms=None, transcript_latency_ms=None, no_transcript_rate=0.1,
+                 fault_services=("youtube", "openai", "transcripts"), requests_per_minute=10000, tokens_per_minute=2000000,
+                 batch_seconds=2.0, seed=0):
+        self.latency_ms = latency_ms
+        self.jitter_ms = jitter_ms
+        self.rate_limit_rate = rate_limit_rate
+        self.error_rate = error_rate
+        self.llm_latency_ms = latency_ms if llm_latency_ms is None else llm_latency_ms
+        self.transcript_latency_ms = latency_ms if transcript_latency_ms is None else transcript_latency_ms
+        self.no_transcript_rate = no_transcript_rate
+        # Every client call is retried through resilient_call, so all three services get faults by default
+        self.fault_services = set(fault_services)
+        self.requests_per_minute = requests_per_minute
+        self.tokens_per_minute = tokens_per_minute
+        self.random = random.Random(seed)
+        self.lock = threading.Lock()
+        self.counts = {}
+        # Batch API state: uploaded files and batches, which complete batch_seconds after creation
+        self.batch_seconds = batch_seconds
+        self.files = {}
+        self.batches = {}
+        self.ids = itertools.count(1)
+
+    def roll(self):
+        with self.lock:
+            return self.random.random()
+
+    def count(self, endpoint):
+        with self.lock:
+            self.counts[endpoint] = self.counts.get(endpoint, 0) + 1
+
+
+def _video_id(n):
+    return f"v{n:010d}"
+
+def _video_number(video_id):
+    try:
+        return int(video_id.lstrip("v"))
+    except ValueError:
+        return -1
+
+def _published(n):
+    return time.strftime("%Y-%m-%dT%H:%M:%SZ", time.gmtime(1500000000 + n * 60))
+
+def _video_item(n):
+    return {
+        "kind": "youtube#video",
+        "etag": f"etag-{n}",
+        "id": _video_id(n),
+        "snippet": {
+            "title": f"Benchmark video {n}",
+            "description": f"Description for benchmark video {n}. " * 20,
+            "tags": [f"tag{n % 7}", f"tag{n % 11}", "benchmark"],
+            "publishedAt": _published(n),
+        },
+        "statistics": {"viewCount": str(n * 17 % 100000)},
+    }
+
+
+class FakeHandler(BaseHTTPRequestHandler):
+    config = FakeConfig()
+    protocol_version = "HTTP/1.1"
+
+    def log_message(self, format, *args):
+        pass
+
+    def _sleep(self, base_ms):
+        jitter = self.config.jitter_ms * (self.config.roll() * 2 - 1)
+        time.sleep(max(0.0, base_ms + jitter) / 1000)
+
+    def _send(self, status, body, headers=None):
+        payload = json.dumps(body).encode("utf-8")
+        self.send_response(status)
+        self.send_header("Content-Type", "application/json")
+        self.send_header("Content-Length", str(len(payload)))
+        for name, value in (headers or {}).items():
+            self.send_header(name, value)
+        self.end_headers()
+        self.wfile.write(payload)
+
+    def _maybe_fail(self, service):
+        if service not in self.config.fault_services:
+            return False
+        roll = self.config.roll()
+        if roll < self.config.rate_limit_rate:
+            self._send(429, {"error": {"code": 429, "message": "Rate limit exceeded (fake)"}}, {"Retry-After": "1"})
+            return True
+        if roll < self.config.rate_limit_rate + self.config.error_rate:
+            self._send(500, {"error": {"code": 500, "message": "Backend error (fake)"}})
+            return True
+        return False
+
+    def do_GET(self):
+        url = urlparse(self.path)
+        query = {k: v[0] for k, v in parse_qs(url.query).items()}
+        endpoint = url.path.rstrip("/").split("/")[-1]
+        if url.path.startswith("/v1/batches/"):
+            self._get_batch(endpoint)
+            return
+        if url.path.startswith("/v1/files/") and endpoint == "content":
+            self._get_file_content(url.path.split("/")[3])
+            return
+        if url.path.startswith("/transcripts/"):
+            self.config.count("transcripts")
+            self._sleep(self.config.transcript_latency_ms)
+            if self._maybe_fail("transcripts"):
+                return
+            n = _video_number(endpoint)
+            if self.config.roll() < self.config.no_transcript_rate:
+                self._send(404, {"error": "no transcript"})
+            else:
+                segments = [{"text": f"segment {i} of video {n}", "start": i * 5.0, "duration": 5.0} for i in range(120)]
+                self._send(200, segments)
+            return
+        if not url.path.startswith("/youtube/v3/"):
+            self._send(404, {"error": {"code": 404, "message": "Unknown path"}})
+            return
+
+        self.config.count(endpoint)
+        self._sleep(self.config.latency_ms)
+        if self._maybe_fail("youtube"):
+            return
+        if endpoint == "videos":
+            ids = [vid for vid in query.get("id", "").split(",") if vid]
+            items = [_video_item(_video_number(vid)) for vid in ids if 0 <= _video_number(vid) < CHANNEL_SIZE]
+            self._send(200, {"kind": "youtube#videoListResponse", "items": items})
+        elif endpoint == "channels":
+            channel_id = query.get("id", "")
+            self._send(200, {"items": [{"id": channel_id, "contentDetails": {
+                "relatedPlaylists": {"uploads": "UU" + channel_id[2:]}}}]})
+        elif endpoint == "playlistItems":
+            start = int(query.get("pageToken") or 0)
+            size = int(query.get("maxResults", 50))
+            numbers = range(CHANNEL_SIZE - 1 - start, max(-1, CHANNEL_SIZE - 1 - start - size), -1)
+            items = [{"snippet": {"publishedAt": _published(n)},
+                      "contentDetails": {"videoId": _video_id(n), "videoPublishedAt": _published(n)}} for n in numbers]
+            body = {"items": items}
+            if start + size < CHANNEL_SIZE:
+                body["nextPageToken"] = str(start + size)
+            self._send(200, body)
+        elif endpoint == "search":
+            size = int(query.get("maxResults", 5))
+            offset = zlib.crc32(query.get("q", "").encode("utf-8")) % (CHANNEL_SIZE - size)
+            items = [{"id": {"kind": "youtube#video", "videoId": _video_id(offset + i)}} for i in range(size)]
+            self._send(200, {"items": items})
+        else:
+            self._send(404, {"error": {"code": 404, "message": f"Unknown endpoint {endpoint}"}})
+
+    def do_POST(self):
+        length = int(self.headers.get("Content-Length", 0))
+        body = self.rfile.read(length)
+        path = self.path.rstrip("/")
+        if path == "/v1/files":
+            self._upload_file(body)
+            return
+        request = json.loads(body or b"{}")
+        if path == "/v1/batches":
+            self._create_batch(request)
+            return
+        if path != "/v1/chat/completions":
+            self._send(404, {"error": {"message": "Unknown path"}})
+            return
+        self.config.count("chat.completions")
+        self._sleep(self.config.llm_latency_ms)
+        if self._maybe_fail("openai"):
+            return
+        completion = _chat_completion(request)
+        prompt_tokens = completion["usage"]["prompt_tokens"]
+        self._send(200, completion, {
+            "x-ratelimit-limit-requests": str(self.config.requests_per_minute),
+            "x-ratelimit-limit-tokens": str(self.config.tokens_per_minute),
+            "x-ratelimit-remaining-requests": str(self.config.requests_per_minute - 1),
+            "x-ratelimit-remaining-tokens": str(self.config.tokens_per_minute - prompt_tokens),
+        })
+
+    def _upload_file(self, body):
+        self.config.count("files.create")
+        message = email.message_from_bytes(
+            b"Content-Type: " + self.headers["Content-Type"].encode("latin-1") + b"\r\n\r\n" + body
+        )
+        upload = next(part for part in message.get_payload() if part.get_param("name", header="content-disposition") == "file")
+        content = upload.get_payload(decode=True)
+        file = {"id": f"file-{next(self.config.ids)}", "object": "file", "bytes": len(content),
+                "created_at": int(time.time()), "filename": upload.get_filename() or "input.jsonl",
+                "purpose": "batch", "status": "processed"}
+        with self.config.lock:
+            self.config.files[file["id"]] = (file, content)
+        self._send(200, file)
+
+    def _create_batch(self, request):
+        self.config.count("batches.create")
+        with self.config.lock:
+            stored = self.config.files.get(request.get("input_file_id"))
+        if stored is None:
+            self._send(404, {"error": {"message": "No such file"}})
+            return
+        lines = [json.loads(line) for line in stored[1].decode("utf-8").splitlines() if line.strip()]
+        batch = {"id": f"batch_{next(self.config.ids)}", "object": "batch", "endpoint": request["endpoint"],
+                 "input_file_id": request["input_file_id"], "completion_window": request["completion_window"],
+                 "status": "in_progress", "created_at": int(time.time()), "metadata": request.get("metadata"),
+                 "output_file_id": None, "error_file_id": None,
+                 "request_counts": {"total": len(lines), "completed": 0, "failed": 0}}
+        with self.config.lock:
+            self.config.batches[batch["id"]] = (batch, lines, time.monotonic() + self.config.batch_seconds)
+        self._send(200, batch)
+
+    def _get_batch(self, batch_id):
+        with self.config.lock:
+            stored = self.config.batches.get(batch_id)
+        if stored is None:
+            self._send(404, {"error": {"message": "No such batch"}})
+            return
+        batch, lines, ready_at = stored
+        if batch["status"] == "in_progress" and time.monotonic() >= ready_at:
+            # Answers every request now; error_rate decides which ones fail
+            output, errors = [], []
+            for line in lines:
+                if self.config.roll() < self.config.error_rate:
+                    errors.append({"id": f"batch_req_{next(self.config.ids)}", "custom_id": line["custom_id"],
+                                   "response": {"status_code": 500, "body": {"error": {"message": "fake failure"}}},
+                                   "error": None})
+                else:
+                    output.append({"id": f"batch_req_{next(self.config.ids)}", "custom_id": line["custom_id"],
+                                   "response": {"status_code": 200, "body": _chat_completion(line["body"])},
+                                   "error": None})
+            for key, rows in (("output_file_id", output), ("error_file_id", errors)):
+                if rows:
+                    content = "".join(json.dumps(row) + "\n" for row in rows).encode("utf-8")
+                    file_id = f"file-{next(self.config.ids)}"
+                    with self.config.lock:
+                        self.config.files[file_id] = ({"id": file_id}, content)
+                    batch[key] = file_id
+            batch["request_counts"] = {"total": len(lines), "completed": len(output), "failed": len(errors)}
+            batch["status"] = "completed"
+            batch["completed_at"] = int(time.time())
+        self._send(200, batch)
+
+    def _get_file_content(self, file_id):
+        with self.config.lock:
+            stored = self.config.files.get(file_id)
+        if stored is None:
+            self._send(404, {"error": {"message": "No such file"}})
+            return
+        self.send_response(200)
+        self.send_header("Content-Type", "application/octet-stream")
+        self.send_header("Content-Length", str(len(stored[1])))
+        self.end_headers()
+        self.wfile.write(stored[1])
+
+
+def _chat_completion(request):
+    prompt = " ".join(m.get("content", "") for m in request.get("messages", []))
+    response_format = request.get("response_format") or {}
+    seo = {"title": "Fake title", "description": "Fake description", "hashtags": ["#fake", "#bench"],
+           "keywords": ["fake keyword"]}
+    if response_format.get("json_schema", {}).get("name") == "seo_batch":
+        # Batched SEO prompts embed each video as JSON; answer once per video_id
+        video_ids = re.findall(r'"video_id": "([^"]+)"', prompt)
+        content = json.dumps({"videos": [dict(seo, video_id=vid) for vid in video_ids]})
+    elif response_format.get("type") == "json_schema":
+        content = json.dumps(seo)
+    else:
+        content = f"**SEO Title:** Fake title\n\n**Description:** {prompt[:200]}\n\n**Hashtags:** #fake #bench"
+    prompt_tokens = len(prompt) // 4
+    return {
+        "id": "chatcmpl-fake",
+        "object": "chat.completion",
+        "created": int(time.time()),
+        "model": request.get("model", "gpt-4o"),
+        "choices": [{"index": 0, "finish_reason": "stop", "message": {"role": "assistant", "content": content}}],
+        "usage": {"prompt_tokens": prompt_tokens, "completion_tokens": 60, "total_tokens": prompt_tokens + 60},
+    }
+
+
+def serve(config, host="127.0.0.1", port=0):
+    # Returns the running server; port=0 picks a free port (see server.server_address)
+    handler = type("ConfiguredFakeHandler", (FakeHandler,), {"config": config})
+    server = ThreadingHTTPServer((host, port), handler)
+    server.daemon_threads = True
+    threading.Thread(target=server.serve_forever, daemon=True).start()
+    return server
+
+
+def add_config_arguments(parser):
+    parser.add_argument("--latency-ms", type=float, default=30)
+    parser.add_argument("--jitter-ms", type=float, default=10)
+    parser.add_argument("--llm-latency-ms", type=float, help="Chat completion latency (default: --latency-ms)")
+    parser.add_argument("--transcript-latency-ms", type=float, help="Transcript latency (default: --latency-ms)")
+    parser.add_argument("--rate-limit-rate", type=float, default=0.0, help="Fraction of requests answered with 429")
+    parser.add_argument("--error-rate", type=float, default=0.0, help="Fraction of requests answered with 500")
+    parser.add_argument("--no-transcript-rate", type=float, default=0.1)
+    parser.add_argument("--batch-seconds", type=float, default=2.0, help="Time until a submitted batch completes")
+    parser.add_argument("--fault-services", default="youtube,openai,transcripts",
+                        help="Comma-separated services that get 429/500 responses (youtube, openai, transcripts)")
+
+def config_from_args(args):
+    return FakeConfig(
+        latency_ms=args.latency_ms,
+        jitter_ms=args.jitter_ms,
+        rate_limit_rate=args.rate_limit_rate,
+        error_rate=args.error_rate,
+        llm_latency_ms=args.llm_latency_ms,
+        transcript_latency_ms=args.transcript_latency_ms,
+        no_transcript_rate=args.no_transcript_rate,
+        fault_services=[s for s in args.fault_services.split(",") if s],
+        batch_seconds=args.batch_seconds,
+    )
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Fake YouTube/OpenAI/transcript server for benchmarks")
+    parser.add_argument("--host", default="127.0.0.1")
+    parser.add_argument("--port", type=int, default=8765)
+    add_config_arguments(parser)
+    args = parser.parse_args(argv)
+    server = serve(config_from_args(args), args.host, args.port)
+    print(f"Fake server listening on http://{args.host}:{server.server_address[1]}")
+    try:
+        threading.Event().wait()
+    except KeyboardInterrupt:
+        server.shutdown()
+
+
+if __name__ == "__main__":
+    main()
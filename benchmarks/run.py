@@ -0,0 +1,176 @@
+# benchmarks/run.py
+#
+# End-to-end throughput benchmark against the local fake server; nothing leaves the machine.
+#
+#   python -m benchmarks.run                          # 10, 500 and 10,000 videos
+#   python -m benchmarks.run --sizes 500 --latency-ms 80 --rate-limit-rate 0.02 --json results.json
+#
+# Each size runs in its own subprocess with an empty cache directory, so peak RSS and
+# cache hit rates belong to that run alone.
+
+import argparse
+import json
+import os
+import resource
+import subprocess
+import sys
+import tempfile
+import time
+import urllib.error
+import urllib.request
+
+from benchmarks.fake_server import add_config_arguments, config_from_args, serve
+
+DEFAULT_SIZES = (10, 500, 10000)
+CHANNEL_ID = "UCbenchmark000000000000"
+
+
+def _peak_rss_mb():
+    # ru_maxrss is KiB on Linux and bytes on macOS
+    peak = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    return peak / (1024 * 1024) if sys.platform == "darwin" else peak / 1024
+
+
+def _install_fake_transcripts(youtube_handler, base_url):
+    from youtube_transcript_api import FetchedTranscriptSnippet, TranscriptsDisabled
+
+    class FakeTranscriptApi:
+        def __init__(self, http_client=None):
+            self.http_client = http_client
+
+        def fetch(self, video_id):
+            try:
+                with urllib.request.urlopen(f"{base_url}/transcripts/{video_id}", timeout=30) as response:
+                    return [FetchedTranscriptSnippet(**segment) for segment in json.load(response)]
+            except urllib.error.HTTPError as e:
+                if e.code == 404:
+                    raise TranscriptsDisabled(video_id)
+                raise
+
+    youtube_handler.YouTubeTranscriptApi = FakeTranscriptApi
+
+
+def run_size(num_videos, base_url, max_workers, transcript_workers, enable_seo, enable_transcript, output_dir,
+             trace_path=None, seo_batch_size=1, offline_seo=False):
+    # Runs inside the child process; every endpoint resolves to the fake server
+    os.environ["YOUTUBE_API_ENDPOINT"] = base_url + "/"
+
+    import utils.youtube_handler as youtube_handler
+    from utils.export import StreamingExporter
+    from utils.instagram_handler import process_instagram_urls
+    from utils.llm import get_openai_client
+    from utils.tracing import start_trace, stop_trace
+
+    _install_fake_transcripts(youtube_handler, base_url)
+    tracer = start_trace(record_events=bool(trace_path))
+    client = get_openai_client("benchmark", base_url=base_url + "/v1")
+    api_key = "benchmark"
+
+    top_tags = youtube_handler.get_top_video_tags(api_key, "benchmark")
+    out_path = os.path.join(output_dir, f"youtube_{num_videos}.jsonl")
+    start = time.perf_counter()
+    with StreamingExporter.for_path(out_path) as exporter:
+        rows = youtube_handler.handle_youtube_batch(
+            api_key, CHANNEL_ID, 0, num_videos, enable_seo, client, top_tags,
+            max_workers=max_workers, enable_transcript=enable_transcript,
+            transcript_workers=transcript_workers, sink=exporter, seo_batch_size=seo_batch_size,
+            offline_seo=offline_seo, run_id=f"bench-{num_videos}" if offline_seo else None, batch_poll_seconds=0.5
+        )
+    youtube_seconds = time.perf_counter() - start
+
+    urls = [f"https://www.instagram.com/p/bench{i}/" for i in range(num_videos)]
+    start = time.perf_counter()
+    posts = process_instagram_urls(urls, enable_seo, client, "benchmark", top_tags, max_workers=max_workers)
+    instagram_seconds = time.perf_counter() - start
+    stop_trace()
+    if trace_path:
+        tracer.write_chrome_trace(trace_path)
+
+    return {
+        "videos": num_videos,
+        "rows": rows,
+        "youtube_seconds": youtube_seconds,
+        "youtube_videos_per_sec": rows / youtube_seconds if youtube_seconds else 0.0,
+        "instagram_seconds": instagram_seconds,
+        "instagram_posts_per_sec": len(posts) / instagram_seconds if instagram_seconds else 0.0,
+        "stages": tracer.summary(),
+        "peak_rss_mb": _peak_rss_mb(),
+    }
+
+
+def _run_child(num_videos, base_url, args):
+    with tempfile.TemporaryDirectory(prefix="yt_seo_bench_") as workdir:
+        env = dict(os.environ, YT_SEO_CACHE_DIR=os.path.join(workdir, "cache"))
+        command = [
+            sys.executable, "-m", "benchmarks.run", "--child", str(num_videos), "--base-url", base_url,
+            "--workers", str(args.workers), "--transcript-workers", str(args.transcript_workers),
+            "--output-dir", workdir, "--seo-batch-size", str(args.seo_batch_size),
+        ]
+        if args.no_seo:
+            command.append("--no-seo")
+        if args.no_transcripts:
+            command.append("--no-transcripts")
+        if args.offline_seo:
+            command.append("--offline-seo")
+        if args.trace_dir:
+            os.makedirs(args.trace_dir, exist_ok=True)
+            command += ["--trace", os.path.abspath(os.path.join(args.trace_dir, f"trace_{num_videos}.json"))]
+        completed = subprocess.run(command, env=env, capture_output=True, text=True)
+        if completed.returncode != 0:
+            raise RuntimeError(f"{num_videos}-video run failed:\n{completed.stderr}")
+        return json.loads(completed.stdout.strip().splitlines()[-1])
+
+
+def print_report(results):
+    for result in results:
+        print(f"\n== {result['videos']} videos ==")
+        print(f"YouTube:   {result['youtube_videos_per_sec']:8.1f} videos/sec  ({result['youtube_seconds']:.2f}s)")
+        print(f"Instagram: {result['instagram_posts_per_sec']:8.1f} posts/sec   ({result['instagram_seconds']:.2f}s)")
+        print(f"Peak RSS:  {result['peak_rss_mb']:8.1f} MB")
+        print(f"{'stage':<16}{'calls':>8}{'total s':>10}{'p50 ms':>10}{'p99 ms':>10}")
+        for row in result["stages"]:
+            print(f"{row['stage']:<16}{row['calls']:>8}{row['total_s']:>10.2f}{row['p50_ms']:>10.1f}{row['p99_ms']:>10.1f}")
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Offline throughput benchmark for the YouTube and Instagram handlers")
+    parser.add_argument("--sizes", type=int, nargs="+", default=list(DEFAULT_SIZES))
+    parser.add_argument("--workers", type=int, default=8)
+    parser.add_argument("--transcript-workers", type=int, default=16)
+    parser.add_argument("--seo-batch-size", type=int, default=1, help="Videos per SEO request")
+    parser.add_argument("--offline-seo", action="store_true", help="Generate YouTube SEO through the fake Batch API")
+    parser.add_argument("--no-seo", action="store_true")
+    parser.add_argument("--no-transcripts", action="store_true")
+    parser.add_argument("--json", help="Also write the raw results to this file")
+    parser.add_argument("--trace-dir", help="Write a Chrome trace per size into this directory")
+    add_config_arguments(parser)
+    parser.add_argument("--child", type=int, help=argparse.SUPPRESS)
+    parser.add_argument("--base-url", help=argparse.SUPPRESS)
+    parser.add_argument("--output-dir", help=argparse.SUPPRESS)
+    parser.add_argument("--trace", help=argparse.SUPPRESS)
+    args = parser.parse_args(argv)
+
+    if args.child is not None:
+        result = run_size(args.child, args.base_url, args.workers, args.transcript_workers,
+                          not args.no_seo, not args.no_transcripts, args.output_dir, args.trace, args.seo_batch_size,
+                          args.offline_seo)
+        print(json.dumps(result))
+        return
+
+    server = serve(config_from_args(args))
+    base_url = f"http://127.0.0.1:{server.server_address[1]}"
+    results = []
+    try:
+        for size in args.sizes:
+            print(f"Running {size} videos...", file=sys.stderr)
+            results.append(_run_child(size, base_url, args))
+    finally:
+        server.shutdown()
+    print_report(results)
+    if args.json:
+        with open(args.json, "w", encoding="utf-8") as f:
+            json.dump({"config": vars(args), "results": results}, f, indent=2)
+
+
+if __name__ == "__main__":
+    main()
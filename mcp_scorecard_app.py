@@ -1,76 +1,112 @@
 
 import streamlit as st
-import requests
-from bs4 import BeautifulSoup
-import openai
 import pandas as pd
 import json
 
+from utils.concurrency import RateLimiter, run_in_pool
+from utils.export import to_excel_bytes
+from utils.llm import cached_chat_completion, get_openai_client
+from utils.mcp_rules import LLM_CRITERIA, RULES, combine_scores, parse_llm_scores, score_rules
+from utils.page_content import summarize_structure
+from utils.page_fetcher import DEFAULT_FETCH_WORKERS, fetch_page, fetch_pages, get_session, read_sitemap
+
 # Set up OpenAI API key (Streamlit Cloud users: set this in Secrets)
-openai.api_key = st.secrets["OPENAI_API_KEY"]
+client = get_openai_client(st.secrets["OPENAI_API_KEY"])
+
+# Bump when the prompt changes so cached scorecards are not reused
+SCORECARD_PROMPT_VERSION = "mcp-scorecard-v4"
+# The subjective criteria need the intro, outline and body text, but not the whole page summary
+LLM_TOKEN_BUDGET = 1000
 
 st.set_page_config(page_title="MCP Scorecard Generator", page_icon="🧠")
 st.title("🧠 MCP Scorecard Generator")
 st.markdown("Analyze a webpage for LLM SEO readiness using the Model Context Protocol (MCP).")
+st.caption(f"Scored from the page HTML without OpenAI: {', '.join(RULES)}.")
 
-# Step 1: Input URL
-url = st.text_input("🔗 Enter a webpage URL:")
+# Function to get the subjective scores from OpenAI; the rest come from utils.mcp_rules
+def generate_mcp_scorecard(content, url, limiter=None):
+    criteria = "\n".join(f"- {name}" for name in LLM_CRITERIA)
+    prompt = f"""
+You are a content auditor evaluating SEO visibility for Large Language Models (LLMs). Review the following webpage summary and score it (0 = No, 1 = Yes) for the criteria below:
 
-# Function to fetch and clean page content
-def fetch_page_content(url):
-    try:
-        headers = {"User-Agent": "Mozilla/5.0"}
-        res = requests.get(url, headers=headers, timeout=10)
-        soup = BeautifulSoup(res.text, 'html.parser')
-        return soup.get_text(separator=' ', strip=True)
-    except Exception as e:
-        return f"Error fetching URL: {e}"
+{criteria}
 
-# Function to get scorecard from OpenAI
-def generate_mcp_scorecard(content, url):
-    prompt = f"""
-You are a content auditor evaluating SEO visibility for Large Language Models (LLMs). Review the following webpage content and score it (0 = No, 1 = Yes) for the 10 criteria below:
-
-1. Title follows prompt style
-2. Clear intro that answers query
-3. Structured subheadings
-4. Includes FAQs
-5. Uses bullets or lists
-6. Author/source/credibility present
-7. Schema markup present
-8. Conversational tone
-9. LLM-friendly (likely to be summarized)
-10. Recently updated
-
-Respond with a JSON object including the URL and the 10 binary scores plus total.
-
-Webpage content:
+Respond with a JSON object whose keys are exactly the criteria above and whose values are 0 or 1.
+
+The summary was extracted from the page HTML with navigation, footers and scripts removed. It lists the title, meta description, author and dates, JSON-LD schema types, intro, heading outline, lists and FAQs, followed by body text.
+
+Webpage summary:
 """
-    prompt += content[:6000]  # Limit to 6000 characters
+    prompt += content
 
-    response = openai.ChatCompletion.create(
-        model="gpt-4o",
-        messages=[{"role": "user", "content": prompt}],
-        temperature=0.3
+    return cached_chat_completion(
+        client, prompt, {"prompt": SCORECARD_PROMPT_VERSION, "url": url, "content": content},
+        limiter=limiter, parse=parse_llm_scores, temperature=0.3, response_format={"type": "json_object"}
     )
 
-    return response.choices[0].message['content']
+def score_page(page, limiter=None):
+    if page.get("error"):
+        return {"url": page["url"], "error": page["error"]}
+    structure = page["structure"]
+    try:
+        llm_scores = generate_mcp_scorecard(summarize_structure(structure, LLM_TOKEN_BUDGET), page["url"], limiter)
+    except Exception as e:
+        return {"url": page["url"], "error": f"OpenAI Error: {e}"}
+    return {"url": page["url"], "title": page.get("title", ""), **combine_scores(score_rules(structure), llm_scores)}
 
-# Step 2: Run analysis
-if url:
-    with st.spinner("🔍 Fetching and analyzing the content..."):
-        content = fetch_page_content(url)
-        if content.startswith("Error"):
-            st.error(content)
-        else:
-            scorecard_raw = generate_mcp_scorecard(content, url)
-            st.subheader("✅ MCP Scorecard JSON Output")
-            st.code(scorecard_raw, language="json")
+mode = st.radio("Mode", ["Single URL", "Bulk (URL list or sitemap)"], horizontal=True)
+
+if mode == "Single URL":
+    # Step 1: Input URL
+    url = st.text_input("🔗 Enter a webpage URL:")
+
+    # Step 2: Run analysis
+    if url:
+        with st.spinner("🔍 Fetching and analyzing the content..."):
+            score_data = score_page(fetch_page(get_session(), url))
+            if score_data.get("error"):
+                st.error(score_data["error"])
+            else:
+                st.subheader("✅ MCP Scorecard JSON Output")
+                st.code(json.dumps(score_data, indent=2), language="json")
 
-            try:
-                score_data = json.loads(scorecard_raw)
                 df = pd.DataFrame([score_data])
                 st.subheader("📊 Parsed MCP Scorecard Table")
                 st.dataframe(df)
+else:
+    urls_text = st.text_area("🔗 Enter URLs (one per line):")
+    uploaded = st.file_uploader("...or upload a .txt file with one URL per line", type=["txt"])
+    sitemap_url = st.text_input("...or enter a sitemap URL:")
+    max_pages = st.number_input("Max pages", min_value=1, max_value=50000, value=1000)
+    fetch_workers = st.slider("Parallel page fetches", min_value=1, max_value=64, value=DEFAULT_FETCH_WORKERS)
+    score_workers = st.slider("Parallel OpenAI requests", min_value=1, max_value=32, value=8)
+
+    if st.button("Run bulk audit"):
+        urls = [line.strip() for line in urls_text.splitlines() if line.strip()]
+        if uploaded:
+            urls += [line.strip() for line in uploaded.read().decode("utf-8").splitlines() if line.strip()]
+        if sitemap_url:
+            try:
+                urls += read_sitemap(sitemap_url, limit=int(max_pages))
             except Exception as e:
-                st.warning("⚠️ Unable to parse the output. Please check JSON formatting.")
+                st.error(f"Error reading sitemap: {e}")
+        urls = list(dict.fromkeys(urls))[:int(max_pages)]
+
+        if not urls:
+            st.warning("Please enter at least one URL or a sitemap.")
+        else:
+            progress = st.progress(0, text="Fetching pages...")
+            pages = fetch_pages(urls, max_workers=fetch_workers,
+                                on_progress=lambda done, total: progress.progress(done / total, text=f"Fetched {done}/{total} pages"))
+            limiter = RateLimiter()
+            results = run_in_pool(lambda page: score_page(page, limiter), pages, max_workers=score_workers,
+                                  on_progress=lambda done, total: progress.progress(done / total, text=f"Scored {done}/{total} pages"))
+            progress.empty()
+
+            failed = sum(1 for result in results if result.get("error"))
+            st.success(f"Scored {len(results) - failed} of {len(results)} pages.")
+            st.subheader("📊 MCP Scorecards")
+            st.dataframe(pd.DataFrame(results))
+            st.download_button("Download Excel", data=to_excel_bytes(results, sheet_name="Scorecards"),
+                               file_name="mcp_scorecards.xlsx",
+                               mime="application/vnd.openxmlformats-officedocument.spreadsheetml.sheet")
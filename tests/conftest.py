@@ -0,0 +1,164 @@
+# tests/conftest.py
+
+import datetime
+import os
+import tempfile
+import threading
+from types import SimpleNamespace
+
+import pytest
+
+# utils.cache reads this at import time, so caches, journals and indexes never touch ~/.cache
+os.environ["YT_SEO_CACHE_DIR"] = tempfile.mkdtemp(prefix="yt_seo_tests_")
+
+
+class FakeRequest:
+    def __init__(self, handler, kwargs):
+        self.handler = handler
+        self.kwargs = kwargs
+
+    def execute(self):
+        return self.handler(**self.kwargs)
+
+
+class FakeResource:
+    def __init__(self, handler):
+        self.handler = handler
+
+    def list(self, **kwargs):
+        return FakeRequest(self.handler, kwargs)
+
+
+class FakeYouTube:
+    """In-memory stand-in for the YouTube Data API client: one channel, uploads newest first.
+
+    search_results maps a search query to the video IDs it ranks, or to an
+    exception the search raises.
+    """
+
+    def __init__(self, num_uploads, page_size=50, channel_id="UCfake", search_results=None):
+        self.channel_id = channel_id
+        self.page_size = page_size
+        self.uploads = [self.video_id(n) for n in reversed(range(num_uploads))]
+        self.search_results = search_results or {}
+        self.calls = {"channels": 0, "playlistItems": 0, "videos": 0, "search": 0}
+        self.requested_ids = []
+        self.video_fields = []
+
+    @staticmethod
+    def video_id(n):
+        return f"vid{n:08d}"
+
+    @staticmethod
+    def published(video_id):
+        start = datetime.datetime(2020, 1, 1, tzinfo=datetime.timezone.utc)
+        return (start + datetime.timedelta(hours=int(video_id[3:]))).strftime("%Y-%m-%dT%H:%M:%SZ")
+
+    def publish(self, count):
+        # New uploads go to the front of the playlist, as on YouTube
+        newest = int(self.uploads[0][3:]) + 1 if self.uploads else 0
+        self.uploads[:0] = [self.video_id(n) for n in reversed(range(newest, newest + count))]
+
+    def channels(self):
+        return FakeResource(self._channels)
+
+    def playlistItems(self):
+        return FakeResource(self._playlist_items)
+
+    def videos(self):
+        return FakeResource(self._videos)
+
+    def search(self):
+        return FakeResource(self._search)
+
+    def _channels(self, part, id):
+        self.calls["channels"] += 1
+        if id != self.channel_id:
+            return {"items": []}
+        return {"items": [{"contentDetails": {"relatedPlaylists": {"uploads": "UU" + id[2:]}}}]}
+
+    def _playlist_items(self, part, playlistId, maxResults, pageToken=None):
+        self.calls["playlistItems"] += 1
+        start = int(pageToken or 0)
+        page = self.uploads[start:start + self.page_size]
+        res = {"items": [{
+            "contentDetails": {"videoId": vid, "videoPublishedAt": self.published(vid)},
+            "snippet": {"publishedAt": self.published(vid)},
+        } for vid in page]}
+        if start + len(page) < len(self.uploads):
+            res["nextPageToken"] = str(start + len(page))
+        return res
+
+    def _videos(self, part, id, maxResults=None, fields=None):
+        self.calls["videos"] += 1
+        self.requested_ids.extend(id.split(","))
+        self.video_fields.append(fields)
+        return {"items": [{
+            "id": vid,
+            "etag": f"etag-{vid}",
+            "snippet": {"title": f"Title {vid}", "description": f"About {vid}", "tags": ["fake", vid],
+                        "publishedAt": self.published(vid)},
+            "statistics": {"viewCount": "7"},
+        } for vid in id.split(",") if vid in self.uploads]}
+
+    def _search(self, q, part, type, order, maxResults, fields=None):
+        self.calls["search"] += 1
+        results = self.search_results.get(q, [])
+        if isinstance(results, Exception):
+            raise results
+        return {"items": [{"id": {"videoId": vid}} for vid in results[:maxResults]]}
+
+
+class FakeOpenAI:
+    """Chat-completions stand-in for the OpenAI client.
+
+    answer is the reply to every request, or a function called as
+    answer(prompt, **kwargs) whose exceptions fail the request. Each request's
+    model, prompt and keyword arguments are kept in `requests`.
+    """
+
+    def __init__(self, answer="answer"):
+        self.answer = answer
+        self.requests = []
+        self.lock = threading.Lock()
+        completions = SimpleNamespace(create=self._create)
+        completions.with_raw_response = completions
+        self.chat = SimpleNamespace(completions=completions)
+
+    @property
+    def prompts(self):
+        return [request["prompt"] for request in self.requests]
+
+    def _create(self, model, messages, **kwargs):
+        prompt = messages[0]["content"]
+        with self.lock:
+            self.requests.append(dict(kwargs, model=model, prompt=prompt))
+        content = self.answer(prompt, **kwargs) if callable(self.answer) else self.answer
+        response = SimpleNamespace(choices=[SimpleNamespace(message=SimpleNamespace(content=content))])
+        return SimpleNamespace(headers={}, parse=lambda: response)
+
+
+@pytest.fixture
+def fake_youtube():
+    return FakeYouTube
+
+@pytest.fixture
+def fake_openai():
+    return FakeOpenAI
+
+@pytest.fixture(autouse=True)
+def fresh_caches(tmp_path, monkeypatch):
+    # get_cache stores (LLM answers, pages, top tags, images) start empty in every test
+    from utils import cache
+
+    monkeypatch.setattr(cache, "CACHE_DIR", str(tmp_path / "cache"))
+    monkeypatch.setattr(cache, "_caches", {})
+
+
+@pytest.fixture(autouse=True)
+def fresh_endpoints(monkeypatch):
+    # Circuit breakers and AIMD limits are process-wide; every test starts with closed circuits and no backoff
+    from utils import resilience
+
+    monkeypatch.setattr(resilience, "_endpoints", {})
+    monkeypatch.setattr(resilience.time, "sleep", lambda seconds: None)
@@ -0,0 +1,86 @@
+# tests/test_cache.py
+
+import pytest
+
+from utils import cache as cache_module
+from utils import llm
+from utils.cache import DiskCache, make_key
+from utils.llm import cached_chat_completion, get_openai_client, remember_completion
+
+
+@pytest.fixture
+def disk_cache(tmp_path):
+    return DiskCache(str(tmp_path / "cache.sqlite3"))
+
+
+def test_make_key_is_stable_and_order_insensitive_for_dicts():
+    assert make_key("v1", {"a": 1, "b": [1, 2]}) == make_key("v1", {"b": [1, 2], "a": 1})
+    assert make_key("v1", {"a": 1}) != make_key("v2", {"a": 1})
+
+def test_values_round_trip_as_json(disk_cache):
+    disk_cache.set("k", {"title": "Ünïcode", "tags": ["a", "b"]})
+    assert disk_cache.get("k") == {"title": "Ünïcode", "tags": ["a", "b"]}
+    assert disk_cache.get("missing") is None
+    disk_cache.delete("k")
+    assert disk_cache.get("k") is None
+
+def test_entries_expire_after_the_ttl(tmp_path, monkeypatch):
+    now = [1000.0]
+    monkeypatch.setattr(cache_module.time, "time", lambda: now[0])
+    store = DiskCache(str(tmp_path / "ttl.sqlite3"), ttl_seconds=60)
+    store.set("k", 1)
+    now[0] += 59
+    assert store.get("k") == 1
+    now[0] += 2
+    assert store.get("k") is None
+
+def test_eviction_drops_least_recently_used_entries_first(tmp_path, monkeypatch):
+    now = [1000.0]
+    monkeypatch.setattr(cache_module.time, "time", lambda: now[0])
+    store = DiskCache(str(tmp_path / "lru.sqlite3"), max_bytes=250)
+    for key in ("a", "b", "c"):
+        now[0] += 1
+        store.set(key, "x" * 100)
+    now[0] += 1
+    store.get("a")
+    store.evict()
+    assert store.get("a") is not None
+    assert store.get("b") is None
+    assert store.get("c") is not None
+
+def test_cached_chat_completion_calls_the_api_once_per_key(fake_openai):
+    client = fake_openai()
+    fields = {"template": "test-v1", "title": "cached once"}
+    assert cached_chat_completion(client, "prompt", fields) == "answer"
+    assert cached_chat_completion(client, "a different prompt", fields) == "answer"
+    assert len(client.prompts) == 1
+    cached_chat_completion(client, "prompt", fields, force_refresh=True)
+    assert len(client.prompts) == 2
+
+def test_cached_chat_completion_caches_parsed_answers_only(fake_openai):
+    client = fake_openai("not a number")
+    fields = {"template": "test-v1", "title": "parse failure"}
+    with pytest.raises(ValueError):
+        cached_chat_completion(client, "prompt", fields, parse=int)
+    client.answer = "42"
+    assert cached_chat_completion(client, "prompt", fields, parse=int) == 42
+    assert cached_chat_completion(client, "prompt", fields, parse=int) == 42
+    assert len(client.prompts) == 2
+
+def test_remember_completion_is_found_by_cached_chat_completion(fake_openai):
+    client = fake_openai()
+    fields = {"template": "test-v1", "title": "from the batch api"}
+    remember_completion("remembered", fields)
+    assert cached_chat_completion(client, "prompt", fields) == "remembered"
+    assert client.prompts == []
+
+def test_one_openai_client_is_shared_per_key(monkeypatch):
+    monkeypatch.setattr(llm, "_clients", {})
+    client = get_openai_client("sk-one")
+    assert get_openai_client("sk-one") is client
+    assert get_openai_client("sk-two") is not client
+    assert get_openai_client("sk-one", base_url="http://127.0.0.1:1/v1") is not client
+    assert len(llm._clients) == 3
+    # resilient_call does the retrying, so the SDK must not retry underneath it
+    assert client.max_retries == 0
+    assert get_openai_client("") is None
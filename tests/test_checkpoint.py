@@ -0,0 +1,63 @@
+# tests/test_checkpoint.py
+
+import json
+import threading
+
+import pytest
+
+from utils.checkpoint import Checkpoint
+from utils.youtube_handler import handle_youtube_ids
+
+
+def test_records_survive_a_restart(tmp_path):
+    checkpoint = Checkpoint("run-1", directory=str(tmp_path))
+    checkpoint.append({"video_id": "a", "title": "First"})
+    checkpoint.append({"video_id": "b", "title": "Second"})
+
+    resumed = Checkpoint("run-1", directory=str(tmp_path))
+    assert resumed.completed_ids() == {"a", "b"}
+    assert resumed.completed()["b"] == {"video_id": "b", "title": "Second"}
+
+def test_a_torn_last_line_is_dropped_before_appending(tmp_path):
+    checkpoint = Checkpoint("torn", directory=str(tmp_path))
+    checkpoint.append({"video_id": "a"})
+    checkpoint.append({"video_id": "b"})
+    with open(checkpoint.path, "ab") as f:
+        f.write(b'{"video_id": "c", "ti')
+
+    resumed = Checkpoint("torn", directory=str(tmp_path))
+    assert resumed.completed_ids() == {"a", "b"}
+    resumed.append({"video_id": "c"})
+    with open(checkpoint.path, encoding="utf-8") as f:
+        assert [json.loads(line)["video_id"] for line in f] == ["a", "b", "c"]
+
+@pytest.mark.parametrize("run_id", ["", "../escape", "with space", "a/b"])
+def test_run_ids_cannot_leave_the_runs_directory(tmp_path, run_id):
+    with pytest.raises(ValueError):
+        Checkpoint(run_id, directory=str(tmp_path))
+
+def test_concurrent_appends_never_interleave(tmp_path):
+    checkpoint = Checkpoint("threads", directory=str(tmp_path))
+
+    def write(worker):
+        for n in range(50):
+            checkpoint.append({"video_id": f"{worker}-{n}", "payload": "x" * 500})
+
+    threads = [threading.Thread(target=write, args=(worker,)) for worker in range(8)]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+    assert len(Checkpoint("threads", directory=str(tmp_path)).completed()) == 400
+
+def test_resumed_exports_skip_journaled_videos(fake_youtube, monkeypatch):
+    youtube = fake_youtube(6)
+    monkeypatch.setattr("utils.youtube_handler.get_youtube", lambda api_key: youtube)
+    ids = youtube.uploads
+    Checkpoint("resume-export").append({"video_id": ids[1], "title": "From the journal"})
+
+    records = handle_youtube_ids("key", ids, False, None, [], enable_transcript=False, run_id="resume-export")
+    assert [r["video_id"] for r in records] == ids
+    assert records[1]["title"] == "From the journal"
+    assert sorted(youtube.requested_ids) == sorted(set(ids) - {ids[1]})
+    assert Checkpoint("resume-export").completed_ids() == set(ids)
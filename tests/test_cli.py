@@ -0,0 +1,67 @@
+# tests/test_cli.py
+
+import argparse
+import json
+
+import pytest
+
+from yt_seo.cli import main, parse_shard
+
+
+@pytest.fixture
+def youtube(fake_youtube, monkeypatch):
+    youtube = fake_youtube(10, channel_id="UCcli")
+    monkeypatch.setattr("utils.youtube_handler.get_youtube", lambda api_key: youtube)
+    monkeypatch.setattr("yt_seo.cli.get_youtube", lambda api_key: youtube)
+    return youtube
+
+def read_jsonl(path):
+    with open(path, encoding="utf-8") as f:
+        return [json.loads(line) for line in f]
+
+
+def test_shards_parse_as_index_and_count():
+    assert parse_shard("1/4") == (1, 4)
+    for value in ("4/4", "-1/2", "0/0", "one/two", "3"):
+        with pytest.raises(argparse.ArgumentTypeError):
+            parse_shard(value)
+
+def test_video_ids_export_in_order(youtube, tmp_path):
+    out = tmp_path / "videos.jsonl"
+    assert main(["export", "--video", "vid00000003", "--video", "vid00000001", "--youtube-key", "key",
+                 "--out", str(out)]) == 0
+    rows = read_jsonl(out)
+    assert [row["video_id"] for row in rows] == ["vid00000003", "vid00000001"]
+    assert rows[0]["title"] == "Title vid00000003" and rows[0]["seo_title"] is None
+
+def test_channel_shards_split_the_uploads(youtube, tmp_path):
+    ids = []
+    for index in range(3):
+        out = tmp_path / f"part{index}.jsonl"
+        main(["export", "--channel", "UCcli", "--count", "10", "--shard", f"{index}/3", "--youtube-key", "key",
+              "--out", str(out)])
+        ids.append([row["video_id"] for row in read_jsonl(out)])
+    assert sorted(sum(ids, [])) == sorted(youtube.uploads)
+    assert ids[0] == youtube.uploads[0::3]
+
+def test_estimate_only_prints_the_quota_cost(youtube, tmp_path, capsys):
+    assert main(["export", "--channel", "UCcli", "--count", "120", "--topic", "cats", "--estimate-only",
+                 "--youtube-key", "key", "--out", str(tmp_path / "never.csv")]) == 0
+    # channels.list + 3 playlist pages + 3 videos.list pages, plus search.list and videos.list for the topic
+    assert "Estimated quota: 108 units" in capsys.readouterr().err
+    assert not (tmp_path / "never.csv").exists()
+    assert youtube.calls == {"channels": 0, "playlistItems": 0, "videos": 0, "search": 0}
+
+def test_estimating_a_channel_shard_lists_nothing(youtube, tmp_path, capsys):
+    assert main(["export", "--channel", "UCcli", "--count", "120", "--shard", "1/3", "--estimate-only",
+                 "--youtube-key", "key", "--out", str(tmp_path / "never.csv")]) == 0
+    # The shared listing (channels.list + 3 playlist pages) plus one videos.list for this shard's 40 videos
+    assert "Estimated quota: 5 units" in capsys.readouterr().err
+    assert youtube.calls == {"channels": 0, "playlistItems": 0, "videos": 0, "search": 0}
+
+def test_missing_keys_stop_the_export(tmp_path, monkeypatch):
+    monkeypatch.delenv("OPENAI_API_KEY", raising=False)
+    with pytest.raises(SystemExit, match="YouTube API key"):
+        main(["export", "--video", "x", "--youtube-key", "", "--out", str(tmp_path / "out.csv")])
+    with pytest.raises(SystemExit, match="OpenAI API key"):
+        main(["export", "--video", "x", "--seo", "--youtube-key", "key", "--out", str(tmp_path / "out.csv")])
@@ -0,0 +1,70 @@
+# tests/test_concurrency.py
+
+import threading
+import time
+
+import pytest
+
+from utils import concurrency
+from utils.concurrency import RateLimiter, TokenBucket, run_in_pool
+
+
+class FakeClock:
+    def __init__(self):
+        self.now = 1000.0
+        self.sleeps = []
+
+    def monotonic(self):
+        return self.now
+
+    def sleep(self, seconds):
+        self.sleeps.append(seconds)
+        self.now += seconds
+
+
+def test_run_in_pool_returns_results_in_input_order():
+    # Later items finish first
+    results = run_in_pool(lambda n: time.sleep((5 - n) * 0.01) or n * n, range(5), max_workers=5)
+    assert results == [0, 1, 4, 9, 16]
+
+def test_run_in_pool_reports_progress_on_the_calling_thread():
+    caller = threading.get_ident()
+    calls = []
+    run_in_pool(lambda n: n, range(4), max_workers=2,
+                on_progress=lambda done, total: calls.append((done, total, threading.get_ident())))
+    assert [(done, total) for done, total, _ in calls] == [(1, 4), (2, 4), (3, 4), (4, 4)]
+    assert {thread for _, _, thread in calls} == {caller}
+
+def test_run_in_pool_handles_empty_input_and_raises_worker_errors():
+    assert run_in_pool(lambda n: n, []) == []
+    with pytest.raises(ZeroDivisionError):
+        run_in_pool(lambda n: 1 / n, [1, 0, 2])
+
+def test_token_bucket_lets_oversized_requests_through_once_full():
+    bucket = TokenBucket(capacity=10, refill_per_second=2)
+    assert bucket.wait_time(50) == 0.0
+    bucket.level = 4
+    assert bucket.wait_time(50) == pytest.approx(3.0)
+    assert bucket.wait_time(6) == pytest.approx(1.0)
+
+def test_rate_limiter_waits_for_the_token_bucket(monkeypatch):
+    clock = FakeClock()
+    monkeypatch.setattr(concurrency, "time", clock)
+    limiter = RateLimiter(requests_per_minute=600, tokens_per_minute=60)
+    limiter.acquire(60)
+    assert clock.sleeps == []
+    limiter.acquire(30)
+    # 30 tokens at one token per second
+    assert sum(clock.sleeps) == pytest.approx(30.0)
+
+def test_rate_limiter_follows_ratelimit_headers():
+    limiter = RateLimiter(requests_per_minute=500, tokens_per_minute=30000)
+    limiter.update_from_headers({
+        "x-ratelimit-limit-requests": "60",
+        "x-ratelimit-remaining-requests": "5",
+        "x-ratelimit-limit-tokens": "bogus",
+    })
+    assert limiter.requests.capacity == 60
+    assert limiter.requests.refill_per_second == 1
+    assert limiter.requests.level == 5
+    assert limiter.tokens.capacity == 30000
@@ -0,0 +1,108 @@
+# tests/test_export.py
+
+import csv
+import json
+import random
+from concurrent.futures import ThreadPoolExecutor
+
+import pytest
+
+from utils.export import OrderedSink, StreamingExporter, TextPolicy, to_excel_bytes
+
+RECORDS = [
+    {"video_id": "a", "title": "First", "seo_hashtags": ["#one", "#two"], "views": "10", "extra": "dropped"},
+    {"video_id": "b", "title": "Ünïcode, \"quoted\"", "seo_hashtags": [], "views": "3"},
+]
+COLUMNS = ["video_id", "title", "seo_hashtags", "views", "description"]
+
+
+class ListWriter:
+    def __init__(self):
+        self.rows = []
+
+    def write(self, record):
+        self.rows.append(record)
+
+
+def export(tmp_path, fmt, records=RECORDS, **kwargs):
+    path = str(tmp_path / f"out.{fmt}")
+    with StreamingExporter.for_path(path, columns=COLUMNS, **kwargs) as exporter:
+        for record in records:
+            exporter.write(record)
+    assert exporter.rows == len(records)
+    return path
+
+
+def test_ordered_sink_holds_only_the_gap():
+    writer = ListWriter()
+    sink = OrderedSink(writer)
+    sink.put(2, "c")
+    sink.put(1, "b")
+    assert writer.rows == [] and len(sink.pending) == 2
+    sink.put(0, "a")
+    assert writer.rows == ["a", "b", "c"] and sink.pending == {}
+    sink.put(3, "d")
+    assert writer.rows == ["a", "b", "c", "d"]
+
+def test_ordered_sink_restores_order_across_threads():
+    writer = ListWriter()
+    sink = OrderedSink(writer)
+    positions = list(range(500))
+    random.Random(7).shuffle(positions)
+    with ThreadPoolExecutor(max_workers=8) as pool:
+        list(pool.map(lambda position: sink.put(position, position), positions))
+    assert writer.rows == list(range(500))
+
+def test_csv_export_uses_fixed_columns_and_json_lists(tmp_path):
+    with open(export(tmp_path, "csv"), newline="", encoding="utf-8") as f:
+        rows = list(csv.DictReader(f))
+    assert list(rows[0]) == COLUMNS
+    assert rows[0]["seo_hashtags"] == '["#one", "#two"]'
+    assert rows[1]["title"] == "Ünïcode, \"quoted\""
+    assert rows[1]["description"] == ""
+
+def test_jsonl_export_keeps_lists_and_nulls(tmp_path):
+    with open(export(tmp_path, "jsonl"), encoding="utf-8") as f:
+        rows = [json.loads(line) for line in f]
+    assert rows[0] == {"video_id": "a", "title": "First", "seo_hashtags": ["#one", "#two"], "views": "10",
+                       "description": None}
+
+def test_parquet_export_writes_list_columns_in_row_groups(tmp_path):
+    pq = pytest.importorskip("pyarrow.parquet")
+    records = [dict(RECORDS[0], video_id=str(n)) for n in range(5)]
+    parquet = pq.ParquetFile(export(tmp_path, "parquet", records, row_group_size=2))
+    assert parquet.metadata.num_row_groups == 3
+    table = parquet.read()
+    assert table.column("seo_hashtags").to_pylist()[0] == ["#one", "#two"]
+    assert table.column("description").to_pylist() == [None] * 5
+
+def test_unknown_formats_are_rejected(tmp_path):
+    with pytest.raises(ValueError):
+        StreamingExporter.for_path(str(tmp_path / "out.txt"))
+
+def test_truncate_policy_only_touches_large_text_columns():
+    policy = TextPolicy("truncate", max_chars=5)
+    row = policy.apply({"video_id": "long-id-stays", "transcript": "0123456789"}, "k")
+    assert row == {"video_id": "long-id-stays", "transcript": "01234"}
+
+def test_offload_policy_writes_sidecar_files(tmp_path):
+    policy = TextPolicy("offload", max_chars=5, offload_dir=str(tmp_path / "text"))
+    row = policy.apply({"video_id": "a/b", "transcript": "0123456789", "description": "short"}, "a/b")
+    assert row["description"] == "short"
+    with open(row["transcript"], encoding="utf-8") as f:
+        assert f.read() == "0123456789"
+    assert row["transcript"].endswith("a_b.transcript.txt")
+
+def test_text_policy_validates_its_mode():
+    with pytest.raises(ValueError):
+        TextPolicy("squash")
+    with pytest.raises(ValueError):
+        TextPolicy("offload")
+
+def test_excel_bytes_use_the_union_of_record_keys():
+    openpyxl = pytest.importorskip("openpyxl")
+    workbook = openpyxl.load_workbook(to_excel_bytes(RECORDS, sheet_name="Videos"))
+    rows = list(workbook["Videos"].values)
+    assert rows[0] == ("video_id", "title", "seo_hashtags", "views", "extra")
+    assert rows[1][2] == '["#one", "#two"]'
+    assert rows[2][4] is None
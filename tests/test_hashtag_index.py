@@ -0,0 +1,83 @@
+# tests/test_hashtag_index.py
+
+import pytest
+
+from utils.hashtag_index import DECAY_EPOCH, HashtagIndex, parse_posts, post_tags
+
+DAY = 86400
+NOW = DECAY_EPOCH + 400 * DAY
+
+
+@pytest.fixture
+def index(tmp_path):
+    return HashtagIndex(str(tmp_path / "hashtags.json"))
+
+
+def test_post_tags_merge_fields_and_inline_hashtags():
+    post = {"hashtags": "#Travel, beach  #", "caption": "Sunset at the #beach with #SunSet vibes"}
+    assert post_tags(post) == ["#travel", "#beach", "#sunset"]
+    assert post_tags({"hashtags": ["#A"], "caption": None}) == ["#a"]
+
+def test_frequency_halves_every_half_life(index):
+    index.add_post({"hashtags": ["#beach"], "timestamp": NOW})
+    assert index.frequency("Beach", now=NOW) == pytest.approx(1.0)
+    assert index.frequency("#beach", now=NOW + 30 * DAY) == pytest.approx(0.5)
+    assert index.frequency("#unknown", now=NOW) == 0.0
+
+def test_top_tags_rank_related_tags_by_recent_use(index):
+    index.add_posts([
+        {"hashtags": ["#travel", "#beach"], "caption": "Weekend trip", "timestamp": NOW},
+        {"hashtags": ["#travel", "#beach"], "timestamp": NOW},
+        {"hashtags": ["#travel", "#mountains"], "timestamp": NOW - 365 * DAY},
+        {"hashtags": ["#cooking"], "caption": "Weekend trip recipes", "timestamp": NOW},
+    ])
+    assert index.top_tags("travel", n=3) == ["#travel", "#beach", "#mountains"]
+    # Caption words point at the tags they were posted with
+    assert set(index.top_tags("weekend trip")) == {"#travel", "#beach", "#cooking"}
+    assert index.top_tags("knitting") == []
+
+def test_topic_lookups_are_refreshed_by_new_posts(index):
+    index.add_post({"hashtags": ["#travel"], "timestamp": NOW})
+    assert index.top_tags("travel") == ["#travel"]
+    index.add_post({"hashtags": ["#travel", "#hiking"], "timestamp": NOW})
+    assert index.top_tags("travel") == ["#travel", "#hiking"]
+
+def test_the_index_survives_a_reload(index):
+    index.add_posts([{"hashtags": ["#travel", "#beach"], "caption": "Island trip", "timestamp": NOW}] * 2)
+    index.save()
+    reloaded = HashtagIndex(index.path)
+    assert reloaded.posts == 2
+    assert reloaded.top_tags("island") == index.top_tags("island")
+    assert reloaded.frequency("#beach", now=NOW) == pytest.approx(2.0)
+
+def test_posts_import_from_csv_jsonl_and_json():
+    csv_text = "caption,hashtags,timestamp\nHello,#a #b,2024-03-01T00:00:00Z\n"
+    assert parse_posts(csv_text, "csv") == [{"caption": "Hello", "hashtags": "#a #b",
+                                             "timestamp": "2024-03-01T00:00:00Z"}]
+    assert parse_posts('{"hashtags": ["#a"]}\n\n{"hashtags": ["#b"]}\n', "jsonl") == [
+        {"hashtags": ["#a"]}, {"hashtags": ["#b"]}
+    ]
+    assert parse_posts('[{"caption": "#c"}]', "json") == [{"caption": "#c"}]
+
+def test_re_adding_a_post_replaces_its_entry(index):
+    index.add_post({"id": "p1", "hashtags": ["#travel", "#beach"], "caption": "Island trip", "timestamp": NOW})
+    index.add_post({"id": "p2", "hashtags": ["#travel"], "timestamp": NOW})
+    index.add_post({"id": "p1", "hashtags": ["#travel", "#hiking"], "caption": "Mountain trip", "timestamp": NOW})
+
+    assert index.posts == 2
+    assert index.frequency("#travel", now=NOW) == pytest.approx(2.0)
+    assert index.frequency("#beach", now=NOW) == 0.0
+    assert index.top_tags("travel") == ["#travel", "#hiking"]
+    assert index.top_tags("island") == []
+
+def test_post_keys_survive_a_reload(index):
+    index.add_post({"post_url": "https://example.com/p/1", "hashtags": ["#travel"], "timestamp": NOW})
+    index.save()
+    reloaded = HashtagIndex(index.path)
+    reloaded.add_post({"post_url": "https://example.com/p/1", "hashtags": ["#travel"], "timestamp": NOW})
+    assert reloaded.posts == 1
+    assert reloaded.frequency("#travel", now=NOW) == pytest.approx(1.0)
+
+def test_posts_without_a_key_are_always_added(index):
+    index.add_posts([{"hashtags": ["#travel"], "timestamp": NOW}] * 2)
+    assert index.posts == 2
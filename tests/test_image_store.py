@@ -0,0 +1,100 @@
+# tests/test_image_store.py
+
+import base64
+import io
+import os
+import threading
+from concurrent.futures import ThreadPoolExecutor
+from types import SimpleNamespace
+
+import pytest
+
+from utils.image_store import ImageStore, generate_thumbnail
+
+
+class FakeImages:
+    def __init__(self, barrier=None, throttled=0):
+        # With a barrier, each request waits until that many requests are in flight at once;
+        # the first `throttled` requests fail with a 429
+        self.barrier = barrier
+        self.throttled = throttled
+        self.prompts = []
+        self.active = 0
+        self.peak = 0
+        self.lock = threading.Lock()
+
+    def generate(self, model, prompt, size):
+        with self.lock:
+            self.prompts.append((prompt, size))
+            if self.throttled:
+                self.throttled -= 1
+                raise RateLimitError("429 Too Many Requests")
+            self.active += 1
+            self.peak = max(self.peak, self.active)
+        if self.barrier:
+            self.barrier.wait()
+        with self.lock:
+            self.active -= 1
+        data = base64.b64encode(f"{prompt}|{size}".encode()).decode()
+        return SimpleNamespace(data=[SimpleNamespace(b64_json=data)])
+
+
+class RateLimitError(Exception):
+    pass
+
+
+@pytest.fixture
+def store(tmp_path):
+    return ImageStore(str(tmp_path / "images"))
+
+
+def test_identical_bytes_are_stored_once(store):
+    first = store.put(b"same bytes")
+    assert store.put(b"same bytes") == first
+    assert store.put(b"other bytes") != first
+    assert os.path.basename(os.path.dirname(first)) == os.path.basename(first)[:2]
+    with open(first, "rb") as f:
+        assert f.read() == b"same bytes"
+
+def test_previews_are_downscaled_once(store):
+    Image = pytest.importorskip("PIL.Image")
+    buffer = io.BytesIO()
+    Image.new("RGB", (1024, 512), "red").save(buffer, "PNG")
+    path = store.put(buffer.getvalue())
+
+    preview = store.preview(path, max_px=128)
+    assert preview.endswith(".preview128.jpg")
+    with Image.open(preview) as image:
+        assert image.size == (128, 64)
+    assert store.preview(path, max_px=128) == preview
+
+def test_unreadable_images_fall_back_to_the_original(store):
+    path = store.put(b"not an image")
+    assert store.preview(path) == path
+
+def test_thumbnails_are_generated_once_per_prompt_and_size(store):
+    client = SimpleNamespace(images=FakeImages())
+    path = generate_thumbnail(client, "cached cat", "1024x1024", store=store)
+    assert generate_thumbnail(client, "cached cat", "1024x1024", store=store) == path
+    generate_thumbnail(client, "cached cat", "1536x1024", store=store)
+    assert client.images.prompts == [("Thumbnail for: cached cat", "1024x1024"),
+                                     ("Thumbnail for: cached cat", "1536x1024")]
+
+    os.remove(path)
+    assert generate_thumbnail(client, "cached cat", "1024x1024", store=store) == path
+    assert len(client.images.prompts) == 3
+
+def test_slots_cap_concurrent_image_requests(store):
+    client = SimpleNamespace(images=FakeImages(threading.Barrier(2, timeout=5)))
+    slots = threading.Semaphore(2)
+    with ThreadPoolExecutor(max_workers=6) as pool:
+        paths = list(pool.map(lambda n: generate_thumbnail(client, f"capped {n}", "1024x1024", store, slots),
+                              range(6)))
+    assert len(set(paths)) == 6
+    assert client.images.peak == 2
+
+def test_throttled_image_requests_are_retried(store):
+    client = SimpleNamespace(images=FakeImages(throttled=1))
+    path = generate_thumbnail(client, "throttled cat", "1024x1024", store=store)
+    assert os.path.exists(path)
+    assert len(client.images.prompts) == 2
@@ -0,0 +1,118 @@
+# tests/test_instagram_handler.py
+
+import threading
+
+import pytest
+
+from utils import instagram_handler
+from utils.hashtag_index import HashtagIndex
+from utils.instagram_handler import (
+    INSTAGRAM_FETCHERS, get_top_instagram_hashtags, process_instagram_urls, register_instagram_fetcher
+)
+
+
+@pytest.fixture
+def index(tmp_path, monkeypatch):
+    index = HashtagIndex(str(tmp_path / "hashtags.json"))
+    monkeypatch.setattr(instagram_handler, "get_hashtag_index", lambda: index)
+    return index
+
+@pytest.fixture
+def fetchers(monkeypatch):
+    # Fetchers registered by a test are dropped afterwards
+    monkeypatch.setattr(instagram_handler, "INSTAGRAM_FETCHERS", dict(INSTAGRAM_FETCHERS))
+    return instagram_handler.INSTAGRAM_FETCHERS
+
+def real_post(url, ig_api_key=None):
+    return {"post_url": url, "caption": f"Beach day {url[-3:]}", "likes": 1, "hashtags": ["#beach", "#summer"]}
+
+
+def test_mock_posts_never_reach_the_trend_index(index):
+    before = get_top_instagram_hashtags("ai")
+    for _ in range(2):
+        process_instagram_urls(["https://www.instagram.com/p/abc/"], False, None, None, [])
+    assert index.posts == 0
+    assert get_top_instagram_hashtags("ai") == before == ["#ai", "#reels", "#trending", "#viral"]
+
+def test_reprocessed_urls_replace_their_index_entries(index, fetchers):
+    register_instagram_fetcher("real", real_post)
+    urls = ["https://www.instagram.com/p/abc/", "https://www.instagram.com/p/def/?igsh=1"]
+    process_instagram_urls(urls, False, None, None, [], fetcher="real")
+    process_instagram_urls(urls + ["https://www.instagram.com/p/abc/?utm_source=share"], False, None, None, [],
+                           fetcher="real")
+    assert index.posts == 2
+    assert index.frequency("#beach") == pytest.approx(2.0, rel=0.1)
+
+class RecordingLimiter:
+    created = []
+
+    def __init__(self, requests_per_minute=500, tokens_per_minute=30000):
+        self.requests_per_minute = requests_per_minute
+        self.acquired = 0
+        RecordingLimiter.created.append(self)
+
+    def acquire(self, tokens=1):
+        self.acquired += 1
+
+    def update_from_headers(self, headers):
+        pass
+
+@pytest.fixture
+def limiters(monkeypatch):
+    monkeypatch.setattr(RecordingLimiter, "created", [])
+    monkeypatch.setattr(instagram_handler, "RateLimiter", RecordingLimiter)
+    return RecordingLimiter.created
+
+
+def test_registered_fetchers_are_listed_with_their_limits(fetchers):
+    register_instagram_fetcher("real", real_post, requests_per_minute=30)
+    assert fetchers["real"] == (real_post, 30, True)
+    assert fetchers["mock"][2] is False
+
+def test_posts_come_back_in_input_order(index, fetchers):
+    urls = [f"https://www.instagram.com/p/p{n:02d}/" for n in range(4)]
+    last_done = threading.Event()
+
+    def fetch(url, ig_api_key=None):
+        # The first post finishes last
+        if url == urls[0]:
+            assert last_done.wait(timeout=5)
+        post = real_post(url)
+        if url == urls[-1]:
+            last_done.set()
+        return post
+
+    register_instagram_fetcher("slow_first", fetch)
+    posts = process_instagram_urls(urls + ["  ", ""], False, None, None, [], fetcher="slow_first",
+                                   max_workers=4)
+    assert [post["post_url"] for post in posts] == urls
+
+def test_a_failed_fetch_becomes_an_error_row(index, fetchers, fake_openai):
+    def fetch(url, ig_api_key=None):
+        if "bad" in url:
+            raise ConnectionError("connection reset")
+        return real_post(url)
+
+    register_instagram_fetcher("flaky", fetch)
+    client = fake_openai("New caption")
+    urls = ["https://www.instagram.com/p/bad/", "https://www.instagram.com/p/good/"]
+    bad, good = process_instagram_urls(urls, True, client, "sk-test", [], fetcher="flaky")
+    assert bad == {"post_url": urls[0], "error": "Fetch Error: connection reset"}
+    assert good["seo_output"] == "New caption"
+    # Only the fetched post asks for SEO or reaches the index
+    assert len(client.requests) == 1
+    assert index.posts == 1
+
+def test_fetches_go_through_the_fetcher_rate_limit(index, fetchers, limiters):
+    register_instagram_fetcher("limited", real_post, requests_per_minute=30)
+    register_instagram_fetcher("unlimited", real_post)
+    urls = [f"https://www.instagram.com/p/r{n}/" for n in range(3)]
+    process_instagram_urls(urls, False, None, None, [], fetcher="limited")
+    fetch_limiter, seo_limiter = limiters
+    assert fetch_limiter.requests_per_minute == 30
+    assert fetch_limiter.acquired == 3
+    assert seo_limiter.acquired == 0
+
+    limiters.clear()
+    process_instagram_urls(urls, False, None, None, [], fetcher="unlimited")
+    assert len(limiters) == 1
@@ -0,0 +1,57 @@
+# tests/test_mcp_rules.py
+
+import datetime
+import json
+
+import pytest
+
+from utils.mcp_rules import LLM_CRITERIA, MCP_CRITERIA, RULES, combine_scores, parse_llm_scores, score_rules
+
+TODAY = datetime.date(2025, 6, 1)
+
+
+def make_structure(**overrides):
+    structure = {"headings": [], "faqs": [], "lists": [], "schema_types": [], "date_published": "",
+                 "date_modified": ""}
+    return dict(structure, **overrides)
+
+
+def test_an_empty_page_fails_every_rule():
+    assert score_rules(make_structure(), TODAY) == dict.fromkeys(RULES, 0)
+
+def test_a_well_structured_page_passes_every_rule():
+    structure = make_structure(
+        headings=[(1, "Guide"), (2, "Setup"), (3, "Details")],
+        faqs=[{"question": "Why?", "answer": "Because."}, {"question": "How?", "answer": "Like so."}],
+        lists=[["one"], ["a", "b"]],
+        schema_types=["Article"],
+        date_modified="2025-01-15T10:00:00Z",
+    )
+    assert score_rules(structure, TODAY) == dict.fromkeys(RULES, 1)
+
+@pytest.mark.parametrize("overrides, criterion, expected", [
+    ({"headings": [(1, "Title"), (1, "Other"), (2, "Only one")]}, "Structured subheadings", 0),
+    ({"schema_types": ["FAQPage"]}, "Includes FAQs", 1),
+    ({"faqs": [{"question": "Just one?", "answer": ""}]}, "Includes FAQs", 0),
+    ({"lists": [["single"], ["item"]]}, "Uses bullets or lists", 0),
+    ({"date_published": "2024-06-01"}, "Recently updated", 1),
+    ({"date_published": "2024-05-31"}, "Recently updated", 0),
+    ({"date_modified": "last week", "date_published": "2025-02-30"}, "Recently updated", 0),
+])
+def test_rule_thresholds(overrides, criterion, expected):
+    assert score_rules(make_structure(**overrides), TODAY)[criterion] == expected
+
+def test_llm_scores_accept_common_yes_answers():
+    answers = dict(zip(LLM_CRITERIA, [1, True, "yes", 0, "no"]), extra=1)
+    assert list(parse_llm_scores(json.dumps(answers)).values()) == [1, 1, 1, 0, 0]
+
+def test_llm_scores_must_cover_every_llm_criterion():
+    with pytest.raises(ValueError):
+        parse_llm_scores({criterion: 1 for criterion in LLM_CRITERIA[1:]})
+    with pytest.raises(ValueError):
+        parse_llm_scores("[1, 0]")
+
+def test_combined_scores_follow_scorecard_order():
+    scores = combine_scores(dict.fromkeys(RULES, 1), dict.fromkeys(LLM_CRITERIA, 0))
+    assert list(scores) == MCP_CRITERIA + ["total"]
+    assert scores["total"] == len(RULES)
@@ -0,0 +1,121 @@
+# tests/test_openai_batch.py
+
+import json
+from types import SimpleNamespace
+
+import pytest
+
+from utils import openai_batch
+from utils.openai_batch import BatchJob
+
+
+class FakeBatchApi:
+    """In-memory Files and Batches endpoints; a batch completes on its second retrieve.
+
+    Prompts containing "fail" get a 400 row in the batch's error file.
+    """
+
+    def __init__(self):
+        self.files_store = {}
+        self.batches_store = {}
+        self.retrieves = []
+        self.files = SimpleNamespace(create=self._create_file, content=self._file_content)
+        self.batches = SimpleNamespace(create=self._create_batch, retrieve=self._retrieve)
+
+    def _create_file(self, file, purpose):
+        file_id = f"file-{len(self.files_store)}"
+        self.files_store[file_id] = file.read().decode("utf-8")
+        return SimpleNamespace(id=file_id)
+
+    def _file_content(self, file_id):
+        return SimpleNamespace(text=self.files_store[file_id])
+
+    def _create_batch(self, input_file_id, endpoint, completion_window, metadata):
+        batch_id = f"batch-{len(self.batches_store)}"
+        self.batches_store[batch_id] = {"input": input_file_id, "polls": 0}
+        return SimpleNamespace(id=batch_id, status="validating")
+
+    def _retrieve(self, batch_id):
+        self.retrieves.append(batch_id)
+        state = self.batches_store[batch_id]
+        state["polls"] += 1
+        if state["polls"] < 2:
+            return SimpleNamespace(id=batch_id, status="in_progress", output_file_id=None, error_file_id=None)
+        output, errors = [], []
+        for line in self.files_store[state["input"]].splitlines():
+            request = json.loads(line)
+            prompt = request["body"]["messages"][0]["content"]
+            if "fail" in prompt:
+                errors.append({"custom_id": request["custom_id"], "response": {
+                    "status_code": 400, "body": {"error": {"message": "bad prompt"}}}})
+            else:
+                output.append({"custom_id": request["custom_id"], "response": {
+                    "status_code": 200, "body": {"choices": [{"message": {"content": prompt.upper()}}]}}})
+        output_id, error_id = f"{batch_id}-out", f"{batch_id}-err"
+        self.files_store[output_id] = "\n".join(json.dumps(row) for row in output)
+        self.files_store[error_id] = "\n".join(json.dumps(row) for row in errors)
+        return SimpleNamespace(id=batch_id, status="completed", output_file_id=output_id, error_file_id=error_id)
+
+
+@pytest.fixture
+def api():
+    return FakeBatchApi()
+
+def new_job(api, tmp_path, **kwargs):
+    return BatchJob(api, "run1", directory=str(tmp_path), poll_seconds=0, **kwargs)
+
+
+def test_results_are_collected_once_batches_finish(api, tmp_path):
+    job = new_job(api, tmp_path, response_format={"type": "json_object"})
+    statuses = []
+    assert job.submit([("a", "alpha"), ("b", "fail me"), ("c", "gamma")]) == ["batch-0"]
+    job.wait(lambda batch: statuses.append(batch.status))
+
+    assert statuses == ["in_progress", "completed"]
+    assert job.outputs() == {"a": "ALPHA", "c": "GAMMA"}
+    assert list(tmp_path.glob("*.batch-input-*")) == []
+    body = json.loads(api.files_store["file-0"].splitlines()[0])["body"]
+    assert body["response_format"] == {"type": "json_object"} and body["model"] == "gpt-4o"
+
+def test_large_jobs_are_split_into_several_batches(api, tmp_path, monkeypatch):
+    monkeypatch.setattr(openai_batch, "BATCH_MAX_REQUESTS", 2)
+    job = new_job(api, tmp_path)
+    assert job.submit((str(n), f"prompt {n}") for n in range(5)) == ["batch-0", "batch-1", "batch-2"]
+    job.wait()
+    assert len(job.outputs()) == 5
+
+def test_a_restarted_job_resumes_instead_of_resubmitting(api, tmp_path):
+    job = new_job(api, tmp_path)
+    job.submit([("a", "alpha"), ("b", "beta")])
+
+    resumed = new_job(api, tmp_path)
+    assert resumed.unsubmitted(["a", "b", "c"]) == ["c"]
+    assert resumed.open_batches() == ["batch-0"]
+    resumed.wait()
+    assert resumed.outputs() == {"a": "ALPHA", "b": "BETA"}
+
+    # Collected batches are not polled again
+    polls = len(api.retrieves)
+    new_job(api, tmp_path).wait()
+    assert len(api.retrieves) == polls
+    assert new_job(api, tmp_path).unsubmitted(["a", "b", "c"]) == ["c"]
+
+def test_transient_api_errors_are_retried(api, tmp_path):
+    failures = {"upload": 1, "retrieve": 2, "content": 1}
+
+    def flaky(name, call):
+        def wrapper(*args, **kwargs):
+            if failures[name]:
+                failures[name] -= 1
+                raise ConnectionError(f"{name} reset")
+            return call(*args, **kwargs)
+        return wrapper
+
+    api.files.create = flaky("upload", api.files.create)
+    api.batches.retrieve = flaky("retrieve", api.batches.retrieve)
+    api.files.content = flaky("content", api.files.content)
+    job = new_job(api, tmp_path)
+    job.submit([("a", "alpha")])
+    job.wait()
+    assert job.outputs() == {"a": "ALPHA"}
+    assert failures == {"upload": 0, "retrieve": 0, "content": 0}
@@ -0,0 +1,79 @@
+# tests/test_page_content.py
+
+import json
+
+from utils.page_content import extract_structure, summarize_structure
+
+JSON_LD = {
+    "@context": "https://schema.org",
+    "@graph": [
+        {"@type": "Article", "datePublished": "2024-01-02", "author": [{"name": "Ada"}, {"name": "Lin"}]},
+        {"@type": "FAQPage", "mainEntity": [
+            {"@type": "Question", "name": "Is it free?", "acceptedAnswer": {"text": "<p>Yes,  always.</p>"}},
+        ]},
+    ],
+}
+PAGE = f"""<html><head>
+<title> Widget guide </title>
+<meta name="description" content="All about widgets.">
+<script type="application/ld+json">{json.dumps(JSON_LD)}</script>
+<script type="application/ld+json">not json</script>
+</head><body>
+<header>Site header</header><nav><ul><li>Home</li></ul></nav>
+<main>
+  <h1>Widgets</h1><p>Widgets are   small.</p>
+  <h2>How do widgets work?</h2><p>They spin.</p>
+  <ul><li>One</li><li>Two <ul><li>Nested</li></ul></li></ul>
+  <details><summary>Can I return one?</summary>Within 30 days.</details>
+  <dl><dt>Warranty</dt><dd>Two years.</dd></dl>
+  <div aria-hidden="true"><p>Hidden text</p></div>
+</main>
+<footer><p>Copyright</p></footer>
+</body></html>"""
+
+
+def test_structure_comes_from_metadata_and_main_content():
+    structure = extract_structure(PAGE)
+    assert structure["title"] == "Widget guide"
+    assert structure["meta_description"] == "All about widgets."
+    assert structure["author"] == "Ada, Lin"
+    assert structure["date_published"] == "2024-01-02"
+    assert structure["schema_types"] == ["Article", "FAQPage"]
+    assert structure["headings"] == [(1, "Widgets"), (2, "How do widgets work?")]
+    assert structure["paragraphs"] == ["Widgets are small.", "They spin."]
+    assert structure["lists"] == [["One", "Two Nested", "Nested"]]
+
+def test_faqs_come_from_schema_and_markup():
+    faqs = extract_structure(PAGE)["faqs"]
+    assert faqs == [
+        {"question": "Is it free?", "answer": "Yes, always."},
+        {"question": "Can I return one?", "answer": "Within 30 days."},
+        {"question": "Warranty", "answer": "Two years."},
+        {"question": "How do widgets work?", "answer": "They spin."},
+    ]
+
+def test_page_chrome_is_dropped():
+    text = json.dumps(extract_structure(PAGE))
+    for chrome in ("Site header", "Home", "Copyright", "Hidden text"):
+        assert chrome not in text
+
+def test_time_elements_stand_in_for_missing_dates():
+    structure = extract_structure("<html><body><p>Post</p><time datetime='2023-05-06'>May</time></body></html>")
+    assert structure["date_published"] == "2023-05-06"
+    assert structure["title"] == "" and structure["schema_types"] == []
+
+def test_paragraph_collection_stops_at_max_chars():
+    html = "<html><body>" + "".join(f"<p>{'x' * 99}</p>" for _ in range(50)) + "</body></html>"
+    assert len(extract_structure(html, max_chars=1000)["paragraphs"]) == 10
+
+def test_summary_puts_the_outline_first_and_fits_the_budget():
+    summary = summarize_structure(extract_structure(PAGE))
+    lines = summary.splitlines()
+    assert lines[0] == "Title: Widget guide"
+    assert "Author: Ada, Lin | Published: 2024-01-02" in lines
+    assert "  H2 How do widgets work?" in lines
+    assert "FAQs: 4" in lines
+
+    long_page = "<html><body><h1>Big</h1>" + "<p>word </p>" * 5000 + "</body></html>"
+    summary = summarize_structure(extract_structure(long_page, max_chars=4000), max_tokens=100)
+    assert len(summary) <= 400 and summary.startswith("Title: ")
@@ -0,0 +1,99 @@
+# tests/test_page_fetcher.py
+
+import threading
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+import pytest
+
+from utils.page_fetcher import fetch_page, fetch_pages, make_session, read_sitemap
+
+ARTICLE = b"""<html><head><title>Guide</title></head>
+<body><nav>Menu</nav><article><h1>Guide</h1><p>First paragraph.</p></article></body></html>"""
+SITEMAP_NS = 'xmlns="http://www.sitemaps.org/schemas/sitemap/0.9"'
+
+
+class Handler(BaseHTTPRequestHandler):
+    def do_GET(self):
+        self.server.requests.append((self.path, self.headers.get("If-None-Match")))
+        status, body, headers = self.server.pages.get(self.path, (404, b"missing", {}))
+        if headers.get("ETag") and self.headers.get("If-None-Match") == headers["ETag"]:
+            status, body = 304, b""
+        self.send_response(status)
+        for name, value in headers.items():
+            self.send_header(name, value)
+        self.send_header("Content-Length", str(len(body)))
+        self.end_headers()
+        self.wfile.write(body)
+
+    def log_message(self, *args):
+        pass
+
+
+@pytest.fixture
+def server():
+    httpd = ThreadingHTTPServer(("127.0.0.1", 0), Handler)
+    httpd.pages, httpd.requests = {}, []
+    httpd.url = f"http://127.0.0.1:{httpd.server_address[1]}"
+    thread = threading.Thread(target=httpd.serve_forever, kwargs={"poll_interval": 0.05}, daemon=True)
+    thread.start()
+    yield httpd
+    httpd.shutdown()
+    httpd.server_close()
+
+@pytest.fixture
+def session():
+    return make_session(pool_size=4)
+
+
+def test_pages_are_extracted_without_navigation(server, session):
+    server.pages["/guide"] = (200, ARTICLE, {})
+    page = fetch_page(session, server.url + "/guide")
+    assert page["status"] == 200 and page["title"] == "Guide" and not page["from_cache"]
+    assert page["structure"]["paragraphs"] == ["First paragraph."]
+    assert "Menu" not in page["content"]
+
+def test_validated_pages_are_revalidated_with_their_etag(server, session):
+    server.pages["/guide"] = (200, ARTICLE, {"ETag": '"v1"'})
+    first = fetch_page(session, server.url + "/guide")
+    second = fetch_page(session, server.url + "/guide")
+    assert server.requests == [("/guide", None), ("/guide", '"v1"')]
+    assert second["from_cache"] and second["content"] == first["content"]
+
+def test_pages_without_validators_are_fetched_every_time(server, session):
+    server.pages["/guide"] = (200, ARTICLE, {})
+    fetch_page(session, server.url + "/guide")
+    assert not fetch_page(session, server.url + "/guide")["from_cache"]
+    assert server.requests == [("/guide", None), ("/guide", None)]
+
+@pytest.mark.parametrize("status, body, error", [
+    (404, b"missing", "Error fetching URL: HTTP 404"),
+    (200, b"  ", "Error fetching URL: empty page"),
+    (200, b"<!-- only a comment -->", "Error parsing page: Document is empty"),
+])
+def test_bad_pages_become_error_rows(server, session, status, body, error):
+    server.pages["/bad"] = (status, body, {})
+    assert fetch_page(session, server.url + "/bad")["error"] == error
+
+def test_one_bad_page_does_not_stop_a_bulk_fetch(server):
+    server.pages["/guide"] = (200, ARTICLE, {})
+    server.pages["/broken"] = (200, b"<!-- only a comment -->", {})
+    urls = [server.url + path for path in ("/guide", "/broken", "/gone")]
+    pages = fetch_pages(urls, max_workers=3)
+    assert [page["url"] for page in pages] == urls
+    assert [bool(page.get("error")) for page in pages] == [False, True, True]
+
+def test_unreachable_hosts_become_error_rows(session):
+    page = fetch_page(session, "http://127.0.0.1:9/")
+    assert page["error"].startswith("Error fetching URL:")
+
+def test_sitemap_indexes_are_followed_up_to_the_limit(server, session):
+    server.pages["/sitemap.xml"] = (200, f"""<sitemapindex {SITEMAP_NS}>
+        <sitemap><loc>{server.url}/a.xml</loc></sitemap><sitemap><loc>{server.url}/b.xml</loc></sitemap>
+    </sitemapindex>""".encode(), {})
+    server.pages["/a.xml"] = (200, f"""<urlset {SITEMAP_NS}>
+        <url><loc> {server.url}/1 </loc></url><url><loc>{server.url}/2</loc></url></urlset>""".encode(), {})
+    server.pages["/b.xml"] = (200, f"<urlset><url><loc>{server.url}/3</loc></url></urlset>".encode(), {})
+
+    sitemap = server.url + "/sitemap.xml"
+    assert read_sitemap(sitemap, session=session) == [server.url + path for path in ("/1", "/2", "/3")]
+    assert read_sitemap(sitemap, limit=2, session=session) == [server.url + "/1", server.url + "/2"]
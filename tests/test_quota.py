@@ -0,0 +1,71 @@
+# tests/test_quota.py
+
+import pytest
+
+from utils.quota import (
+    DAILY_QUOTA, QuotaLedger, estimate_channel_export, estimate_top_tags, estimate_units, estimate_video_ids,
+    key_id, quota_summary, track
+)
+
+
+@pytest.fixture
+def ledger(tmp_path):
+    return QuotaLedger(str(tmp_path / "quota.sqlite3"))
+
+
+def test_channel_estimates_skip_indexed_pages():
+    assert estimate_channel_export(0, 500) == {"channels.list": 1, "playlistItems.list": 10, "videos.list": 10}
+    assert estimate_channel_export(500, 500, indexed_videos=1000, synced=True) == {
+        "channels.list": 0, "playlistItems.list": 1, "videos.list": 10
+    }
+    assert estimate_channel_export(0, 120, indexed_videos=100, synced=True)["playlistItems.list"] == 2
+
+def test_units_weight_calls_by_method_cost():
+    assert estimate_units(estimate_video_ids(51), estimate_top_tags()) == 2 + 100 + 1
+    assert estimate_units({"unknown.method": 3}, {}) == 3
+
+def test_tracked_client_charges_every_executed_request(ledger, fake_youtube):
+    youtube = track(fake_youtube(3), "key-a", ledger)
+    youtube.videos().list(part="snippet", id="vid00000000").execute()
+    youtube.videos().list(part="snippet", id="vid00000001").execute()
+    youtube.channels().list(part="contentDetails", id="UCfake").execute()
+    # Building a request without executing it costs nothing
+    youtube.playlistItems().list(part="snippet", playlistId="UUfake", maxResults=50)
+
+    assert ledger.breakdown(key_id("key-a")) == [
+        {"method": "videos.list", "calls": 2, "units": 2},
+        {"method": "channels.list", "calls": 1, "units": 1},
+    ]
+    assert ledger.used_today(key_id("key-b")) == 0
+
+def test_failed_requests_are_charged_per_attempt(ledger):
+    class Flaky:
+        attempts = 0
+
+        def execute(self):
+            Flaky.attempts += 1
+            if Flaky.attempts == 1:
+                raise ConnectionError("reset")
+            return {"items": []}
+
+    class Search:
+        def list(self, **kwargs):
+            return Flaky()
+
+    class Client:
+        def search(self):
+            return Search()
+
+    assert track(Client(), "key-a", ledger).search().list(q="x").execute() == {"items": []}
+    assert ledger.breakdown(key_id("key-a")) == [{"method": "search.list", "calls": 2, "units": 200}]
+
+def test_summary_compares_estimate_with_remaining_quota(ledger):
+    for _ in range(DAILY_QUOTA // 100 - 1):
+        ledger.record(key_id("key-a"), "search.list", 100)
+    assert quota_summary("key-a", 100, ledger) == {"estimated": 100, "used_today": DAILY_QUOTA - 100,
+                                                   "remaining": 100, "fits": True}
+    assert not quota_summary("key-a", 101, ledger)["fits"]
+
+def test_key_ids_do_not_expose_the_key():
+    assert key_id("secret-key") != key_id("other-key")
+    assert "secret" not in key_id("secret-key") and len(key_id("secret-key")) == 12
@@ -0,0 +1,191 @@
+# tests/test_resilience.py
+
+import threading
+from types import SimpleNamespace
+
+import pytest
+
+from utils import resilience
+from utils.resilience import (
+    FATAL, THROTTLED, TRANSIENT, AdaptiveConcurrency, CircuitBreaker, CircuitOpenError, Endpoint, classify,
+    retry_after
+)
+
+
+class FakeClock:
+    def __init__(self):
+        self.now = 1000.0
+        self.sleeps = []
+
+    def monotonic(self):
+        return self.now
+
+    def time(self):
+        return self.now
+
+    def sleep(self, seconds):
+        self.sleeps.append(seconds)
+        self.now += seconds
+
+
+class StatusError(Exception):
+    def __init__(self, status_code, headers=None):
+        super().__init__(f"HTTP {status_code}")
+        self.status_code = status_code
+        self.response = SimpleNamespace(headers=headers or {})
+
+
+class Response(dict):
+    # httplib2's response: a header dict with the status as an attribute
+    def __init__(self, status, headers):
+        super().__init__(headers)
+        self.status = status
+
+
+class HttpError(Exception):
+    # Shaped like googleapiclient's HttpError
+    def __init__(self, status, content=b"", headers=None):
+        super().__init__(f"HTTP {status}")
+        self.resp = Response(status, headers or {})
+        self.content = content
+
+
+class RateLimitError(Exception):
+    pass
+
+
+@pytest.fixture
+def clock(monkeypatch):
+    clock = FakeClock()
+    monkeypatch.setattr(resilience, "time", clock)
+    return clock
+
+def flaky(*outcomes):
+    # A zero-argument call that raises or returns the given outcomes in turn
+    calls = iter(outcomes)
+
+    def call():
+        outcome = next(calls)
+        if isinstance(outcome, Exception):
+            raise outcome
+        return outcome
+    return call
+
+
+def test_breaker_opens_after_consecutive_failures_and_probes_once(clock):
+    breaker = CircuitBreaker(failure_threshold=3, reset_seconds=30)
+    for _ in range(2):
+        breaker.record_failure()
+    breaker.record_success()
+    for _ in range(3):
+        assert breaker.before_call() is False
+        breaker.record_failure()
+    assert breaker.state == "open"
+    with pytest.raises(CircuitOpenError):
+        breaker.before_call()
+
+    clock.now += 30
+    assert breaker.state == "half-open"
+    assert breaker.before_call() is True
+    with pytest.raises(CircuitOpenError):
+        breaker.before_call()
+    breaker.record_failure()
+    assert breaker.state == "open" and breaker.wait_time() == 30
+
+    clock.now += 30
+    breaker.before_call()
+    breaker.record_success()
+    assert breaker.state == "closed"
+
+def test_concurrency_halves_on_throttling_and_grows_additively():
+    limiter = AdaptiveConcurrency(8, minimum=2, maximum=10)
+    for _ in range(3):
+        limiter.acquire()
+        limiter.release(THROTTLED)
+    assert limiter.limit == 2
+    for _ in range(2):
+        limiter.acquire()
+        limiter.release()
+    assert limiter.limit == pytest.approx(2 + 1 / 2 + 1 / 2.5)
+    limiter.acquire()
+    limiter.release(TRANSIENT)
+    assert limiter.limit == pytest.approx(2.9)
+    for _ in range(100):
+        limiter.acquire()
+        limiter.release()
+    assert limiter.limit == 10
+
+def test_acquire_blocks_at_the_limit():
+    limiter = AdaptiveConcurrency(1)
+    limiter.acquire()
+    acquired = threading.Event()
+    thread = threading.Thread(target=lambda: (limiter.acquire(), acquired.set()))
+    thread.start()
+    assert not acquired.wait(0.05)
+    limiter.release()
+    assert acquired.wait(5)
+    thread.join()
+
+@pytest.mark.parametrize("error, expected", [
+    (StatusError(429), THROTTLED),
+    (RateLimitError("slow down"), THROTTLED),
+    (HttpError(403, b'{"reason": "rateLimitExceeded"}'), THROTTLED),
+    (HttpError(403, b'{"reason": "quotaExceeded"}'), FATAL),
+    (HttpError(503), TRANSIENT),
+    (StatusError(408), TRANSIENT),
+    (StatusError(400), FATAL),
+    (StatusError(404), FATAL),
+    (ConnectionError("reset"), TRANSIENT),
+    (TimeoutError(), TRANSIENT),
+    (CircuitOpenError("open"), TRANSIENT),
+    (ValueError("bad json"), FATAL),
+])
+def test_classify(error, expected):
+    assert classify(error) == expected
+
+def test_retry_after_reads_seconds_milliseconds_and_dates(clock):
+    clock.now = 1700000000.0
+    assert retry_after(StatusError(429, {"retry-after": "7"})) == 7.0
+    assert retry_after(StatusError(429, {"retry-after-ms": "250", "retry-after": "7"})) == 0.25
+    assert retry_after(StatusError(429, {"retry-after": "Tue, 14 Nov 2023 22:13:40 GMT"})) == pytest.approx(20.0)
+    assert retry_after(HttpError(503, headers={"retry-after": "3"})) == 3.0
+    assert retry_after(StatusError(429, {"retry-after": "soon"})) is None
+    assert retry_after(ValueError()) is None
+
+def test_transient_failures_are_retried_then_succeed(clock):
+    endpoint = Endpoint("test", retries=3)
+    assert endpoint.call(flaky(ConnectionError(), StatusError(429, {"retry-after": "2"}), "ok")) == "ok"
+    assert clock.sleeps[1] == 2.0
+    snapshot = endpoint.snapshot()
+    assert (snapshot["calls"], snapshot["retries"], snapshot["throttled"], snapshot["failures"]) == (3, 2, 1, 0)
+    assert snapshot["state"] == "closed" and snapshot["limit"] < 16
+
+def test_fatal_errors_are_raised_without_retrying(clock):
+    endpoint = Endpoint("test", retries=3, failure_threshold=1)
+    with pytest.raises(StatusError):
+        endpoint.call(flaky(StatusError(400), "unused"))
+    assert endpoint.stats["calls"] == 1 and clock.sleeps == []
+    # A bad request doesn't count against the service's health
+    assert endpoint.breaker.state == "closed"
+
+def test_exhausted_retries_raise_the_last_error(clock):
+    endpoint = Endpoint("test", retries=2)
+    with pytest.raises(TimeoutError):
+        endpoint.call(flaky(ConnectionError(), ConnectionError(), TimeoutError()))
+    assert endpoint.stats["failures"] == 1 and len(clock.sleeps) == 2
+
+def test_an_open_circuit_waits_for_the_probe(clock, monkeypatch):
+    # No jitter, so the retry sleeps exactly the breaker's remaining wait
+    monkeypatch.setattr(resilience, "backoff", lambda attempt: 0.0)
+    endpoint = Endpoint("test", retries=2, failure_threshold=2, reset_seconds=30)
+    calls = []
+
+    def call():
+        calls.append(clock.now)
+        if len(calls) <= 2:
+            raise ConnectionError()
+        return "ok"
+
+    assert endpoint.call(call) == "ok"
+    # After the second failure opened the circuit, the retry waited out the reset before probing
+    assert calls[2] - calls[1] >= 30
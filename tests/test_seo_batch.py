@@ -0,0 +1,133 @@
+# tests/test_seo_batch.py
+
+import json
+
+import pytest
+
+from utils.youtube_handler import SeoPacker, cached_seo, generate_seo_tags, generate_seo_tags_batch, seo_batches
+
+
+def answer(video_id):
+    return {"title": f"SEO {video_id}", "description": "Keyword-rich.", "hashtags": ["#a", "b", "#A"],
+            "keywords": ["long tail"]}
+
+def packed_ids(prompt):
+    return [video["video_id"] for video in json.loads(prompt.rsplit("Videos:", 1)[1])]
+
+def seo_answers(drop=(), fail_batches=False):
+    # Answers single-video and packed SEO requests; packed replies leave out the IDs in `drop`
+    def reply(prompt, response_format, **kwargs):
+        if response_format["json_schema"]["name"] != "seo_batch":
+            return json.dumps(answer(prompt.split("Title: ", 1)[1].split()[0]))
+        if fail_batches:
+            raise ValueError("bad request")
+        return json.dumps({"videos": [
+            {"video_id": vid, **answer(vid)} for vid in packed_ids(prompt) if vid not in drop
+        ]})
+    return reply
+
+def requested(client):
+    # One entry per request: the packed video IDs, or the single video's ID
+    return [packed_ids(request["prompt"]) if request["response_format"]["json_schema"]["name"] == "seo_batch"
+            else request["prompt"].split("Title: ", 1)[1].split()[0] for request in client.requests]
+
+def make_videos(prefix, count, description=""):
+    # Titles start with the video ID so single-video prompts can be told apart
+    return [{"video_id": f"{prefix}{n}", "title": f"{prefix}{n} title", "description": description,
+             "tags": ["t"], "views": "1"} for n in range(count)]
+
+@pytest.fixture
+def fake_client(fake_openai):
+    return lambda **kwargs: fake_openai(seo_answers(**kwargs))
+
+
+def test_batches_are_cut_by_count_and_by_packed_size():
+    videos = make_videos("pack", 7)
+    assert [len(batch) for batch in seo_batches(videos, 3)] == [3, 3, 1]
+
+    videos = make_videos("pack", 4, description="x" * 40)
+    assert [len(batch) for batch in seo_batches(videos, 10, max_chars=120)] == [2, 2]
+    # A video larger than max_chars on its own still gets a request
+    assert [len(batch) for batch in seo_batches(videos, 10, max_chars=10)] == [1, 1, 1, 1]
+
+def test_packer_releases_a_group_as_soon_as_it_is_full():
+    a, b, c = make_videos("full", 3)
+    packer = SeoPacker(2)
+    assert [packer.add(video) for video in (a, b, c)] == [None, [a, b], None]
+    assert packer.flush() == [c]
+    single = SeoPacker(1)
+    assert [single.add(video) for video in (a, b)] == [[a], [b]]
+    assert single.flush() == []
+
+def test_packer_counts_transcript_summaries():
+    packer = SeoPacker(10, max_chars=100)
+    video, summarized = make_videos("sum", 2)
+    summarized["transcript_summary"] = "s" * 90
+    assert packer.add(video) is None
+    assert packer.add(summarized) == [video]
+    assert packer.flush() == [summarized]
+
+def test_one_request_answers_the_whole_group_in_order(fake_client):
+    client = fake_client()
+    videos = make_videos("group", 3)
+    outputs = generate_seo_tags_batch(videos, client)
+    assert requested(client) == [["group0", "group1", "group2"]]
+    assert [output["seo_title"] for output in outputs] == ["SEO group0", "SEO group1", "SEO group2"]
+    assert outputs[0]["seo_hashtags"] == ["#a", "#b"]
+
+def test_packed_answers_are_cached_per_video(fake_client):
+    client = fake_client()
+    videos = make_videos("shared", 2)
+    generate_seo_tags_batch(videos, client)
+    assert cached_seo(videos[1])["seo_title"] == "SEO shared1"
+    # A later single-video run (or a different grouping) reuses the packed answer
+    assert generate_seo_tags(videos[1], client)["seo_title"] == "SEO shared1"
+    generate_seo_tags_batch([videos[1], videos[0]], client)
+    assert len(client.requests) == 1
+
+def test_cached_videos_are_left_out_of_the_request(fake_client):
+    client = fake_client()
+    videos = make_videos("partial", 3)
+    generate_seo_tags(videos[1], client)
+    outputs = generate_seo_tags_batch(videos, client)
+    assert requested(client) == ["partial1", ["partial0", "partial2"]]
+    assert all(output["seo_title"].startswith("SEO partial") for output in outputs)
+
+def test_missing_answers_fall_back_to_single_requests(fake_client):
+    client = fake_client(drop={"missing1"})
+    outputs = generate_seo_tags_batch(make_videos("missing", 3), client)
+    assert requested(client) == [["missing0", "missing1", "missing2"], "missing1"]
+    assert outputs[1]["seo_title"] == "SEO missing1"
+
+def test_default_fallback_answers_are_cached_per_video(fake_client):
+    client = fake_client(drop={"refill1"})
+    videos = make_videos("refill", 3)
+    generate_seo_tags_batch(videos, client)
+    assert cached_seo(videos[1])["seo_title"] == "SEO refill1"
+    # Next run, every video is a cache hit whichever path answered it
+    generate_seo_tags_batch(videos, client)
+    assert len(client.requests) == 2
+
+def test_failed_batch_requests_fall_back_for_every_video(fake_client):
+    client = fake_client(fail_batches=True)
+    fallback_calls = []
+
+    def fallback(video):
+        fallback_calls.append(video["video_id"])
+        return {"seo_error": "OpenAI Error: unavailable"}
+
+    outputs = generate_seo_tags_batch(make_videos("failed", 2), client, fallback=fallback)
+    assert fallback_calls == ["failed0", "failed1"]
+    assert outputs == [{"seo_error": "OpenAI Error: unavailable"}] * 2
+
+def test_repeated_videos_share_one_answer(fake_client):
+    client = fake_client()
+    first, second = make_videos("repeat", 2)
+    outputs = generate_seo_tags_batch([first, second, first], client)
+    assert requested(client) == [["repeat0", "repeat1"]]
+    assert outputs[0] == outputs[2]
+
+def test_a_single_uncached_video_skips_the_packed_request(fake_client):
+    client = fake_client()
+    generate_seo_tags_batch(make_videos("alone", 1), client)
+    assert requested(client) == ["alone0"]
@@ -0,0 +1,39 @@
+# tests/test_seo_schema.py
+
+import json
+
+import pytest
+
+from utils.seo_schema import format_seo, parse_seo, seo_error
+
+VALID = {"title": "  Best Title ", "description": "Words.", "hashtags": ["#Tag", "tag", "  #two "],
+         "keywords": ["long tail", "Long Tail ", ""]}
+
+
+def test_parse_cleans_and_deduplicates_lists():
+    assert parse_seo(json.dumps(VALID)) == {
+        "seo_title": "Best Title",
+        "seo_description": "Words.",
+        "seo_hashtags": ["#Tag", "#two"],
+        "seo_keywords": ["long tail"],
+    }
+    assert parse_seo(VALID) == parse_seo(json.dumps(VALID))
+
+@pytest.mark.parametrize("response", [
+    "not json",
+    "[]",
+    {**VALID, "title": "  "},
+    {**VALID, "description": None},
+    {**VALID, "hashtags": "#one #two"},
+    {**VALID, "keywords": ["ok", 3]},
+    {key: value for key, value in VALID.items() if key != "keywords"},
+])
+def test_parse_rejects_responses_outside_the_schema(response):
+    with pytest.raises(ValueError):
+        parse_seo(response)
+
+def test_format_shows_columns_or_the_error():
+    record = parse_seo(VALID)
+    text = format_seo(record)
+    assert "**SEO Title:** Best Title" in text and "#Tag #two" in text
+    assert format_seo(seo_error("rate limited")) == "OpenAI Error: rate limited"
@@ -0,0 +1,109 @@
+# tests/test_tracing.py
+
+import json
+import threading
+
+import pytest
+
+from utils.concurrency import run_in_pool
+from utils.tracing import Tracer, get_tracer, propagate, span, start_trace, stop_trace, traced
+
+
+@pytest.fixture
+def tracer():
+    tracer = start_trace(record_events=True)
+    yield tracer
+    stop_trace()
+
+
+def test_summary_reports_nearest_rank_percentiles():
+    tracer = Tracer()
+    for ms in range(1, 101):
+        tracer.record("seo", 0.0, ms / 1000, video_id="a" if ms % 2 else "b")
+    tracer.record("seo", 0.0, 0.5, error=True)
+    tracer.record("fetch", 0.0, 0.001)
+
+    seo, fetch = tracer.summary()
+    assert seo == {"stage": "seo", "calls": 101, "errors": 1, "total_s": 5.55, "mean_ms": 55.0,
+                   "p50_ms": 51.0, "p99_ms": 100.0}
+    assert fetch["stage"] == "fetch" and fetch["calls"] == 1
+    assert tracer.per_video()["a"]["seo"] == pytest.approx(2.5)
+
+def test_histogram_buckets_by_upper_bound():
+    tracer = Tracer()
+    for seconds in (0.005, 0.010, 0.011, 60.0):
+        tracer.record("seo", 0.0, seconds)
+    histogram = dict(tracer.histogram("seo"))
+    assert histogram[10] == 2 and histogram[25] == 1 and histogram[None] == 1
+    assert tracer.histogram("missing") == []
+
+def test_spans_are_ignored_without_an_active_trace():
+    assert get_tracer() is None
+    with span("seo", "a"):
+        pass
+
+def test_span_records_errors_and_chrome_events(tracer, tmp_path):
+    with pytest.raises(KeyError):
+        with span("seo", "a", batch=2):
+            raise KeyError("x")
+    (row,) = tracer.summary()
+    assert row["errors"] == 1
+
+    path = tmp_path / "trace.json"
+    tracer.write_chrome_trace(str(path))
+    (event,) = json.loads(path.read_text())["traceEvents"]
+    assert event["name"] == "seo" and event["ph"] == "X"
+    assert event["args"] == {"batch": 2, "video_id": "a", "error": True}
+
+def test_traced_picks_the_video_out_of_the_call(tracer):
+    @traced("fetch", video_id=lambda video: video["video_id"])
+    def fetch(video):
+        return video["video_id"].upper()
+
+    assert fetch({"video_id": "a"}) == "A"
+    assert list(tracer.per_video()) == ["a"]
+
+def test_pool_workers_record_into_the_callers_trace(tracer):
+    def work(n):
+        with span("work", n):
+            return n
+
+    assert run_in_pool(work, range(20), max_workers=4) == list(range(20))
+    assert tracer.summary()[0]["calls"] == 20
+    assert get_tracer() is tracer
+
+def test_plain_threads_do_not_inherit_the_trace(tracer):
+    seen = {}
+    thread = threading.Thread(target=lambda: seen.setdefault("tracer", get_tracer()))
+    thread.start()
+    thread.join()
+    assert seen["tracer"] is None
+
+    thread = threading.Thread(target=propagate(lambda: seen.update(tracer=get_tracer())))
+    thread.start()
+    thread.join()
+    assert seen["tracer"] is tracer
+
+def test_concurrent_sessions_trace_separately():
+    barrier = threading.Barrier(2)
+    tracers = {}
+
+    def session(name):
+        def work(n):
+            with span(name, n):
+                if n == 0:
+                    # Both sessions are mid-run at the same time
+                    barrier.wait()
+
+        start_trace()
+        run_in_pool(work, range(5))
+        tracers[name] = stop_trace()
+
+    threads = [threading.Thread(target=session, args=(name,)) for name in ("one", "two")]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+    assert [row["stage"] for row in tracers["one"].summary()] == ["one"]
+    assert [row["stage"] for row in tracers["two"].summary()] == ["two"]
+    assert len(tracers["one"].per_video()) == 5
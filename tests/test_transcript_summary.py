@@ -0,0 +1,62 @@
+# tests/test_transcript_summary.py
+
+import hashlib
+
+import pytest
+
+from utils.transcript_summary import CHUNK_TOKENS, SUMMARY_TOKENS, chunk_text, summarize_transcript
+
+
+def summary_of(prompt, **kwargs):
+    # A short summary unique to each prompt
+    return " summary " + hashlib.sha256(prompt.encode("utf-8")).hexdigest()[:12] + " "
+
+def count(client, kind):
+    return sum(1 for prompt in client.prompts if kind in prompt)
+
+@pytest.fixture
+def client(fake_openai):
+    return fake_openai(summary_of)
+
+def transcript(name, chunks):
+    # Sentences unique to the test, filling about `chunks` chunks of CHUNK_TOKENS
+    sentence = f"{name} sentence number {{}} talks about widgets."
+    count = chunks * CHUNK_TOKENS * 4 // len(sentence.format(0))
+    return " ".join(sentence.format(n) for n in range(count))
+
+
+def test_chunks_keep_whole_sentences_under_the_limit():
+    text = "One two three. Four five six! Seven eight nine? Ten."
+    assert chunk_text(text, max_tokens=5) == ["One two three.", "Four five six!", "Seven eight nine?", "Ten."]
+    assert chunk_text(text, max_tokens=8) == ["One two three. Four five six!", "Seven eight nine? Ten."]
+
+def test_unpunctuated_captions_are_cut_between_words():
+    words = [f"word{n}" for n in range(300)]
+    chunks = chunk_text(" ".join(words), max_tokens=50)
+    assert all(len(chunk) <= 200 for chunk in chunks)
+    assert " ".join(chunks).split() == words
+
+def test_short_transcripts_are_used_as_they_are(client):
+    text = "word " * (SUMMARY_TOKENS * 4 // 5 - 1)
+    assert summarize_transcript(client, text) == text.strip()
+    assert summarize_transcript(client, None) == ""
+    assert client.prompts == []
+
+def test_long_transcripts_are_mapped_then_reduced_to_one_summary(client):
+    text = transcript("reduce", 10)
+    chunks = len(chunk_text(text))
+    summary = summarize_transcript(client, text, max_workers=4)
+
+    assert summary.startswith("summary ")
+    assert count(client, "Summarize this part") == chunks
+    # 9-16 chunk summaries: two merges of up to 8, then one of the two results
+    assert 9 <= chunks <= 16 and count(client, "Merge them") == 3
+
+def test_summaries_are_cached_by_content(client):
+    text = transcript("cached", 3)
+    summary = summarize_transcript(client, text)
+    calls = len(client.prompts)
+    assert summarize_transcript(client, text) == summary
+    assert len(client.prompts) == calls
+    summarize_transcript(client, text, force_refresh=True)
+    assert len(client.prompts) == 2 * calls
@@ -0,0 +1,83 @@
+# tests/test_transcripts.py
+
+import requests
+from youtube_transcript_api import FetchedTranscriptSnippet, NoTranscriptFound, TranscriptsDisabled
+
+from utils import youtube_handler
+from utils.youtube_handler import (
+    TRANSCRIPT_DISABLED,
+    TRANSCRIPT_NETWORK_ERROR,
+    TRANSCRIPT_NOT_FOUND,
+    TRANSCRIPT_OK,
+    TRANSCRIPT_TIMEOUT,
+    fetch_transcript_result,
+    fetch_transcripts,
+    get_transcript_api,
+)
+
+
+def install_api(monkeypatch, fetch):
+    calls = []
+
+    class FakeTranscriptApi:
+        def __init__(self, http_client=None):
+            self.http_client = http_client
+
+        def fetch(self, video_id):
+            calls.append(video_id)
+            return fetch(video_id, len(calls))
+
+    monkeypatch.setattr(youtube_handler, "YouTubeTranscriptApi", FakeTranscriptApi)
+    monkeypatch.setattr(youtube_handler, "_transcript_apis", {})
+    return calls
+
+def raising(error):
+    def fetch(video_id, attempt):
+        raise error
+    return fetch
+
+def test_segments_are_joined_into_one_text(monkeypatch):
+    install_api(monkeypatch, lambda vid, n: [FetchedTranscriptSnippet("hello", 0, 1),
+                                              FetchedTranscriptSnippet("world", 1, 1)])
+    assert fetch_transcript_result("vid") == (TRANSCRIPT_OK, "hello world")
+
+def test_missing_transcripts_are_reported_without_retrying(monkeypatch):
+    calls = install_api(monkeypatch, raising(TranscriptsDisabled("off")))
+    assert fetch_transcript_result("off") == (TRANSCRIPT_DISABLED, "")
+    assert calls == ["off"]
+
+    install_api(monkeypatch, raising(NoTranscriptFound("none", ["en"], [])))
+    assert fetch_transcript_result("none") == (TRANSCRIPT_NOT_FOUND, "")
+
+def test_timeouts_are_retried_then_reported(monkeypatch):
+    calls = install_api(monkeypatch, raising(requests.Timeout("read timed out")))
+    assert fetch_transcript_result("slow", retries=2) == (TRANSCRIPT_TIMEOUT, "")
+    assert len(calls) == 3
+
+def test_a_transient_failure_then_success_returns_the_transcript(monkeypatch):
+    def fetch(vid, attempt):
+        if attempt == 1:
+            raise requests.ConnectionError("reset")
+        return [FetchedTranscriptSnippet("recovered", 0, 1)]
+
+    install_api(monkeypatch, fetch)
+    assert fetch_transcript_result("flaky") == (TRANSCRIPT_OK, "recovered")
+
+def test_other_errors_become_network_errors(monkeypatch):
+    install_api(monkeypatch, raising(RuntimeError("parse failure")))
+    assert fetch_transcript_result("odd") == (TRANSCRIPT_NETWORK_ERROR, "")
+
+def test_the_session_applies_the_timeout_to_every_request(monkeypatch):
+    install_api(monkeypatch, lambda vid, n: [])
+    api = get_transcript_api(7)
+    assert api is get_transcript_api(7)
+    seen = {}
+    monkeypatch.setattr(requests.Session, "request", lambda self, *args, **kwargs: seen.update(kwargs))
+    api.http_client.get("https://www.youtube.com/watch?v=x")
+    assert seen["timeout"] == 7
+
+def test_fetch_transcripts_deduplicates_ids(monkeypatch):
+    calls = install_api(monkeypatch, lambda vid, n: [FetchedTranscriptSnippet(vid, 0, 1)])
+    results = fetch_transcripts(["a", "b", "a"], max_workers=4)
+    assert results == {"a": (TRANSCRIPT_OK, "a"), "b": (TRANSCRIPT_OK, "b")}
+    assert sorted(calls) == ["a", "b"]
@@ -0,0 +1,78 @@
+# tests/test_video_index.py
+
+import pytest
+
+from utils.video_index import VideoIndex
+from utils.youtube_handler import get_channel_videos, get_indexed_videos_info, sync_channel
+
+
+@pytest.fixture
+def index(tmp_path):
+    return VideoIndex(str(tmp_path / "index.sqlite3"))
+
+
+def test_first_sync_pages_only_as_far_as_needed(fake_youtube, index):
+    youtube = fake_youtube(120)
+    result = sync_channel(youtube, index, "UCfake", min_videos=60)
+    assert result == {"new_videos": 100, "pages": 2, "total": 100}
+    state = index.get_state("UCfake")
+    assert state["playlist_id"] == "UUfake"
+    assert not state["complete"]
+    assert state["backfill_token"] == "100"
+
+def test_backfill_resumes_from_the_saved_page_token(fake_youtube, index):
+    youtube = fake_youtube(120)
+    sync_channel(youtube, index, "UCfake", min_videos=60)
+    result = sync_channel(youtube, index, "UCfake", min_videos=120)
+    # One head page to see nothing is new, then the last backfill page
+    assert result == {"new_videos": 0, "pages": 2, "total": 120}
+    assert index.get_state("UCfake")["complete"]
+    assert youtube.calls["channels"] == 1
+
+def test_incremental_sync_fetches_only_new_uploads(fake_youtube, index):
+    youtube = fake_youtube(120)
+    sync_channel(youtube, index, "UCfake")
+    youtube.publish(3)
+    before = youtube.calls["playlistItems"]
+    result = sync_channel(youtube, index, "UCfake", min_videos=10)
+    assert result == {"new_videos": 3, "pages": 1, "total": 123}
+    assert youtube.calls["playlistItems"] - before == 1
+    assert [v["video_id"] for v in index.list_videos("UCfake", limit=4)] == youtube.uploads[:4]
+
+def test_sync_without_min_videos_reads_the_whole_history(fake_youtube, index):
+    youtube = fake_youtube(130)
+    assert sync_channel(youtube, index, "UCfake")["total"] == 130
+    assert index.get_state("UCfake") | {"synced_at": None} == {
+        "playlist_id": "UUfake", "complete": True, "backfill_token": None, "synced_at": None
+    }
+
+def test_unknown_channel_raises(fake_youtube, index):
+    with pytest.raises(ValueError):
+        sync_channel(fake_youtube(5), index, "UCmissing")
+
+def test_channel_videos_are_listed_newest_first_from_the_index(fake_youtube, index):
+    youtube = fake_youtube(80)
+    videos = get_channel_videos(youtube, "UCfake", 10, 5, index)
+    assert [v["video_id"] for v in videos] == youtube.uploads[10:15]
+    assert videos[0]["published_at"] > videos[-1]["published_at"]
+    # A second window inside what is indexed costs one head page
+    before = youtube.calls["playlistItems"]
+    get_channel_videos(youtube, "UCfake", 20, 5, index)
+    assert youtube.calls["playlistItems"] - before == 1
+
+def test_index_keeps_state_and_metadata_across_reopen(fake_youtube, tmp_path):
+    path = str(tmp_path / "reopen.sqlite3")
+    youtube = fake_youtube(3)
+    index = VideoIndex(path)
+    sync_channel(youtube, index, "UCfake")
+    infos = get_indexed_videos_info(youtube, "UCfake", youtube.uploads, index)
+    assert all("etag" not in info for info in infos.values())
+
+    reopened = VideoIndex(path)
+    assert reopened.count("UCfake") == 3
+    assert reopened.get_state("UCfake")["complete"]
+    etag, metadata = reopened.conn.execute(
+        "SELECT etag, metadata FROM videos WHERE video_id = ?", (youtube.uploads[0],)
+    ).fetchone()
+    assert etag == f"etag-{youtube.uploads[0]}"
+    assert youtube.uploads[0] in metadata
@@ -0,0 +1,181 @@
+# tests/test_youtube_handler.py
+
+import threading
+from collections import OrderedDict
+from types import SimpleNamespace
+
+import pytest
+
+from utils import cache, youtube_handler
+from utils.youtube_handler import (
+    TOP_TAGS_TTL_SECONDS,
+    _HttpPool,
+    get_video_info,
+    get_videos_info,
+    get_youtube,
+    group_topic_results,
+    search_topics,
+    top_tags_for_topic,
+)
+
+
+@pytest.fixture
+def clock(monkeypatch):
+    # One fake clock for the in-process memo (monotonic) and the disk cache (wall time)
+    now = [1000.0]
+    fake_time = SimpleNamespace(time=lambda: now[0], monotonic=lambda: now[0])
+    monkeypatch.setattr(youtube_handler, "time", fake_time)
+    monkeypatch.setattr(cache, "time", fake_time)
+    monkeypatch.setattr(youtube_handler, "_top_tags_memo", OrderedDict())
+    return now
+
+@pytest.fixture
+def tagged_youtube(fake_youtube):
+    return fake_youtube(3, search_results={"cats": [fake_youtube.video_id(n) for n in range(3)]})
+
+def factory(youtube):
+    builds = []
+
+    def build():
+        builds.append(1)
+        return youtube
+    build.builds = builds
+    return build
+
+
+def test_video_ids_are_fetched_fifty_per_request(fake_youtube):
+    youtube = fake_youtube(120)
+    ids = [fake_youtube.video_id(n) for n in range(120)]
+    infos = get_videos_info(youtube, ids)
+    assert youtube.calls["videos"] == 3
+    assert youtube.requested_ids == ids
+    assert list(infos) == ids
+    assert infos[ids[0]]["title"] == f"Title {ids[0]}"
+    assert infos[ids[0]]["tags"] == f"fake, {ids[0]}"
+
+def test_repeated_ids_are_requested_once(fake_youtube):
+    youtube = fake_youtube(3)
+    first, second = fake_youtube.video_id(0), fake_youtube.video_id(1)
+    infos = get_videos_info(youtube, [first, second, first, first])
+    assert youtube.calls["videos"] == 1
+    assert youtube.requested_ids == [first, second]
+    assert list(infos) == [first, second]
+
+def test_missing_and_private_ids_get_their_own_error_records(fake_youtube):
+    youtube = fake_youtube(2)
+    found = fake_youtube.video_id(0)
+    infos = get_videos_info(youtube, ["private0001", found, "deleted0002"])
+    assert youtube.calls["videos"] == 1
+    assert infos["private0001"] == {"video_id": "private0001", "error": "Video not found or unavailable"}
+    assert infos["deleted0002"]["error"] == "Video not found or unavailable"
+    assert "error" not in infos[found]
+    assert "error" in get_video_info(youtube, "gone0000003")
+
+def test_topic_searches_keep_topic_order_and_report_failures(fake_youtube, monkeypatch):
+    youtube = fake_youtube(5, search_results={
+        "cats": ["vid00000001", "vid00000002"],
+        "dogs": RuntimeError("quota exceeded"),
+        "pets": ["vid00000002", "vid00000003", "vid00000004"],
+    })
+    monkeypatch.setattr(youtube_handler, "get_youtube", lambda api_key: youtube)
+    results = search_topics("key", ["cats", "dogs", "pets"], 2, max_workers=3)
+    assert results == [
+        ("cats", ["vid00000001", "vid00000002"], None),
+        ("dogs", [], "quota exceeded"),
+        ("pets", ["vid00000002", "vid00000003"], None),
+    ]
+
+def test_a_video_found_under_several_topics_is_fetched_once_with_its_best_rank(fake_youtube):
+    youtube = fake_youtube(3)
+    a, b, c = (fake_youtube.video_id(n) for n in range(3))
+    grouped = group_topic_results([
+        ("cats", [a, b], None),
+        ("dogs", [], "quota exceeded"),
+        ("pets", [b, c], None),
+    ])
+    assert grouped == {a: [("cats", 1)], b: [("cats", 2), ("pets", 1)], c: [("pets", 2)]}
+    assert min(rank for _, rank in grouped[b]) == 1
+    get_videos_info(youtube, list(grouped))
+    assert youtube.requested_ids == [a, b, c]
+
+def test_top_tags_come_from_one_search_and_one_masked_video_lookup(tagged_youtube, clock):
+    tags = top_tags_for_topic(lambda: tagged_youtube, "cats")
+    assert tags[0] == "fake"
+    assert sorted(tags[1:]) == ["vid00000000", "vid00000001", "vid00000002"]
+    assert tagged_youtube.calls == {"channels": 0, "playlistItems": 0, "videos": 1, "search": 1}
+    assert tagged_youtube.video_fields == ["items(snippet/tags)"]
+
+def test_repeated_topics_are_answered_from_the_memo(tagged_youtube, clock):
+    build = factory(tagged_youtube)
+    first = top_tags_for_topic(build, "cats")
+    first.append("mutated")
+    # Same topic after normalization; the caller's copy can't leak into the memo
+    assert top_tags_for_topic(build, "  CATS ") == first[:-1]
+    assert len(build.builds) == 1
+    assert tagged_youtube.calls["search"] == 1
+
+def test_the_disk_cache_answers_without_building_a_client(tagged_youtube, clock, monkeypatch):
+    tags = top_tags_for_topic(lambda: tagged_youtube, "cats")
+    assert tags
+    # A new process: empty memo, same disk cache
+    monkeypatch.setattr(youtube_handler, "_top_tags_memo", OrderedDict())
+    build = factory(tagged_youtube)
+    assert top_tags_for_topic(build, "cats") == tags
+    assert build.builds == []
+
+def test_top_tags_are_looked_up_again_once_they_expire(tagged_youtube, clock):
+    build = factory(tagged_youtube)
+    top_tags_for_topic(build, "cats")
+    clock[0] += TOP_TAGS_TTL_SECONDS - 1
+    top_tags_for_topic(build, "cats")
+    assert tagged_youtube.calls["search"] == 1
+    clock[0] += 2
+    top_tags_for_topic(build, "cats")
+    assert len(build.builds) == 2
+    assert tagged_youtube.calls == {"channels": 0, "playlistItems": 0, "videos": 2, "search": 2}
+
+def test_one_youtube_client_is_built_per_key_and_endpoint(monkeypatch):
+    monkeypatch.setattr(youtube_handler, "_youtube_clients", {})
+    monkeypatch.setattr(youtube_handler, "build_youtube", lambda api_key: object())
+    monkeypatch.delenv("YOUTUBE_API_ENDPOINT", raising=False)
+    client = get_youtube("key-one")
+    assert get_youtube("key-one") is client
+    assert get_youtube("key-two") is not client
+    monkeypatch.setenv("YOUTUBE_API_ENDPOINT", "http://127.0.0.1:1/")
+    assert get_youtube("key-one") is not client
+
+def test_concurrent_requests_never_share_an_idle_connection(monkeypatch):
+    workers = 4
+    built = []
+    in_flight = threading.Barrier(workers)
+
+    class FakeHttp:
+        def __init__(self):
+            self.busy = False
+            built.append(self)
+
+        def request(self, uri, **kwargs):
+            assert not self.busy, "two requests on one httplib2.Http"
+            self.busy = True
+            try:
+                if kwargs.get("wait"):
+                    in_flight.wait(timeout=5)
+                return uri
+            finally:
+                self.busy = False
+
+    monkeypatch.setattr(youtube_handler, "build_http", FakeHttp)
+    pool = _HttpPool()
+    answered = []
+    threads = [threading.Thread(target=lambda uri: answered.append(pool.request(uri, wait=True)), args=(f"/r{n}",))
+               for n in range(workers)]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+    assert sorted(answered) == [f"/r{n}" for n in range(workers)]
+    # One connection per request in flight, all kept for the next run
+    assert len(built) == workers
+    assert sorted(map(id, pool.idle)) == sorted(map(id, built))
+    assert [pool.request(f"/again{n}") for n in range(3)] == ["/again0", "/again1", "/again2"]
+    assert len(built) == workers
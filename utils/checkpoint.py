@@ -0,0 +1,66 @@
+# utils/checkpoint.py
+
+import json
+import os
+import re
+import threading
+
+from utils.cache import CACHE_DIR
+
+RUNS_DIR = os.path.join(CACHE_DIR, "runs")
+
+
+class Checkpoint:
+    """Append-only JSONL journal of finished records for one export run.
+
+    Each record is flushed to disk as soon as it is appended, so a run that
+    dies part-way can be restarted with the same run_id and skip every
+    video_id already in the journal.
+    """
+
+    def __init__(self, run_id, directory=RUNS_DIR, key="video_id"):
+        if not re.fullmatch(r"[\w.-]+", run_id):
+            raise ValueError(f"Invalid run ID: {run_id!r} (use letters, digits, '.', '-' or '_')")
+        os.makedirs(directory, exist_ok=True)
+        self.run_id = run_id
+        self.key = key
+        self.path = os.path.join(directory, f"{run_id}.jsonl")
+        self.lock = threading.Lock()
+        self.done_ids = self._load()
+
+    def _load(self):
+        # Only IDs stay in memory; records are re-read from the journal when needed
+        if not os.path.exists(self.path):
+            return set()
+        with open(self.path, "rb+") as f:
+            data = f.read()
+            if data and not data.endswith(b"\n"):
+                # A crash mid-write leaves one torn line at the end; drop it before appending again
+                data = data[:data.rfind(b"\n") + 1]
+                f.seek(0)
+                f.truncate(len(data))
+        return {record[self.key] for record in self.iter_records()}
+
+    def iter_records(self):
+        if not os.path.exists(self.path):
+            return
+        with open(self.path, encoding="utf-8") as f:
+            for line in f:
+                if line.strip():
+                    yield json.loads(line)
+
+    def completed_ids(self):
+        with self.lock:
+            return set(self.done_ids)
+
+    def completed(self):
+        return {record[self.key]: record for record in self.iter_records()}
+
+    def append(self, record):
+        line = json.dumps(record, ensure_ascii=False, default=str)
+        with self.lock:
+            with open(self.path, "a", encoding="utf-8") as f:
+                f.write(line + "\n")
+                f.flush()
+                os.fsync(f.fileno())
+            self.done_ids.add(record[self.key])
@@ -0,0 +1,89 @@
+# utils/concurrency.py
+
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor, as_completed
+
+from utils.tracing import propagate
+
+DEFAULT_MAX_WORKERS = 8
+
+
+class TokenBucket:
+    def __init__(self, capacity, refill_per_second):
+        self.capacity = float(capacity)
+        self.refill_per_second = float(refill_per_second)
+        self.level = float(capacity)
+        self.updated = time.monotonic()
+
+    def refill(self, now):
+        self.level = min(self.capacity, self.level + (now - self.updated) * self.refill_per_second)
+        self.updated = now
+
+    def wait_time(self, amount):
+        # A request larger than the whole bucket is let through once the bucket is full
+        amount = min(amount, self.capacity)
+        if self.level >= amount:
+            return 0.0
+        return (amount - self.level) / self.refill_per_second
+
+
+class RateLimiter:
+    """Requests-per-minute and tokens-per-minute buckets shared by all worker threads.
+
+    Limits start from the given defaults and are corrected from the
+    x-ratelimit-* headers of every response (see update_from_headers).
+    """
+
+    def __init__(self, requests_per_minute=500, tokens_per_minute=30000):
+        self.requests = TokenBucket(requests_per_minute, requests_per_minute / 60)
+        self.tokens = TokenBucket(tokens_per_minute, tokens_per_minute / 60)
+        self.lock = threading.Lock()
+
+    def acquire(self, tokens=1):
+        while True:
+            with self.lock:
+                now = time.monotonic()
+                self.requests.refill(now)
+                self.tokens.refill(now)
+                wait = max(self.requests.wait_time(1), self.tokens.wait_time(tokens))
+                if wait <= 0:
+                    self.requests.level -= 1
+                    self.tokens.level -= min(tokens, self.tokens.capacity)
+                    return
+            time.sleep(wait)
+
+    def update_from_headers(self, headers):
+        with self.lock:
+            for bucket, kind in ((self.requests, "requests"), (self.tokens, "tokens")):
+                limit = _header_number(headers, f"x-ratelimit-limit-{kind}")
+                remaining = _header_number(headers, f"x-ratelimit-remaining-{kind}")
+                if limit:
+                    bucket.capacity = limit
+                    bucket.refill_per_second = limit / 60
+                if remaining is not None:
+                    bucket.level = min(bucket.level, remaining)
+
+
+def _header_number(headers, name):
+    value = headers.get(name)
+    try:
+        return float(value) if value is not None else None
+    except ValueError:
+        return None
+
+
+def run_in_pool(fn, items, max_workers=DEFAULT_MAX_WORKERS, on_progress=None):
+    # Results come back in input order regardless of completion order
+    items = list(items)
+    results = [None] * len(items)
+    if not items:
+        return results
+    fn = propagate(fn)
+    with ThreadPoolExecutor(max_workers=max(1, int(max_workers))) as pool:
+        futures = {pool.submit(fn, item): i for i, item in enumerate(items)}
+        for done, future in enumerate(as_completed(futures), 1):
+            results[futures[future]] = future.result()
+            if on_progress:
+                on_progress(done, len(items))
+    return results
@@ -0,0 +1,234 @@
+# utils/export.py
+
+import csv
+import json
+import os
+import re
+import threading
+from io import BytesIO
+
+from utils.seo_schema import SEO_COLUMNS, SEO_LIST_COLUMNS
+from utils.tracing import span
+
+EXCEL_MIME = "application/vnd.openxmlformats-officedocument.spreadsheetml.sheet"
+EXCEL_CELL_LIMIT = 32767
+
+VIDEO_COLUMNS = [
+    "video_id", "title", "description", "tags", "views", "published_date", "url", "keyword",
+    *SEO_COLUMNS, "seo_error", "transcript_status", "transcript", "transcript_summary", "image_path", "error",
+]
+LARGE_TEXT_COLUMNS = ("description", "seo_description", "seo_output", "transcript", "caption")
+# Written as list<string> in parquet and as JSON arrays in csv/xlsx
+LIST_COLUMNS = SEO_LIST_COLUMNS
+# xlsx only: image_path cells become file links, or with image_mode="embed" the image_preview file is
+# placed in the row as well
+IMAGE_PATH_COLUMN = "image_path"
+IMAGE_PREVIEW_COLUMN = "image_preview"
+EMBED_ROW_HEIGHT = 120
+
+
+class TextPolicy:
+    """How large text cells are written: "keep", "truncate" to max_chars, or "offload" to sidecar files.
+
+    Offloaded cells hold the sidecar path instead of the text. Excel cells are
+    always capped at the 32,767-character limit whatever the mode.
+    """
+
+    def __init__(self, mode="keep", max_chars=EXCEL_CELL_LIMIT, columns=LARGE_TEXT_COLUMNS, offload_dir=None):
+        if mode not in ("keep", "truncate", "offload"):
+            raise ValueError(f"Unknown text policy: {mode}")
+        if mode == "offload" and not offload_dir:
+            raise ValueError("offload_dir is required for the offload text policy")
+        self.mode = mode
+        self.max_chars = max_chars
+        self.columns = set(columns)
+        self.offload_dir = offload_dir
+
+    def apply(self, record, key):
+        row = {}
+        for column, value in record.items():
+            if column in self.columns and isinstance(value, str) and len(value) > self.max_chars:
+                if self.mode == "truncate":
+                    value = value[:self.max_chars]
+                elif self.mode == "offload":
+                    value = self._offload(value, key, column)
+            row[column] = value
+        return row
+
+    def _offload(self, value, key, column):
+        os.makedirs(self.offload_dir, exist_ok=True)
+        safe_key = re.sub(r"[^\w.-]", "_", str(key))
+        path = os.path.join(self.offload_dir, f"{safe_key}.{column}.txt")
+        with open(path, "w", encoding="utf-8") as f:
+            f.write(value)
+        return path
+
+
+def _fit_scale(path, height_pt):
+    # Scale factor that fits the image in a row of height_pt points (96 dpi pixels, 0.75 pt per pixel)
+    try:
+        from PIL import Image
+
+        with Image.open(path) as image:
+            return min(1.0, height_pt / 0.75 / image.height)
+    except Exception:
+        return 1.0
+
+def _cell(value):
+    if value is None:
+        return ""
+    if isinstance(value, (list, tuple, dict)):
+        return json.dumps(value, ensure_ascii=False)
+    return value
+
+
+class StreamingExporter:
+    """Writes records one at a time to xlsx (constant_memory), csv, parquet (row groups) or jsonl.
+
+    The column set is fixed when the exporter is created, because the header
+    row has already been flushed by the time later records arrive; keys
+    outside it are dropped.
+    """
+
+    def __init__(self, target, fmt, columns=VIDEO_COLUMNS, sheet_name="Videos", text_policy=None,
+                 row_group_size=1000, key_column="video_id", image_mode="link"):
+        self.target = target
+        self.fmt = fmt
+        self.image_mode = image_mode
+        self.columns = list(columns)
+        self.text_policy = text_policy or TextPolicy()
+        self.key_column = key_column
+        self.rows = 0
+        self._owns_file = isinstance(target, str)
+
+        if fmt == "xlsx":
+            import xlsxwriter
+            self.workbook = xlsxwriter.Workbook(target, {"constant_memory": True, "strings_to_urls": False})
+            self.sheet = self.workbook.add_worksheet(sheet_name)
+            self.sheet.write_row(0, 0, self.columns)
+        elif fmt == "csv":
+            self.file = open(target, "w", newline="", encoding="utf-8") if self._owns_file else target
+            self.writer = csv.DictWriter(self.file, fieldnames=self.columns, extrasaction="ignore")
+            self.writer.writeheader()
+        elif fmt == "jsonl":
+            self.file = open(target, "w", encoding="utf-8") if self._owns_file else target
+        elif fmt == "parquet":
+            import pyarrow as pa
+            import pyarrow.parquet as pq
+            self._pa = pa
+            self.schema = pa.schema([
+                (column, pa.list_(pa.string()) if column in LIST_COLUMNS else pa.string()) for column in self.columns
+            ])
+            self.writer = pq.ParquetWriter(target, self.schema)
+            self.row_group_size = row_group_size
+            self.buffer = []
+        else:
+            raise ValueError(f"Unsupported export format: {fmt}")
+
+    @classmethod
+    def for_path(cls, path, **kwargs):
+        fmt = os.path.splitext(path)[1].lower().lstrip(".")
+        return cls(path, fmt, **kwargs)
+
+    def write(self, record):
+        with span("export_write", record.get(self.key_column)):
+            self._write(record)
+
+    def _write(self, record):
+        row = self.text_policy.apply(record, record.get(self.key_column, self.rows))
+        if self.fmt == "xlsx":
+            values = [_cell(row.get(column)) for column in self.columns]
+            values = [v[:EXCEL_CELL_LIMIT] if isinstance(v, str) else v for v in values]
+            self._write_xlsx_row(self.rows + 1, row, values)
+        elif self.fmt == "csv":
+            self.writer.writerow({column: _cell(row.get(column)) for column in self.columns})
+        elif self.fmt == "jsonl":
+            self.file.write(json.dumps({c: row.get(c) for c in self.columns}, ensure_ascii=False, default=str) + "\n")
+        else:
+            self.buffer.append(row)
+            if len(self.buffer) >= self.row_group_size:
+                self._flush_row_group()
+        self.rows += 1
+
+    def _write_xlsx_row(self, index, row, values):
+        # constant_memory mode: the row height has to be set before any of its cells are written
+        image_path = row.get(IMAGE_PATH_COLUMN)
+        preview = row.get(IMAGE_PREVIEW_COLUMN) or image_path
+        embed = self.image_mode == "embed" and preview and os.path.exists(preview)
+        if embed:
+            self.sheet.set_row(index, EMBED_ROW_HEIGHT)
+        self.sheet.write_row(index, 0, values)
+        if image_path and IMAGE_PATH_COLUMN in self.columns and self.image_mode:
+            column = self.columns.index(IMAGE_PATH_COLUMN)
+            self.sheet.write_url(index, column, "external:" + os.path.abspath(image_path),
+                                 string=os.path.basename(image_path))
+            if embed:
+                scale = _fit_scale(preview, EMBED_ROW_HEIGHT)
+                self.sheet.insert_image(index, column, preview, {"x_scale": scale, "y_scale": scale,
+                                                                 "object_position": 1})
+
+    def _flush_row_group(self):
+        if not self.buffer:
+            return
+        data = {
+            column: [
+                r.get(column) if column in LIST_COLUMNS
+                else None if r.get(column) is None else str(_cell(r.get(column)))
+                for r in self.buffer
+            ]
+            for column in self.columns
+        }
+        self.writer.write_table(self._pa.Table.from_pydict(data, schema=self.schema))
+        self.buffer = []
+
+    def close(self):
+        with span("export_close", format=self.fmt, rows=self.rows):
+            if self.fmt == "xlsx":
+                self.workbook.close()
+            elif self.fmt == "parquet":
+                self._flush_row_group()
+                self.writer.close()
+            elif self._owns_file:
+                self.file.close()
+            else:
+                self.file.flush()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        self.close()
+
+
+class OrderedSink:
+    """Thread-safe adapter that forwards (position, record) pairs to a writer in position order.
+
+    Workers finish out of order; only the gap between the next expected
+    position and the furthest finished one is held in memory.
+    """
+
+    def __init__(self, writer):
+        self.writer = writer
+        self.pending = {}
+        self.next_position = 0
+        self.lock = threading.Lock()
+
+    def put(self, position, record):
+        with self.lock:
+            self.pending[position] = record
+            while self.next_position in self.pending:
+                self.writer.write(self.pending.pop(self.next_position))
+                self.next_position += 1
+
+
+def to_excel_bytes(records, sheet_name="Videos", columns=None, **kwargs):
+    # Streamlit download helper: streams rows straight into the workbook instead of via a DataFrame
+    records = list(records)
+    if columns is None:
+        columns = list(dict.fromkeys(key for record in records for key in record))
+    output = BytesIO()
+    with StreamingExporter(output, "xlsx", columns=columns, sheet_name=sheet_name, **kwargs) as exporter:
+        for record in records:
+            exporter.write(record)
+    output.seek(0)
+    return output
@@ -0,0 +1,189 @@
+# utils/hashtag_index.py
+
+import csv
+import heapq
+import io
+import json
+import math
+import os
+import re
+import threading
+import time
+from collections import Counter
+from datetime import datetime
+
+from utils.cache import CACHE_DIR
+
+HASHTAG_INDEX_PATH = os.path.join(CACHE_DIR, "hashtags.json")
+HALF_LIFE_DAYS = 30
+# Decayed weights are stored relative to a fixed epoch so adding a post never rescales the others
+DECAY_EPOCH = 1704067200  # 2024-01-01 UTC
+SEED_WEIGHT = 5
+HASHTAG_RE = re.compile(r"#(\w+)")
+URL_RE = re.compile(r"https?://\S+")
+WORD_RE = re.compile(r"[a-z0-9]{3,}")
+STOPWORDS = {"the", "and", "for", "with", "this", "that", "you", "your", "from", "are", "our", "was", "have"}
+
+
+def normalize_tag(tag):
+    return "#" + tag.strip().lstrip("#").lower()
+
+def post_tags(post):
+    # Explicit hashtags plus any written inline in the caption
+    hashtags = post.get("hashtags") or []
+    if isinstance(hashtags, str):
+        hashtags = re.split(r"[\s,]+", hashtags)
+    tags = [normalize_tag(tag) for tag in hashtags if tag.strip().lstrip("#")]
+    tags += [normalize_tag(tag) for tag in HASHTAG_RE.findall(post.get("caption") or "")]
+    return list(dict.fromkeys(tags))
+
+def post_key(post):
+    # Posts with an ID or URL are indexed once however often they are processed or imported
+    key = post.get("id") or post.get("post_url")
+    return str(key) if key else None
+
+def _timestamp(value):
+    if isinstance(value, (int, float)):
+        return float(value)
+    if isinstance(value, str) and value.strip():
+        try:
+            return float(value)
+        except ValueError:
+            pass
+        try:
+            return datetime.fromisoformat(value.strip().replace("Z", "+00:00")).timestamp()
+        except ValueError:
+            pass
+    return time.time()
+
+
+class HashtagIndex:
+    """Hashtag frequencies and co-occurrences learned from processed posts.
+
+    Each tag keeps a time-decayed frequency (half-life HALF_LIFE_DAYS), the
+    tags it appeared with, and the caption words it appeared with. Keyed
+    posts (see post_key) remember what they contributed, so adding one again
+    replaces its earlier entry. Topic lookups are memoized until the next post
+    is added, and the whole index is saved to one JSON file.
+    """
+
+    def __init__(self, path=HASHTAG_INDEX_PATH, half_life_days=HALF_LIFE_DAYS):
+        self.path = path
+        self.rate = math.log(2) / (half_life_days * 86400)
+        self.lock = threading.Lock()
+        self.weights = {}
+        self.cooccurrence = {}
+        self.words = {}
+        self.entries = {}
+        self.posts = 0
+        self._topics = {}
+        if path and os.path.exists(path):
+            self._load()
+
+    def _load(self):
+        with open(self.path, encoding="utf-8") as f:
+            data = json.load(f)
+        self.weights = data["weights"]
+        self.cooccurrence = {tag: Counter(others) for tag, others in data["cooccurrence"].items()}
+        self.words = {word: Counter(tags) for word, tags in data["words"].items()}
+        self.entries = data.get("entries", {})
+        self.posts = data["posts"]
+
+    def save(self):
+        with self.lock:
+            data = {"weights": self.weights, "cooccurrence": self.cooccurrence, "words": self.words,
+                    "entries": self.entries, "posts": self.posts}
+            os.makedirs(os.path.dirname(self.path) or ".", exist_ok=True)
+            tmp_path = self.path + ".tmp"
+            with open(tmp_path, "w", encoding="utf-8") as f:
+                json.dump(data, f, ensure_ascii=False, separators=(",", ":"))
+            os.replace(tmp_path, self.path)
+
+    def add_post(self, post, key=None):
+        key = key or post_key(post)
+        tags = post_tags(post)
+        boost = math.exp(self.rate * (_timestamp(post.get("timestamp")) - DECAY_EPOCH))
+        caption = HASHTAG_RE.sub(" ", URL_RE.sub(" ", post.get("caption") or "")).lower()
+        words = sorted({word for word in WORD_RE.findall(caption) if word not in STOPWORDS})
+        with self.lock:
+            if key in self.entries:
+                self._remove(self.entries.pop(key))
+            if tags:
+                self._apply(tags, words, boost, 1)
+                if key:
+                    self.entries[key] = {"tags": tags, "words": words, "boost": boost}
+            self._topics.clear()
+
+    def _apply(self, tags, words, boost, sign):
+        # sign=-1 takes back exactly what sign=1 added for the same post
+        for tag in tags:
+            self.weights[tag] = self.weights.get(tag, 0.0) + sign * boost
+            others = self.cooccurrence.setdefault(tag, Counter())
+            others.update({other: sign for other in tags if other != tag})
+        for word in words:
+            self.words.setdefault(word, Counter()).update({tag: sign for tag in tags})
+        self.posts += sign
+
+    def _remove(self, entry):
+        tags, words = entry["tags"], entry["words"]
+        self._apply(tags, words, entry["boost"], -1)
+        for tag in tags:
+            # What is left of a tag only this post used is floating-point residue
+            if self.weights[tag] <= entry["boost"] * 1e-12:
+                del self.weights[tag]
+                del self.cooccurrence[tag]
+            else:
+                self.cooccurrence[tag] = +self.cooccurrence[tag]
+        for word in words:
+            self.words[word] = +self.words[word]
+            if not self.words[word]:
+                del self.words[word]
+
+    def add_posts(self, posts):
+        for post in posts:
+            self.add_post(post)
+
+    def frequency(self, tag, now=None):
+        # Decayed number of posts using the tag as of now
+        weight = self.weights.get(normalize_tag(tag), 0.0)
+        return weight * math.exp(-self.rate * ((now or time.time()) - DECAY_EPOCH))
+
+    def top_tags(self, topic, n=10):
+        # Tags related to the topic's words (as hashtags, co-occurring tags or caption words), ranked by
+        # relevance times current trend weight
+        key = (topic.strip().lower(), n)
+        cached = self._topics.get(key)
+        if cached is not None:
+            return cached
+        with self.lock:
+            relevance = Counter()
+            for token in WORD_RE.findall(key[0]) or [key[0].lstrip("#")]:
+                seed = "#" + token
+                if seed in self.weights:
+                    relevance[seed] += SEED_WEIGHT * max(1, sum(self.cooccurrence[seed].values()))
+                    relevance.update(self.cooccurrence[seed])
+                relevance.update(self.words.get(token, {}))
+            ranked = heapq.nlargest(n, relevance, key=lambda tag: relevance[tag] * self.weights.get(tag, 0.0))
+            self._topics[key] = ranked
+        return ranked
+
+
+def parse_posts(text, fmt):
+    # Dataset import: JSONL, a JSON list, or CSV with caption, hashtags (space or comma separated) and timestamp
+    if fmt == "csv":
+        return list(csv.DictReader(io.StringIO(text)))
+    if fmt == "jsonl":
+        return [json.loads(line) for line in text.splitlines() if line.strip()]
+    return json.loads(text)
+
+
+_index = None
+_index_lock = threading.Lock()
+
+
+def get_hashtag_index():
+    global _index
+    with _index_lock:
+        if _index is None:
+            _index = HashtagIndex()
+        return _index
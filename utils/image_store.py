@@ -0,0 +1,93 @@
+# utils/image_store.py
+
+import base64
+import hashlib
+import os
+import urllib.request
+
+from utils.cache import CACHE_DIR, get_cache, make_key
+from utils.resilience import resilient_call
+from utils.tracing import span, traced
+
+IMAGES_DIR = os.path.join(CACHE_DIR, "images")
+IMAGE_MODEL = "gpt-image-1"
+# Bump when the prompt template changes so cached images are not reused
+IMAGE_PROMPT_VERSION = "thumbnail-v1"
+DEFAULT_IMAGE_WORKERS = 4
+PREVIEW_PX = 384
+
+
+class ImageStore:
+    """Content-addressed image files: the SHA-256 of the bytes is the file name.
+
+    Identical images are stored once, and downscaled JPEG previews are made
+    on first use and kept next to the originals.
+    """
+
+    def __init__(self, directory=IMAGES_DIR):
+        self.directory = directory
+
+    def path(self, digest, ext="png"):
+        return os.path.join(self.directory, digest[:2], f"{digest}.{ext}")
+
+    def put(self, data, ext="png"):
+        digest = hashlib.sha256(data).hexdigest()
+        path = self.path(digest, ext)
+        if not os.path.exists(path):
+            os.makedirs(os.path.dirname(path), exist_ok=True)
+            tmp_path = f"{path}.{os.getpid()}.tmp"
+            with open(tmp_path, "wb") as f:
+                f.write(data)
+            os.replace(tmp_path, path)
+        return path
+
+    def preview(self, path, max_px=PREVIEW_PX):
+        # Pillow ships with Streamlit; a failed downscale falls back to the original file
+        preview_path = f"{os.path.splitext(path)[0]}.preview{max_px}.jpg"
+        if os.path.exists(preview_path):
+            return preview_path
+        try:
+            from PIL import Image
+
+            with Image.open(path) as image:
+                image.thumbnail((max_px, max_px))
+                image.convert("RGB").save(f"{preview_path}.tmp", "JPEG", quality=85)
+            os.replace(f"{preview_path}.tmp", preview_path)
+            return preview_path
+        except Exception:
+            return path
+
+
+def _image_bytes(item):
+    # gpt-image-1 answers with base64; URL responses are downloaded once, before they expire
+    if getattr(item, "b64_json", None):
+        return base64.b64decode(item.b64_json)
+    with urllib.request.urlopen(item.url, timeout=60) as response:
+        return response.read()
+
+@traced("image")
+def generate_thumbnail(client, prompt, size, store=None, slots=None, force_refresh=False):
+    # Returns the stored image path; the same prompt and size never reach the API twice.
+    # slots (a semaphore) caps concurrent image requests below the general worker count.
+    store = store or ImageStore()
+    cache = get_cache("images")
+    key = make_key(IMAGE_PROMPT_VERSION, IMAGE_MODEL, prompt, size)
+    if not force_refresh:
+        path = cache.get(key)
+        if path and os.path.exists(path):
+            return path
+    if slots:
+        with span("image_wait"):
+            slots.acquire()
+    try:
+        response = resilient_call("openai", lambda: client.images.generate(
+            model=IMAGE_MODEL,
+            prompt=f"Thumbnail for: {prompt}",
+            size=size
+        ))
+    finally:
+        if slots:
+            slots.release()
+    path = store.put(_image_bytes(response.data[0]))
+    cache.set(key, path)
+    return path
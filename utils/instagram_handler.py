@@ -1,9 +1,16 @@
 import re
 import pandas as pd
-import time
-from io import BytesIO
 import streamlit as st
 
+from utils.concurrency import DEFAULT_MAX_WORKERS, RateLimiter, run_in_pool
+from utils.export import EXCEL_MIME, to_excel_bytes
+from utils.hashtag_index import get_hashtag_index
+from utils.llm import cached_chat_completion
+from utils.tracing import start_trace, stop_trace, traced
+from utils.ui import live_stage_breakdown, show_stage_breakdown
+
+SEO_PROMPT_VERSION = "instagram-seo-v1"
+
 
 def extract_instagram_post_id(url):
     match = re.search(r"instagram.com/p/([\w-]+)/", url)
@@ -19,7 +26,52 @@ def mock_fetch_instagram_post_data(url, ig_api_key=None):
         "api_key_used": bool(ig_api_key)
     }
 
-def generate_seo_from_instagram(post, client, openai_key, top_tags):
+# name -> (fetch(url, ig_api_key) -> post dict, requests per minute the source allows or None for no limit,
+#          whether its posts are real enough to feed the hashtag trend index)
+INSTAGRAM_FETCHERS = {"mock": (mock_fetch_instagram_post_data, None, False)}
+DEFAULT_INSTAGRAM_FETCHER = "mock"
+
+def register_instagram_fetcher(name, fetch, requests_per_minute=None, index_posts=True):
+    INSTAGRAM_FETCHERS[name] = (fetch, requests_per_minute, index_posts)
+
+@traced("instagram_fetch", video_id=lambda fetch, url, *args, **kwargs: url)
+def _fetch_post(fetch, url, ig_api_key, fetch_limiter=None):
+    if fetch_limiter:
+        fetch_limiter.acquire()
+    try:
+        return fetch(url, ig_api_key)
+    except Exception as e:
+        return {"post_url": url, "error": f"Fetch Error: {e}"}
+
+def process_instagram_urls(urls, enable_seo, client, openai_key, top_tags, ig_api_key=None,
+                           fetcher=DEFAULT_INSTAGRAM_FETCHER, max_workers=DEFAULT_MAX_WORKERS, force_refresh=False,
+                           on_progress=None):
+    # Each worker fetches a post and goes straight on to its SEO request, so fetches and OpenAI calls
+    # overlap; the two rate limiters are the only thing that holds the pool back
+    fetch, requests_per_minute, index_posts = INSTAGRAM_FETCHERS[fetcher]
+    fetch_limiter = RateLimiter(requests_per_minute=requests_per_minute) if requests_per_minute else None
+    limiter = RateLimiter()
+
+    def process(url):
+        post = _fetch_post(fetch, url, ig_api_key, fetch_limiter)
+        if enable_seo and not post.get("error"):
+            post["seo_output"] = generate_seo_from_instagram(post, client, openai_key, top_tags, limiter,
+                                                             force_refresh)
+        return post
+
+    urls = [url.strip() for url in urls if url.strip()]
+    posts = run_in_pool(process, urls, max_workers=max_workers, on_progress=on_progress)
+    if index_posts:
+        # Keyed by post, so processing the same URLs again replaces their entries instead of counting them twice
+        index = get_hashtag_index()
+        for post in posts:
+            if not post.get("error"):
+                index.add_post(post, key=extract_instagram_post_id(post["post_url"]) or post["post_url"])
+        index.save()
+    return posts
+
+@traced("instagram_seo", video_id=lambda post, *args, **kwargs: post.get("post_url"))
+def generate_seo_from_instagram(post, client, openai_key, top_tags, limiter=None, force_refresh=False):
     if not client:
         return "❌ OpenAI key missing"
 
@@ -41,30 +93,34 @@ def generate_seo_from_instagram(post, client, openai_key, top_tags):
     """
 
     try:
-        response = client.chat.completions.create(
-            model="gpt-4o",
-            messages=[{"role": "user", "content": prompt}]
-        )
-        return response.choices[0].message.content
+        cache_fields = {
+            "template": SEO_PROMPT_VERSION,
+            "caption": post["caption"],
+            "hashtags": post.get("hashtags", []),
+            "top_tags": top_tags or [],
+        }
+        return cached_chat_completion(client, prompt, cache_fields, model="gpt-4o", limiter=limiter,
+                                      force_refresh=force_refresh)
     except Exception as e:
         return f"OpenAI Error: {e}"
 
-def handle_instagram_single(url, enable_seo, client, openai_key, top_tags, ig_api_key=None):
+def handle_instagram_single(url, enable_seo, client, openai_key, top_tags, ig_api_key=None,
+                            fetcher=DEFAULT_INSTAGRAM_FETCHER):
     st.subheader("📸 Instagram Single Post Analysis")
 
     with st.form(key="insta_single_form"):
         ig_api_key = st.text_input("📷 Instagram API Key (optional)", value=ig_api_key, key="single_ig_key")
         url = st.text_input("📎 Paste Instagram Post URL:", value=url, key="single_post_url")
         enable_seo = st.checkbox("✨ Enable SEO Tagging", value=enable_seo)
+        force_refresh = st.checkbox("🔄 Force refresh (ignore cached SEO)", key="single_ig_refresh")
         submit = st.form_submit_button("📥 Fetch Instagram Data")
         if submit:
-            post = mock_fetch_instagram_post_data(url, ig_api_key)
-            if enable_seo:
-                post["seo_output"] = generate_seo_from_instagram(post, client, openai_key, top_tags)
-                time.sleep(5)
+            post = process_instagram_urls([url], enable_seo, client, openai_key, top_tags, ig_api_key, fetcher,
+                                          force_refresh=force_refresh)[0]
             st.json(post)
 
-def handle_instagram_urls(file, enable_seo, client, openai_key, top_tags, ig_api_key=None):
+def handle_instagram_urls(file, enable_seo, client, openai_key, top_tags, ig_api_key=None,
+                          max_workers=DEFAULT_MAX_WORKERS, record_trace=False, fetcher=DEFAULT_INSTAGRAM_FETCHER):
     st.subheader("📸 Instagram Batch URL Analysis")
     if not file:
         st.info("📄 Please upload a file first.")
@@ -73,34 +129,38 @@ def handle_instagram_urls(file, enable_seo, client, openai_key, top_tags, ig_api
     with st.form(key="insta_batch_form"):
         ig_api_key = st.text_input("📷 Instagram API Key (optional)", value=ig_api_key, key="batch_ig_key")
         enable_seo = st.checkbox("✨ Enable SEO Tagging", value=enable_seo)
+        force_refresh = st.checkbox("🔄 Force refresh (ignore cached SEO)", key="batch_ig_refresh")
         submit = st.form_submit_button("📥 Fetch Instagram Data")
         if submit:
+            tracer = start_trace(record_trace)
             content = file.read().decode("utf-8")
             urls = content.strip().splitlines()
-            results = []
-            for url in urls:
-                post = mock_fetch_instagram_post_data(url, ig_api_key)
-                if enable_seo:
-                    post["seo_output"] = generate_seo_from_instagram(post, client, openai_key, top_tags)
-                    time.sleep(5)
-                results.append(post)
+            results = process_instagram_urls(
+                urls, enable_seo, client, openai_key, top_tags, ig_api_key, fetcher,
+                max_workers=max_workers,
+                force_refresh=force_refresh,
+                on_progress=live_stage_breakdown(tracer, st.progress(0.0))
+            )
 
             df = pd.DataFrame(results)
             st.dataframe(df)
 
-            output = BytesIO()
-            with pd.ExcelWriter(output, engine='xlsxwriter') as writer:
-                df.to_excel(writer, index=False, sheet_name="Instagram SEO")
-            output.seek(0)
+            output = to_excel_bytes(results, sheet_name="Instagram SEO")
 
             st.download_button(
                 label=f"⬇️ Download Instagram SEO Report",
                 data=output,
                 file_name="instagram_seo.xlsx",
-                mime="application/vnd.openxmlformats-officedocument.spreadsheetml.sheet"
+                mime=EXCEL_MIME
             )
-
-def get_top_instagram_hashtags(topic):
+            stop_trace()
+            show_stage_breakdown(tracer, "instagram_trace.json")
+
+def get_top_instagram_hashtags(topic, n=10):
+    # Learned from processed and imported posts; the sample lists only cover topics the index hasn't seen
+    top_tags = get_hashtag_index().top_tags(topic, n)
+    if top_tags:
+        return top_tags
     sample = {
         "fitness": ["#fitness", "#fitspo", "#workout", "#gymlife"],
         "travel": ["#travelgram", "#wanderlust", "#explore", "#vacationvibes"],
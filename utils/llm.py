@@ -0,0 +1,82 @@
+# utils/llm.py
+
+import threading
+
+from openai import DEFAULT_CONNECTION_LIMITS, DefaultHttpxClient, OpenAI, Timeout
+
+from utils.cache import get_cache, make_key
+from utils.resilience import resilient_call
+
+# Rough allowance for the completion when reserving tokens-per-minute capacity
+COMPLETION_TOKEN_ESTIMATE = 600
+# Keep-alive connections per client: the largest worker count the apps offer (32) plus headroom
+CLIENT_POOL_SIZE = 48
+CLIENT_TIMEOUT_SECONDS = 120
+
+# The SDK's own httpx Limits class, so the pool settings match whichever httpx it was built against
+Limits = type(DEFAULT_CONNECTION_LIMITS)
+
+_clients = {}
+_clients_lock = threading.Lock()
+
+
+def get_openai_client(api_key, base_url=None, pool_size=CLIENT_POOL_SIZE):
+    # One client per key for the whole process, so Streamlit reruns reuse warm connections. The httpx
+    # pool is safe to share between threads. SDK retries are off: every call made with the client
+    # (chat, images, Batch API files and batches) goes through resilient_call("openai", ...), which retries.
+    if not api_key:
+        return None
+    with _clients_lock:
+        key = (api_key, base_url)
+        if key not in _clients:
+            http_client = DefaultHttpxClient(
+                limits=Limits(max_connections=pool_size, max_keepalive_connections=pool_size),
+                timeout=Timeout(CLIENT_TIMEOUT_SECONDS, connect=10.0)
+            )
+            _clients[key] = OpenAI(api_key=api_key, base_url=base_url, max_retries=0, http_client=http_client)
+        return _clients[key]
+
+
+def estimate_tokens(text):
+    return len(text) // 4 + 1
+
+def chat_completion(client, prompt, model="gpt-4o", limiter=None, completion_tokens=COMPLETION_TOKEN_ESTIMATE,
+                    **kwargs):
+    # Retried through the shared "openai" endpoint; every attempt takes its own rate-limiter budget
+    def attempt():
+        if limiter:
+            limiter.acquire(estimate_tokens(prompt) + completion_tokens)
+        raw = client.chat.completions.with_raw_response.create(
+            model=model,
+            messages=[{"role": "user", "content": prompt}],
+            **kwargs
+        )
+        if limiter:
+            limiter.update_from_headers(raw.headers)
+        return raw.parse()
+
+    response = resilient_call("openai", attempt)
+    return response.choices[0].message.content
+
+def completion_cache_key(model, cache_fields, **kwargs):
+    # cache_fields should carry the prompt template version plus the inputs that shape the answer
+    return make_key(model, kwargs, cache_fields)
+
+def remember_completion(content, cache_fields, model="gpt-4o", **kwargs):
+    # Stores an answer obtained some other way (e.g. the Batch API) where cached_chat_completion will find it
+    get_cache("llm").set(completion_cache_key(model, cache_fields, **kwargs), content)
+
+def cached_chat_completion(client, prompt, cache_fields, model="gpt-4o", limiter=None, force_refresh=False,
+                           parse=None, **kwargs):
+    # parse turns the raw answer into what is returned and cached; if it raises, nothing is cached
+    cache = get_cache("llm")
+    key = completion_cache_key(model, cache_fields, **kwargs)
+    if not force_refresh:
+        cached = cache.get(key)
+        if cached is not None:
+            return cached
+    content = chat_completion(client, prompt, model=model, limiter=limiter, **kwargs)
+    if parse:
+        content = parse(content)
+    cache.set(key, content)
+    return content
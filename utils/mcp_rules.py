@@ -0,0 +1,83 @@
+# utils/mcp_rules.py
+
+import datetime
+import json
+import re
+
+RECENT_DAYS = 365
+MIN_SUBHEADINGS = 2
+MIN_LIST_ITEMS = 2
+MIN_FAQS = 2
+
+MCP_CRITERIA = [
+    "Title follows prompt style",
+    "Clear intro that answers query",
+    "Structured subheadings",
+    "Includes FAQs",
+    "Uses bullets or lists",
+    "Author/source/credibility present",
+    "Schema markup present",
+    "Conversational tone",
+    "LLM-friendly (likely to be summarized)",
+    "Recently updated",
+]
+
+
+def _parse_date(value):
+    # ISO 8601 dates as found in meta tags, JSON-LD and <time datetime>; anything else counts as missing
+    match = re.match(r"\s*(\d{4})-(\d{2})-(\d{2})", value or "")
+    if not match:
+        return None
+    try:
+        return datetime.date(*map(int, match.groups()))
+    except ValueError:
+        return None
+
+def has_subheadings(structure, today):
+    return sum(1 for level, _ in structure["headings"] if level >= 2) >= MIN_SUBHEADINGS
+
+def has_faqs(structure, today):
+    return "FAQPage" in structure["schema_types"] or len(structure["faqs"]) >= MIN_FAQS
+
+def has_lists(structure, today):
+    return any(len(items) >= MIN_LIST_ITEMS for items in structure["lists"])
+
+def has_schema(structure, today):
+    return bool(structure["schema_types"])
+
+def recently_updated(structure, today):
+    dates = [_parse_date(structure[key]) for key in ("date_modified", "date_published")]
+    return any(date and (today - date).days <= RECENT_DAYS for date in dates)
+
+# Criteria that can be read straight off the extracted page structure
+RULES = {
+    "Structured subheadings": has_subheadings,
+    "Includes FAQs": has_faqs,
+    "Uses bullets or lists": has_lists,
+    "Schema markup present": has_schema,
+    "Recently updated": recently_updated,
+}
+LLM_CRITERIA = [criterion for criterion in MCP_CRITERIA if criterion not in RULES]
+
+
+def score_rules(structure, today=None):
+    today = today or datetime.date.today()
+    return {criterion: int(rule(structure, today)) for criterion, rule in RULES.items()}
+
+def parse_llm_scores(response):
+    # The model answers only LLM_CRITERIA; raises ValueError when one is missing so nothing is cached
+    data = json.loads(response) if isinstance(response, str) else response
+    if not isinstance(data, dict):
+        raise ValueError("Scorecard is not a JSON object")
+    scores = {}
+    for criterion in LLM_CRITERIA:
+        if criterion not in data:
+            raise ValueError(f"Scorecard has no score for {criterion!r}")
+        scores[criterion] = 1 if data[criterion] in (1, True, "1", "yes", "Yes") else 0
+    return scores
+
+def combine_scores(rule_scores, llm_scores):
+    # All 10 criteria in scorecard order plus the total
+    scores = {criterion: {**rule_scores, **llm_scores}[criterion] for criterion in MCP_CRITERIA}
+    scores["total"] = sum(scores.values())
+    return scores
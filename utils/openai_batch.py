@@ -0,0 +1,133 @@
+# utils/openai_batch.py
+
+import json
+import os
+import time
+
+from utils.checkpoint import RUNS_DIR, Checkpoint
+from utils.resilience import resilient_call
+
+BATCH_ENDPOINT = "/v1/chat/completions"
+# The Batch API accepts at most 50,000 requests per input file
+BATCH_MAX_REQUESTS = 50000
+DEFAULT_POLL_SECONDS = 60
+TERMINAL_STATUSES = ("completed", "failed", "expired", "cancelled")
+
+
+class BatchJob:
+    """Runs chat-completion prompts through the OpenAI Batch API, journaled under a run ID.
+
+    Submitted batches and per-request results go to Checkpoint journals next
+    to the export journal, so a restarted job keeps polling the batches it
+    already paid for instead of submitting the same prompts again.
+    """
+
+    def __init__(self, client, run_id, model="gpt-4o", directory=RUNS_DIR, poll_seconds=DEFAULT_POLL_SECONDS,
+                 **request_kwargs):
+        self.client = client
+        self.run_id = run_id
+        self.model = model
+        self.directory = directory
+        self.poll_seconds = poll_seconds
+        self.request_kwargs = request_kwargs
+        self.batches = Checkpoint(f"{run_id}.batches", directory, key="batch_id")
+        self.results = Checkpoint(f"{run_id}.batch-results", directory, key="custom_id")
+
+    def submitted_ids(self):
+        return {custom_id for record in self.batches.iter_records() for custom_id in record.get("custom_ids", [])}
+
+    def unsubmitted(self, custom_ids):
+        seen = self.submitted_ids() | self.results.completed_ids()
+        return [custom_id for custom_id in custom_ids if custom_id not in seen]
+
+    def submit(self, requests):
+        # requests: iterable of (custom_id, prompt); written and uploaded in files of BATCH_MAX_REQUESTS
+        batch_ids = []
+        part = len(self.batches.completed_ids())
+        path, f, custom_ids = None, None, []
+        for custom_id, prompt in requests:
+            if f is None:
+                path = os.path.join(self.directory, f"{self.run_id}.batch-input-{part}.jsonl")
+                f = open(path, "w", encoding="utf-8")
+            f.write(json.dumps({
+                "custom_id": custom_id,
+                "method": "POST",
+                "url": BATCH_ENDPOINT,
+                "body": {"model": self.model, "messages": [{"role": "user", "content": prompt}],
+                         **self.request_kwargs},
+            }, ensure_ascii=False) + "\n")
+            custom_ids.append(custom_id)
+            if len(custom_ids) >= BATCH_MAX_REQUESTS:
+                f.close()
+                batch_ids.append(self._create(path, custom_ids))
+                part += 1
+                f, custom_ids = None, []
+        if f is not None:
+            f.close()
+            batch_ids.append(self._create(path, custom_ids))
+        return batch_ids
+
+    def _upload(self, path):
+        # Reopened on every attempt, since a failed upload may have consumed the file
+        with open(path, "rb") as f:
+            return self.client.files.create(file=f, purpose="batch")
+
+    def _create(self, path, custom_ids):
+        # Every Batch API call goes through the shared "openai" endpoint, which does the retrying
+        input_file = resilient_call("openai", lambda: self._upload(path))
+        batch = resilient_call("openai", lambda: self.client.batches.create(
+            input_file_id=input_file.id,
+            endpoint=BATCH_ENDPOINT,
+            completion_window="24h",
+            metadata={"run_id": self.run_id}
+        ))
+        self.batches.append({"batch_id": batch.id, "input_file_id": input_file.id, "custom_ids": custom_ids,
+                             "status": batch.status})
+        os.remove(path)
+        return batch.id
+
+    def open_batches(self):
+        # The journal holds a second record for a batch once its results are collected
+        state = {}
+        for record in self.batches.iter_records():
+            state[record["batch_id"]] = record.get("status")
+        return [batch_id for batch_id, status in state.items() if status != "collected"]
+
+    def wait(self, on_status=None):
+        pending = self.open_batches()
+        while pending:
+            for batch_id in list(pending):
+                batch = resilient_call("openai", lambda: self.client.batches.retrieve(batch_id))
+                if on_status:
+                    on_status(batch)
+                if batch.status in TERMINAL_STATUSES:
+                    self._collect(batch)
+                    pending.remove(batch_id)
+            if pending:
+                time.sleep(self.poll_seconds)
+
+    def _collect(self, batch):
+        # Expired or cancelled batches still return whatever finished before the cutoff
+        collected = self.results.completed_ids()
+        for file_id in (batch.output_file_id, batch.error_file_id):
+            if not file_id:
+                continue
+            text = resilient_call("openai", lambda: self.client.files.content(file_id).text)
+            for line in text.splitlines():
+                if not line.strip():
+                    continue
+                row = json.loads(line)
+                if row["custom_id"] in collected:
+                    continue
+                response = row.get("response") or {}
+                if row.get("error") or response.get("status_code") != 200:
+                    error = row.get("error") or response.get("body", {}).get("error")
+                    self.results.append({"custom_id": row["custom_id"], "error": str(error)})
+                else:
+                    content = response["body"]["choices"][0]["message"]["content"]
+                    self.results.append({"custom_id": row["custom_id"], "content": content})
+                collected.add(row["custom_id"])
+        self.batches.append({"batch_id": batch.id, "status": "collected", "batch_status": batch.status})
+
+    def outputs(self):
+        return {record["custom_id"]: record["content"] for record in self.results.iter_records() if "content" in record}
@@ -0,0 +1,172 @@
+# utils/page_content.py
+
+import json
+import re
+
+import lxml.etree
+import lxml.html
+
+DEFAULT_TOKEN_BUDGET = 1500
+INTRO_CHARS = 600
+LIST_ITEMS_SHOWN = 5
+# Removed everywhere; page-level header/footer only when outside the main content
+BOILERPLATE_TAGS = ("script", "style", "noscript", "template", "svg", "iframe", "nav", "aside", "form")
+BOILERPLATE_XPATH = (
+    "//header[not(ancestor::article) and not(ancestor::main)]"
+    " | //footer[not(ancestor::article) and not(ancestor::main)]"
+    " | //*[@role='navigation' or @role='banner' or @role='contentinfo' or @aria-hidden='true']"
+)
+HEADING_TAGS = ("h1", "h2", "h3", "h4")
+
+
+def _text(element):
+    return re.sub(r"\s+", " ", element.text_content()).strip()
+
+def _meta(root, *names):
+    for name in names:
+        for content in root.xpath(f"//meta[@name='{name}' or @property='{name}']/@content"):
+            if content.strip():
+                return content.strip()
+    return ""
+
+def _json_ld_items(root):
+    # Every object in the page's JSON-LD blocks, with @graph containers flattened
+    items = []
+    for script in root.xpath("//script[@type='application/ld+json']"):
+        try:
+            data = json.loads(script.text or "")
+        except ValueError:
+            continue
+        stack = data if isinstance(data, list) else [data]
+        while stack:
+            item = stack.pop(0)
+            if isinstance(item, list):
+                stack.extend(item)
+            elif isinstance(item, dict):
+                items.append(item)
+                stack.extend(item.get("@graph", []))
+    return items
+
+def _types(item):
+    types = item.get("@type", [])
+    return types if isinstance(types, list) else [types]
+
+def _author_name(author):
+    if isinstance(author, list):
+        return ", ".join(filter(None, (_author_name(a) for a in author)))
+    if isinstance(author, dict):
+        return author.get("name", "")
+    return author if isinstance(author, str) else ""
+
+def _schema_faqs(items):
+    faqs = []
+    for item in items:
+        if "FAQPage" not in _types(item):
+            continue
+        entities = item.get("mainEntity", [])
+        for question in entities if isinstance(entities, list) else [entities]:
+            if not isinstance(question, dict) or not question.get("name"):
+                continue
+            answer = question.get("acceptedAnswer") or {}
+            text = answer.get("text", "") if isinstance(answer, dict) else ""
+            faqs.append({"question": question["name"].strip(), "answer": re.sub(r"<[^>]+>|\s+", " ", text).strip()})
+    return faqs
+
+def _html_faqs(main):
+    # <details><summary>, <dt>/<dd> pairs and question-style headings followed by their answer
+    faqs = []
+    for details in main.iter("details"):
+        summary = details.find("summary")
+        if summary is not None:
+            question = _text(summary)
+            faqs.append({"question": question, "answer": _text(details)[len(question):].strip()})
+    for dt in main.iter("dt"):
+        dd = dt.getnext()
+        faqs.append({"question": _text(dt), "answer": _text(dd) if dd is not None and dd.tag == "dd" else ""})
+    for heading in main.iter(*HEADING_TAGS):
+        question = _text(heading)
+        if question.endswith("?"):
+            answer = heading.getnext()
+            faqs.append({"question": question, "answer": _text(answer) if answer is not None else ""})
+    return faqs
+
+def extract_structure(html, max_chars=DEFAULT_TOKEN_BUDGET * 4):
+    # The parts of a page the scorecard looks at, with navigation and other chrome removed;
+    # paragraph text stops being collected once max_chars is reached
+    root = lxml.html.fromstring(html)
+    items = _json_ld_items(root)
+    schema_types = list(dict.fromkeys(t for item in items for t in _types(item) if isinstance(t, str)))
+    article = next((item for item in items if item.get("datePublished") or item.get("dateModified")
+                    or item.get("author")), {})
+
+    structure = {
+        "title": (root.findtext(".//title") or "").strip(),
+        "meta_description": _meta(root, "description", "og:description"),
+        "author": _meta(root, "author", "article:author") or _author_name(article.get("author")),
+        "date_published": _meta(root, "article:published_time") or str(article.get("datePublished", "")),
+        "date_modified": (_meta(root, "article:modified_time", "og:updated_time")
+                          or str(article.get("dateModified", ""))),
+        "schema_types": schema_types,
+    }
+
+    lxml.etree.strip_elements(root, *BOILERPLATE_TAGS, lxml.etree.Comment, with_tail=False)
+    for element in root.xpath(BOILERPLATE_XPATH):
+        element.drop_tree()
+    main = next(iter(root.xpath("//main | //article | //*[@role='main']")), None)
+    if main is None:
+        main = root.find("body") if root.find("body") is not None else root
+
+    times = main.xpath(".//time/@datetime")
+    if not structure["date_modified"] and not structure["date_published"] and times:
+        structure["date_published"] = times[0]
+    structure["headings"] = [(int(h.tag[1]), _text(h)) for h in main.iter(*HEADING_TAGS) if _text(h)]
+    structure["lists"] = [
+        [_text(li) for li in lst.iter("li") if _text(li)] for lst in main.iter("ul", "ol")
+        if not lst.xpath("ancestor::ul | ancestor::ol")
+    ]
+    structure["faqs"] = [faq for faq in _schema_faqs(items) + _html_faqs(main) if faq["question"]]
+    structure["paragraphs"], size = [], 0
+    for p in main.iter("p"):
+        text = _text(p)
+        if text:
+            structure["paragraphs"].append(text)
+            size += len(text) + 1
+            if size >= max_chars:
+                break
+    return structure
+
+def summarize_structure(structure, max_tokens=DEFAULT_TOKEN_BUDGET):
+    # Compact outline for the prompt: high-signal sections first, then body text to fill the budget.
+    # Four characters per token, the same estimate the rate limiter uses
+    budget = max_tokens * 4
+    lines = [f"Title: {structure['title']}"]
+    if structure["meta_description"]:
+        lines.append(f"Meta description: {structure['meta_description']}")
+    byline = [f"{label}: {structure[key]}" for label, key in
+              (("Author", "author"), ("Published", "date_published"), ("Modified", "date_modified")) if structure[key]]
+    lines.append(" | ".join(byline) if byline else "Author/dates: none found")
+    lines.append(f"Schema (JSON-LD): {', '.join(structure['schema_types']) or 'none'}")
+    intro = " ".join(structure["paragraphs"])[:INTRO_CHARS]
+    if intro:
+        lines.append(f"Intro: {intro}")
+    if structure["headings"]:
+        lines.append("Outline:")
+        lines.extend(f"{'  ' * (level - 1)}H{level} {text}" for level, text in structure["headings"])
+    lists = structure["lists"]
+    lines.append(f"Lists: {len(lists)} ({sum(len(items) for items in lists)} items)")
+    for items in lists:
+        lines.append("  - " + "; ".join(item[:80] for item in items[:LIST_ITEMS_SHOWN]))
+    lines.append(f"FAQs: {len(structure['faqs'])}")
+    lines.extend(f"  Q: {faq['question']} A: {faq['answer'][:160]}" for faq in structure["faqs"])
+
+    summary, size = [], 0
+    for line in lines:
+        if size + len(line) + 1 > budget:
+            break
+        summary.append(line)
+        size += len(line) + 1
+    body = " ".join(structure["paragraphs"])[INTRO_CHARS:]
+    remaining = budget - size - len("Body: ")
+    if body and remaining > 200:
+        summary.append(f"Body: {body[:remaining]}")
+    return "\n".join(summary)
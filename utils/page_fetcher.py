@@ -0,0 +1,110 @@
+# utils/page_fetcher.py
+
+import threading
+
+import lxml.etree
+import requests
+from requests.adapters import HTTPAdapter
+from urllib3.util.retry import Retry
+
+from utils.cache import get_cache, make_key
+from utils.concurrency import run_in_pool
+from utils.page_content import DEFAULT_TOKEN_BUDGET, extract_structure, summarize_structure
+from utils.tracing import traced
+
+USER_AGENT = "Mozilla/5.0"
+FETCH_TIMEOUT = 10
+DEFAULT_FETCH_WORKERS = 16
+PAGE_CACHE_TTL_SECONDS = 7 * 24 * 3600
+# Bump when extraction changes so cached pages are re-extracted
+EXTRACTOR_VERSION = "structure-v1"
+SITEMAP_NS = "{http://www.sitemaps.org/schemas/sitemap/0.9}"
+
+
+def make_session(pool_size=DEFAULT_FETCH_WORKERS):
+    # One keep-alive pool shared by every worker thread, with retries for throttling and 5xx
+    session = requests.Session()
+    retry = Retry(total=2, backoff_factor=0.5, status_forcelist=(429, 500, 502, 503, 504),
+                  allowed_methods=("GET", "HEAD"), respect_retry_after_header=True)
+    adapter = HTTPAdapter(pool_connections=pool_size, pool_maxsize=pool_size, max_retries=retry)
+    session.mount("http://", adapter)
+    session.mount("https://", adapter)
+    session.headers["User-Agent"] = USER_AGENT
+    return session
+
+_sessions = {}
+_sessions_lock = threading.Lock()
+
+
+def get_session(pool_size=DEFAULT_FETCH_WORKERS):
+    # Shared across runs so keep-alive connections survive Streamlit reruns; urllib3's pool is thread-safe
+    with _sessions_lock:
+        if pool_size not in _sessions:
+            _sessions[pool_size] = make_session(pool_size)
+        return _sessions[pool_size]
+
+@traced("page_fetch", video_id=lambda session, url, *args, **kwargs: url)
+def fetch_page(session, url, max_tokens=DEFAULT_TOKEN_BUDGET):
+    # Revalidates cached pages with If-None-Match / If-Modified-Since; a 304 reuses the cached extraction
+    cache = get_cache("pages", ttl_seconds=PAGE_CACHE_TTL_SECONDS)
+    key = make_key(EXTRACTOR_VERSION, url, max_tokens)
+    cached = cache.get(key)
+    headers = {}
+    if cached:
+        if cached.get("etag"):
+            headers["If-None-Match"] = cached["etag"]
+        if cached.get("last_modified"):
+            headers["If-Modified-Since"] = cached["last_modified"]
+    try:
+        res = session.get(url, headers=headers, timeout=FETCH_TIMEOUT)
+    except requests.RequestException as e:
+        return {"url": url, "error": f"Error fetching URL: {e}"}
+    if res.status_code == 304 and cached:
+        return dict(cached, url=url, from_cache=True)
+    if res.status_code >= 400:
+        return {"url": url, "status": res.status_code, "error": f"Error fetching URL: HTTP {res.status_code}"}
+
+    # A body lxml can't parse fails only this page's row, not the whole bulk audit
+    try:
+        structure = extract_structure(res.content, max_tokens * 4) if res.content.strip() else None
+        if structure is None:
+            return {"url": url, "status": res.status_code, "error": "Error fetching URL: empty page"}
+        content = summarize_structure(structure, max_tokens)
+    except Exception as e:
+        return {"url": url, "status": res.status_code, "error": f"Error parsing page: {e}"}
+    page = {
+        "url": url,
+        "status": res.status_code,
+        "title": structure["title"],
+        "content": content,
+        "structure": structure,
+        "etag": res.headers.get("ETag"),
+        "last_modified": res.headers.get("Last-Modified"),
+    }
+    if page["etag"] or page["last_modified"]:
+        cache.set(key, page)
+    return dict(page, from_cache=False)
+
+def fetch_pages(urls, max_workers=DEFAULT_FETCH_WORKERS, max_tokens=DEFAULT_TOKEN_BUDGET, on_progress=None):
+    session = get_session(max_workers)
+    return run_in_pool(lambda url: fetch_page(session, url, max_tokens), urls, max_workers=max_workers,
+                       on_progress=on_progress)
+
+def read_sitemap(url, limit=None, session=None):
+    # Page URLs from a sitemap, following sitemap indexes depth-first until limit is reached
+    session = session or get_session()
+    urls, queue, seen = [], [url], set()
+    while queue and (limit is None or len(urls) < limit):
+        sitemap_url = queue.pop(0)
+        if sitemap_url in seen:
+            continue
+        seen.add(sitemap_url)
+        res = session.get(sitemap_url, timeout=FETCH_TIMEOUT)
+        res.raise_for_status()
+        root = lxml.etree.fromstring(res.content)
+        locs = [loc.text.strip() for loc in root.iter(f"{SITEMAP_NS}loc", "loc") if loc.text]
+        if root.tag in (f"{SITEMAP_NS}sitemapindex", "sitemapindex"):
+            queue = locs + queue
+        else:
+            urls.extend(locs)
+    return urls[:limit] if limit else urls
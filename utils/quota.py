@@ -0,0 +1,174 @@
+# utils/quota.py
+
+import hashlib
+import math
+import os
+import sqlite3
+import threading
+from datetime import datetime
+from zoneinfo import ZoneInfo
+
+from utils.cache import CACHE_DIR
+from utils.resilience import resilient_call
+
+DAILY_QUOTA = 10000
+# YouTube Data API quota resets at midnight Pacific time
+QUOTA_TIMEZONE = ZoneInfo("America/Los_Angeles")
+QUOTA_COSTS = {
+    "search.list": 100,
+    "videos.list": 1,
+    "playlistItems.list": 1,
+    "channels.list": 1,
+    "videos.update": 50,
+    "videos.insert": 1600,
+}
+DEFAULT_COST = 1
+
+
+def quota_day():
+    return datetime.now(QUOTA_TIMEZONE).strftime("%Y-%m-%d")
+
+def key_id(api_key):
+    return hashlib.sha256((api_key or "").encode("utf-8")).hexdigest()[:12]
+
+
+class QuotaLedger:
+    """Persists quota units spent per API key, Pacific day and call type."""
+
+    def __init__(self, path=None):
+        path = path or os.path.join(CACHE_DIR, "quota.sqlite3")
+        os.makedirs(os.path.dirname(path) or ".", exist_ok=True)
+        self.lock = threading.Lock()
+        self.conn = sqlite3.connect(path, check_same_thread=False)
+        self.conn.execute(
+            "CREATE TABLE IF NOT EXISTS usage ("
+            "day TEXT NOT NULL, key_id TEXT NOT NULL, method TEXT NOT NULL, "
+            "calls INTEGER NOT NULL, units INTEGER NOT NULL, PRIMARY KEY (day, key_id, method))"
+        )
+        self.conn.commit()
+
+    def record(self, key, method, units):
+        with self.lock:
+            self.conn.execute(
+                "INSERT INTO usage (day, key_id, method, calls, units) VALUES (?, ?, ?, 1, ?) "
+                "ON CONFLICT (day, key_id, method) DO UPDATE SET calls = calls + 1, units = units + excluded.units",
+                (quota_day(), key, method, units)
+            )
+            self.conn.commit()
+
+    def used_today(self, key):
+        with self.lock:
+            return self.conn.execute(
+                "SELECT COALESCE(SUM(units), 0) FROM usage WHERE day = ? AND key_id = ?", (quota_day(), key)
+            ).fetchone()[0]
+
+    def breakdown(self, key, day=None):
+        with self.lock:
+            rows = self.conn.execute(
+                "SELECT method, calls, units FROM usage WHERE day = ? AND key_id = ? ORDER BY units DESC",
+                (day or quota_day(), key)
+            ).fetchall()
+        return [{"method": method, "calls": calls, "units": units} for method, calls, units in rows]
+
+
+class _TrackedRequest:
+    def __init__(self, request, method, ledger, key):
+        self._request = request
+        self._method = method
+        self._ledger = ledger
+        self._key = key
+
+    def execute(self, *args, **kwargs):
+        # Quota is charged for every request that reaches the API, including failed and retried ones
+        def attempt():
+            self._ledger.record(self._key, self._method, QUOTA_COSTS.get(self._method, DEFAULT_COST))
+            return self._request.execute(*args, **kwargs)
+        return resilient_call("youtube", attempt)
+
+    def __getattr__(self, name):
+        return getattr(self._request, name)
+
+
+class TrackedYouTube:
+    """Wraps a googleapiclient YouTube client and charges every executed request to a QuotaLedger.
+
+    youtube.videos().list(...).execute() works exactly as on the wrapped client.
+    """
+
+    def __init__(self, resource, ledger, key, name=""):
+        self._resource = resource
+        self._ledger = ledger
+        self._key = key
+        self._name = name
+
+    def __getattr__(self, attr):
+        target = getattr(self._resource, attr)
+        if not callable(target):
+            return target
+        method = f"{self._name}.{attr}" if self._name else attr
+
+        def call(*args, **kwargs):
+            result = target(*args, **kwargs)
+            if hasattr(result, "execute"):
+                return _TrackedRequest(result, method, self._ledger, self._key)
+            if result is None:
+                return None
+            return TrackedYouTube(result, self._ledger, self._key, method)
+        return call
+
+
+_ledger = None
+_ledger_lock = threading.Lock()
+
+
+def get_ledger():
+    global _ledger
+    with _ledger_lock:
+        if _ledger is None:
+            _ledger = QuotaLedger()
+        return _ledger
+
+def track(youtube, api_key, ledger=None):
+    return TrackedYouTube(youtube, ledger or get_ledger(), key_id(api_key))
+
+
+# ---------- Job cost estimates (worst case, before any caching) ----------
+
+def estimate_channel_export(start_index, num_videos, indexed_videos=0, synced=False):
+    # Channel lookup, playlist pages not yet in the local index, then 50-ID videos.list chunks
+    needed = start_index + num_videos
+    if synced:
+        playlist_pages = 1 + math.ceil(max(0, needed - indexed_videos) / 50)
+    else:
+        playlist_pages = math.ceil(needed / 50)
+    return {
+        "channels.list": 0 if synced else 1,
+        "playlistItems.list": playlist_pages,
+        "videos.list": math.ceil(num_videos / 50),
+    }
+
+def estimate_video_ids(num_videos):
+    return {"videos.list": math.ceil(num_videos / 50)}
+
+def estimate_topic_analysis(num_topics, per_topic):
+    # Results are deduplicated across topics before one batched metadata fetch
+    return {
+        "search.list": num_topics,
+        "videos.list": math.ceil(num_topics * per_topic / 50),
+    }
+
+def estimate_top_tags():
+    return {"search.list": 1, "videos.list": 1}
+
+def estimate_units(*call_counts):
+    total = 0
+    for counts in call_counts:
+        for method, calls in counts.items():
+            total += calls * QUOTA_COSTS.get(method, DEFAULT_COST)
+    return total
+
+def quota_summary(api_key, estimated_units, ledger=None):
+    used = (ledger or get_ledger()).used_today(key_id(api_key))
+    remaining = max(0, DAILY_QUOTA - used)
+    return {"estimated": estimated_units, "used_today": used, "remaining": remaining,
+            "fits": estimated_units <= remaining}
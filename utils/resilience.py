@@ -0,0 +1,258 @@
+# utils/resilience.py
+
+import email.utils
+import random
+import threading
+import time
+from concurrent.futures import TimeoutError as FutureTimeout
+
+from utils.tracing import span
+
+DEFAULT_RETRIES = 4
+BACKOFF_BASE_SECONDS = 1.0
+BACKOFF_CAP_SECONDS = 60.0
+FAILURE_THRESHOLD = 5
+RESET_SECONDS = 30.0
+
+THROTTLED = "throttled"
+TRANSIENT = "transient"
+FATAL = "fatal"
+# Exception class names that mean the provider is throttling us (e.g. youtube_transcript_api's IP blocks)
+THROTTLE_NAMES = ("RateLimit", "TooManyRequests", "RequestBlocked", "IpBlocked")
+# YouTube Data API 403 reasons that are per-second throttling rather than a hard failure
+YOUTUBE_THROTTLE_REASONS = (b"rateLimitExceeded", b"userRateLimitExceeded")
+
+
+class CircuitOpenError(RuntimeError):
+    pass
+
+
+class CircuitBreaker:
+    """Stops calling an endpoint after FAILURE_THRESHOLD consecutive failures.
+
+    While open, calls fail immediately; after reset_seconds one probe call is
+    let through (half-open) and its outcome closes or re-opens the circuit.
+    """
+
+    def __init__(self, failure_threshold=FAILURE_THRESHOLD, reset_seconds=RESET_SECONDS):
+        self.failure_threshold = failure_threshold
+        self.reset_seconds = reset_seconds
+        self.lock = threading.Lock()
+        self.failures = 0
+        self.opened_at = None
+        self.probing = False
+
+    @property
+    def state(self):
+        if self.opened_at is None:
+            return "closed"
+        return "half-open" if self.probing or time.monotonic() - self.opened_at >= self.reset_seconds else "open"
+
+    def before_call(self):
+        # Returns True if this call is the half-open probe
+        with self.lock:
+            if self.opened_at is None:
+                return False
+            remaining = self.reset_seconds - (time.monotonic() - self.opened_at)
+            if remaining > 0 or self.probing:
+                raise CircuitOpenError(f"Circuit open, retry in {max(remaining, 0):.0f}s")
+            self.probing = True
+            return True
+
+    def record_success(self):
+        with self.lock:
+            self.failures = 0
+            self.opened_at = None
+            self.probing = False
+
+    def record_failure(self):
+        with self.lock:
+            self.failures += 1
+            if self.probing or self.failures >= self.failure_threshold:
+                self.opened_at = time.monotonic()
+            self.probing = False
+
+    def wait_time(self):
+        with self.lock:
+            if self.opened_at is None:
+                return 0.0
+            return max(0.0, self.reset_seconds - (time.monotonic() - self.opened_at))
+
+
+class AdaptiveConcurrency:
+    """AIMD cap on in-flight calls: halves on throttling, grows by about one per window of successes."""
+
+    def __init__(self, initial, minimum=1, maximum=None):
+        self.limit = float(initial)
+        self.minimum = minimum
+        self.maximum = maximum or initial * 4
+        self.in_flight = 0
+        self.condition = threading.Condition()
+
+    def acquire(self):
+        with self.condition:
+            while self.in_flight >= int(self.limit):
+                self.condition.wait()
+            self.in_flight += 1
+
+    def release(self, outcome=None):
+        with self.condition:
+            self.in_flight -= 1
+            if outcome == THROTTLED:
+                self.limit = max(self.minimum, self.limit / 2)
+            elif outcome is None:
+                self.limit = min(self.maximum, self.limit + 1 / self.limit)
+            self.condition.notify_all()
+
+
+def _headers(exc):
+    response = getattr(exc, "response", None)
+    headers = getattr(response, "headers", None)
+    if headers is None:
+        # googleapiclient's HttpError keeps an httplib2 response, which is itself a header dict
+        headers = getattr(exc, "resp", None)
+    return headers if hasattr(headers, "get") else {}
+
+def _status(exc):
+    status = getattr(exc, "status_code", None)
+    if status is None and getattr(exc, "resp", None) is not None:
+        status = getattr(exc.resp, "status", None)
+    try:
+        return int(status) if status is not None else None
+    except (TypeError, ValueError):
+        return None
+
+def retry_after(exc):
+    # Seconds from Retry-After (delta or HTTP date) or OpenAI's retry-after-ms, if the error carries them
+    headers = _headers(exc)
+    value = headers.get("retry-after-ms")
+    if value:
+        try:
+            return float(value) / 1000
+        except ValueError:
+            pass
+    value = headers.get("retry-after")
+    if not value:
+        return None
+    try:
+        return max(0.0, float(value))
+    except ValueError:
+        pass
+    try:
+        return max(0.0, email.utils.parsedate_to_datetime(value).timestamp() - time.time())
+    except (TypeError, ValueError):
+        return None
+
+def classify(exc):
+    # THROTTLED and TRANSIENT are retried; FATAL (bad request, not found, quota exhausted...) is raised at once
+    if isinstance(exc, CircuitOpenError):
+        return TRANSIENT
+    if any(name in type(exc).__name__ for name in THROTTLE_NAMES):
+        return THROTTLED
+    status = _status(exc)
+    if status is not None:
+        if status == 429:
+            return THROTTLED
+        if status == 403:
+            content = getattr(exc, "content", b"") or b""
+            return THROTTLED if any(reason in content for reason in YOUTUBE_THROTTLE_REASONS) else FATAL
+        return TRANSIENT if status in (408, 409) or status >= 500 else FATAL
+    if isinstance(exc, (FutureTimeout, TimeoutError, ConnectionError, OSError)):
+        return TRANSIENT
+    # openai's APIConnectionError/APITimeoutError carry no status code
+    if type(exc).__name__ in ("APIConnectionError", "APITimeoutError"):
+        return TRANSIENT
+    return FATAL
+
+def backoff(attempt, base=BACKOFF_BASE_SECONDS, cap=BACKOFF_CAP_SECONDS):
+    # "Full jitter": uniform over [0, base * 2^attempt], so retrying workers spread out
+    return random.uniform(0, min(cap, base * 2 ** attempt))
+
+
+class Endpoint:
+    """Retry, circuit breaker and adaptive concurrency for one external service.
+
+    call(fn) runs the zero-argument fn with at most `limit` calls in flight,
+    retries throttled and transient failures with jittered backoff (or the
+    server's Retry-After), and re-raises fatal errors untouched.
+    """
+
+    def __init__(self, name, concurrency=16, retries=DEFAULT_RETRIES, failure_threshold=FAILURE_THRESHOLD,
+                 reset_seconds=RESET_SECONDS):
+        self.name = name
+        self.retries = retries
+        self.breaker = CircuitBreaker(failure_threshold, reset_seconds)
+        self.concurrency = AdaptiveConcurrency(concurrency)
+        self.lock = threading.Lock()
+        self.stats = {"calls": 0, "retries": 0, "throttled": 0, "failures": 0}
+
+    def _count(self, field):
+        with self.lock:
+            self.stats[field] += 1
+
+    def call(self, fn, retries=None):
+        retries = self.retries if retries is None else retries
+        for attempt in range(retries + 1):
+            outcome, error = None, None
+            try:
+                self.breaker.before_call()
+                self.concurrency.acquire()
+                try:
+                    self._count("calls")
+                    result = fn()
+                except BaseException as e:
+                    outcome, error = classify(e), e
+                    raise
+                finally:
+                    self.concurrency.release(outcome)
+            except CircuitOpenError as e:
+                outcome, error = TRANSIENT, e
+            except Exception:
+                if outcome == FATAL:
+                    # The service answered; a bad request says nothing about its health
+                    self.breaker.record_success()
+                    raise
+                if outcome == THROTTLED:
+                    self._count("throttled")
+                self.breaker.record_failure()
+            else:
+                self.breaker.record_success()
+                return result
+
+            if attempt == retries:
+                self._count("failures")
+                raise error
+            self._count("retries")
+            delay = retry_after(error)
+            if delay is None:
+                delay = max(backoff(attempt), self.breaker.wait_time())
+            with span("retry_wait", service=self.name):
+                time.sleep(min(delay, BACKOFF_CAP_SECONDS))
+
+    def snapshot(self):
+        with self.lock:
+            stats = dict(self.stats)
+        return {"endpoint": self.name, "state": self.breaker.state, "limit": round(self.concurrency.limit, 1),
+                "in_flight": self.concurrency.in_flight, **stats}
+
+
+# Initial in-flight caps; AIMD moves them from here
+ENDPOINT_CONCURRENCY = {"openai": 16, "youtube": 8, "transcripts": 16}
+
+_endpoints = {}
+_endpoints_lock = threading.Lock()
+
+
+def get_endpoint(name):
+    with _endpoints_lock:
+        if name not in _endpoints:
+            _endpoints[name] = Endpoint(name, ENDPOINT_CONCURRENCY.get(name, 8))
+        return _endpoints[name]
+
+def endpoint_snapshots():
+    with _endpoints_lock:
+        endpoints = list(_endpoints.values())
+    return [endpoint.snapshot() for endpoint in endpoints]
+
+def resilient_call(name, fn, retries=None):
+    return get_endpoint(name).call(fn, retries)
@@ -0,0 +1,66 @@
+# utils/seo_schema.py
+
+import json
+
+SEO_COLUMNS = ["seo_title", "seo_description", "seo_hashtags", "seo_keywords"]
+SEO_LIST_COLUMNS = ("seo_hashtags", "seo_keywords")
+SEO_ERROR_PREFIX = "OpenAI Error: "
+
+SEO_FIELDS = {
+    "title": {"type": "string"},
+    "description": {"type": "string"},
+    "hashtags": {"type": "array", "items": {"type": "string"}},
+    "keywords": {"type": "array", "items": {"type": "string"}},
+}
+SEO_SCHEMA = {
+    "type": "object",
+    "properties": SEO_FIELDS,
+    "required": list(SEO_FIELDS),
+    "additionalProperties": False,
+}
+SEO_RESPONSE_FORMAT = {"type": "json_schema", "json_schema": {"name": "seo", "strict": True, "schema": SEO_SCHEMA}}
+
+
+def _clean_list(values, prefix=""):
+    # Trimmed, de-duplicated (case-insensitively), order kept
+    cleaned, seen = [], set()
+    for value in values:
+        if not isinstance(value, str):
+            raise ValueError(f"Expected a string, got {value!r}")
+        value = value.strip().lstrip("#").strip() if prefix else value.strip()
+        if value and value.lower() not in seen:
+            seen.add(value.lower())
+            cleaned.append(prefix + value)
+    return cleaned
+
+def parse_seo(response):
+    # Accepts the raw JSON text or an already decoded object; raises ValueError if it doesn't fit SEO_SCHEMA
+    item = json.loads(response) if isinstance(response, str) else response
+    if not isinstance(item, dict):
+        raise ValueError("SEO response is not a JSON object")
+    for field in ("title", "description"):
+        if not isinstance(item.get(field), str) or not item[field].strip():
+            raise ValueError(f"SEO response has no {field}")
+    for field in ("hashtags", "keywords"):
+        if not isinstance(item.get(field), list):
+            raise ValueError(f"SEO response has no {field} list")
+    return {
+        "seo_title": item["title"].strip(),
+        "seo_description": item["description"].strip(),
+        "seo_hashtags": _clean_list(item["hashtags"], prefix="#"),
+        "seo_keywords": _clean_list(item["keywords"]),
+    }
+
+def seo_error(error):
+    return {"seo_error": f"{SEO_ERROR_PREFIX}{error}"}
+
+def format_seo(record):
+    # Markdown for display; exports keep the separate columns
+    if record.get("seo_error"):
+        return record["seo_error"]
+    return (
+        f"**SEO Title:** {record.get('seo_title', '')}\n\n"
+        f"**Description:** {record.get('seo_description', '')}\n\n"
+        f"**Hashtags:** {' '.join(record.get('seo_hashtags', []))}\n\n"
+        f"**Keywords:** {', '.join(record.get('seo_keywords', []))}"
+    )
@@ -0,0 +1,161 @@
+# utils/tracing.py
+
+import bisect
+import contextvars
+import functools
+import json
+import os
+import threading
+import time
+from contextlib import contextmanager
+
+# Upper bounds of the latency histogram buckets; the last bucket is open-ended
+HISTOGRAM_BUCKETS_MS = (10, 25, 50, 100, 250, 500, 1000, 2500, 5000, 10000, 30000)
+
+
+class Tracer:
+    """Collects timing spans from every worker thread.
+
+    Keeps per-stage call counts, errors, latency histograms and per-video
+    totals. With record_events=True every span is also kept so the run can be
+    saved as a Chrome trace (chrome://tracing or ui.perfetto.dev).
+    """
+
+    def __init__(self, record_events=False):
+        self.lock = threading.Lock()
+        self.origin = time.perf_counter()
+        self.stages = {}
+        self.videos = {}
+        self.events = [] if record_events else None
+
+    def record(self, stage, start, duration, video_id=None, error=False, args=None):
+        with self.lock:
+            stats = self.stages.get(stage)
+            if stats is None:
+                stats = self.stages[stage] = {
+                    "durations": [], "errors": 0, "histogram": [0] * (len(HISTOGRAM_BUCKETS_MS) + 1)
+                }
+            stats["durations"].append(duration)
+            stats["errors"] += int(error)
+            stats["histogram"][bisect.bisect_left(HISTOGRAM_BUCKETS_MS, duration * 1000)] += 1
+            if video_id is not None:
+                per_video = self.videos.setdefault(video_id, {})
+                per_video[stage] = per_video.get(stage, 0.0) + duration
+            if self.events is not None:
+                event_args = dict(args or {})
+                if video_id is not None:
+                    event_args["video_id"] = video_id
+                if error:
+                    event_args["error"] = True
+                self.events.append({
+                    "name": stage, "cat": "pipeline", "ph": "X",
+                    "ts": (start - self.origin) * 1e6, "dur": duration * 1e6,
+                    "pid": os.getpid(), "tid": threading.get_ident(), "args": event_args,
+                })
+
+    def summary(self):
+        # One row per stage, slowest total first
+        with self.lock:
+            stages = {stage: (sorted(s["durations"]), s["errors"]) for stage, s in self.stages.items()}
+        rows = []
+        for stage, (durations, errors) in stages.items():
+            total = sum(durations)
+            rows.append({
+                "stage": stage,
+                "calls": len(durations),
+                "errors": errors,
+                "total_s": round(total, 3),
+                "mean_ms": round(total / len(durations) * 1000, 1),
+                "p50_ms": round(_percentile(durations, 0.50) * 1000, 1),
+                "p99_ms": round(_percentile(durations, 0.99) * 1000, 1),
+            })
+        return sorted(rows, key=lambda row: row["total_s"], reverse=True)
+
+    def histogram(self, stage):
+        # [(upper bound in ms or None for the overflow bucket, count), ...]
+        with self.lock:
+            counts = list(self.stages[stage]["histogram"]) if stage in self.stages else []
+        return list(zip(list(HISTOGRAM_BUCKETS_MS) + [None], counts))
+
+    def per_video(self):
+        with self.lock:
+            return {video_id: dict(stages) for video_id, stages in self.videos.items()}
+
+    def chrome_trace(self):
+        with self.lock:
+            events = list(self.events or [])
+        return {"traceEvents": events, "displayTimeUnit": "ms"}
+
+    def write_chrome_trace(self, path):
+        with open(path, "w", encoding="utf-8") as f:
+            json.dump(self.chrome_trace(), f)
+
+
+def _percentile(ordered, fraction):
+    # Nearest-rank percentile of an already sorted list
+    if not ordered:
+        return 0.0
+    index = max(0, min(len(ordered) - 1, int(round(fraction * len(ordered) + 0.5)) - 1))
+    return ordered[index]
+
+
+# Per context, so concurrent Streamlit sessions each trace only their own run. Worker threads start
+# with an empty context; pools wrap their work in propagate() to carry the caller's tracer over.
+_active = contextvars.ContextVar("tracer", default=None)
+
+
+def start_trace(record_events=False):
+    tracer = Tracer(record_events)
+    _active.set(tracer)
+    return tracer
+
+def stop_trace():
+    tracer = _active.get()
+    _active.set(None)
+    return tracer
+
+def get_tracer():
+    return _active.get()
+
+def propagate(fn):
+    # Wraps fn so that, run on another thread, it records into the tracer active here
+    tracer = _active.get()
+    if tracer is None:
+        return fn
+
+    @functools.wraps(fn)
+    def wrapper(*args, **kwargs):
+        token = _active.set(tracer)
+        try:
+            return fn(*args, **kwargs)
+        finally:
+            _active.reset(token)
+    return wrapper
+
+@contextmanager
+def span(stage, video_id=None, **args):
+    tracer = _active.get()
+    if tracer is None:
+        yield
+        return
+    start = time.perf_counter()
+    error = False
+    try:
+        yield
+    except BaseException:
+        error = True
+        raise
+    finally:
+        tracer.record(stage, start, time.perf_counter() - start, video_id, error, args)
+
+def traced(stage, video_id=None):
+    # video_id, if given, picks the video out of the call: video_id(*args, **kwargs)
+    def decorator(fn):
+        @functools.wraps(fn)
+        def wrapper(*args, **kwargs):
+            if _active.get() is None:
+                return fn(*args, **kwargs)
+            with span(stage, video_id(*args, **kwargs) if video_id else None):
+                return fn(*args, **kwargs)
+        return wrapper
+    return decorator
@@ -0,0 +1,95 @@
+# utils/transcript_summary.py
+
+import hashlib
+import re
+
+from utils.concurrency import run_in_pool
+from utils.llm import cached_chat_completion, estimate_tokens
+from utils.tracing import traced
+
+SUMMARY_MODEL = "gpt-4o-mini"
+# Bump when a prompt below changes so cached summaries are not reused
+CHUNK_PROMPT_VERSION = "transcript-chunk-v1"
+REDUCE_PROMPT_VERSION = "transcript-reduce-v1"
+CHUNK_TOKENS = 2000
+# Transcripts at or under this size go into the SEO prompt as they are
+SUMMARY_TOKENS = 400
+SUMMARY_COMPLETION_TOKENS = 300
+# Chunk summaries merged per reduce request
+REDUCE_FANOUT = 8
+DEFAULT_SUMMARY_WORKERS = 8
+
+_SENTENCE_END = re.compile(r"(?<=[.!?])\s+")
+
+
+def chunk_text(text, max_tokens=CHUNK_TOKENS):
+    # Whole sentences packed into chunks of at most max_tokens; auto-generated captions often have
+    # no punctuation, so a sentence that is too long on its own is cut between words
+    max_chars = max_tokens * 4
+    pieces = []
+    for sentence in _SENTENCE_END.split(text.strip()):
+        while len(sentence) > max_chars:
+            cut = sentence.rfind(" ", 0, max_chars)
+            cut = cut if cut > 0 else max_chars
+            pieces.append(sentence[:cut])
+            sentence = sentence[cut:].lstrip()
+        if sentence:
+            pieces.append(sentence)
+
+    chunks, chunk = [], ""
+    for piece in pieces:
+        if chunk and len(chunk) + 1 + len(piece) > max_chars:
+            chunks.append(chunk)
+            chunk = piece
+        else:
+            chunk = f"{chunk} {piece}" if chunk else piece
+    if chunk:
+        chunks.append(chunk)
+    return chunks
+
+def _chunk_prompt(chunk):
+    return f"""
+    Summarize this part of a YouTube video transcript in at most 120 words.
+    Keep the topics, products, people and terms a viewer might search for; skip greetings, sponsor reads and filler.
+
+    Transcript part:
+    {chunk}
+    """
+
+def _reduce_prompt(summaries):
+    parts = "\n\n".join(summaries)
+    return f"""
+    These are summaries of consecutive parts of one YouTube video transcript.
+    Merge them into a single summary of at most 150 words that keeps the main topics and searchable terms.
+
+    Summaries:
+    {parts}
+    """
+
+def _summarize(client, template, prompt, text, limiter, force_refresh):
+    # Keyed by the hash of the text being summarized, so a chunk shared by re-runs or re-uploads is summarized once
+    cache_fields = {"template": template, "sha256": hashlib.sha256(text.encode("utf-8")).hexdigest()}
+    return cached_chat_completion(client, prompt, cache_fields, model=SUMMARY_MODEL, limiter=limiter,
+                                  force_refresh=force_refresh, completion_tokens=SUMMARY_COMPLETION_TOKENS).strip()
+
+@traced("transcript_summary")
+def summarize_transcript(client, text, limiter=None, force_refresh=False, max_workers=DEFAULT_SUMMARY_WORKERS):
+    # Map: summarize each chunk in parallel. Reduce: merge REDUCE_FANOUT summaries at a time until one is left.
+    text = (text or "").strip()
+    if estimate_tokens(text) <= SUMMARY_TOKENS:
+        return text
+    summaries = run_in_pool(
+        lambda chunk: _summarize(client, CHUNK_PROMPT_VERSION, _chunk_prompt(chunk), chunk, limiter, force_refresh),
+        chunk_text(text),
+        max_workers=max_workers
+    )
+    while len(summaries) > 1:
+        groups = [summaries[i:i + REDUCE_FANOUT] for i in range(0, len(summaries), REDUCE_FANOUT)]
+        summaries = run_in_pool(
+            lambda group: group[0] if len(group) == 1 else _summarize(
+                client, REDUCE_PROMPT_VERSION, _reduce_prompt(group), "\n\n".join(group), limiter, force_refresh
+            ),
+            groups,
+            max_workers=max_workers
+        )
+    return summaries[0]
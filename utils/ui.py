@@ -0,0 +1,65 @@
+# utils/ui.py
+# Small Streamlit widgets shared by the apps
+
+import json
+import time
+
+import streamlit as st
+
+from utils.quota import DAILY_QUOTA, estimate_units, quota_summary
+from utils.resilience import endpoint_snapshots
+
+IGNORE_QUOTA_LABEL = "⚠️ Run even if it exceeds today's remaining YouTube quota"
+
+
+def show_quota_estimate(api_key, *call_counts):
+    if not api_key:
+        return None
+    summary = quota_summary(api_key, estimate_units(*call_counts))
+    st.caption(
+        f"📊 Estimated YouTube quota: **{summary['estimated']:,} units** · "
+        f"used today: {summary['used_today']:,} / {DAILY_QUOTA:,}"
+    )
+    if not summary["fits"]:
+        st.warning(
+            f"⚠️ This job may need {summary['estimated']:,} units but only {summary['remaining']:,} remain today. "
+            "Split it into smaller batches or run it after the midnight (Pacific) reset."
+        )
+    return summary
+
+def stop_if_over_quota(summary, ignore_quota=False):
+    # For apps whose inputs sit in a form, so the estimate first appears in the run that would start the job:
+    # a job over today's remaining quota stops here unless the user opted in, like the CLI's --ignore-quota
+    if summary and not summary["fits"] and not ignore_quota:
+        st.error(f"❌ Not started. Split the job, wait for the reset, or tick \"{IGNORE_QUOTA_LABEL}\" to run it anyway.")
+        st.stop()
+
+
+def live_stage_breakdown(tracer, progress=None, interval=0.5):
+    # Returns an on_progress(done, total) callback that also refreshes a per-stage timing table
+    table = st.empty()
+    last_update = [0.0]
+
+    def update(done, total):
+        if progress is not None:
+            progress.progress(done / total if total else 1.0, text=f"{done}/{total}")
+        now = time.monotonic()
+        if done == total or now - last_update[0] >= interval:
+            last_update[0] = now
+            table.dataframe(tracer.summary(), use_container_width=True)
+    return update
+
+def show_stage_breakdown(tracer, trace_file_name="trace.json"):
+    st.markdown("⏱️ **Time per stage**")
+    st.dataframe(tracer.summary(), use_container_width=True)
+    endpoints = endpoint_snapshots()
+    if endpoints:
+        st.markdown("🔁 **External calls** (retries, throttling and adaptive concurrency per service)")
+        st.dataframe(endpoints, use_container_width=True)
+    if tracer.events is not None:
+        st.download_button(
+            "⬇️ Download trace (Chrome trace JSON)",
+            json.dumps(tracer.chrome_trace()),
+            trace_file_name,
+            "application/json"
+        )
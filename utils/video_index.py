@@ -0,0 +1,96 @@
+# utils/video_index.py
+
+import json
+import os
+import sqlite3
+import threading
+import time
+
+from utils.cache import CACHE_DIR
+
+
+class VideoIndex:
+    """Local SQLite index of each channel's uploads (video_id, published_at, metadata etag).
+
+    Sync state per channel remembers the uploads playlist, whether the full
+    history has been paged once, and the page token where an unfinished
+    backfill stopped, so later runs only fetch what is new.
+    """
+
+    def __init__(self, path=None):
+        path = path or os.path.join(CACHE_DIR, "video_index.sqlite3")
+        os.makedirs(os.path.dirname(path) or ".", exist_ok=True)
+        self.lock = threading.Lock()
+        self.conn = sqlite3.connect(path, check_same_thread=False)
+        self.conn.execute("PRAGMA journal_mode=WAL")
+        self.conn.execute(
+            "CREATE TABLE IF NOT EXISTS videos ("
+            "channel_id TEXT NOT NULL, video_id TEXT NOT NULL, published_at TEXT NOT NULL, "
+            "etag TEXT, metadata TEXT, fetched_at REAL, "
+            "PRIMARY KEY (channel_id, video_id))"
+        )
+        self.conn.execute("CREATE INDEX IF NOT EXISTS videos_published ON videos (channel_id, published_at)")
+        self.conn.execute(
+            "CREATE TABLE IF NOT EXISTS channels ("
+            "channel_id TEXT PRIMARY KEY, playlist_id TEXT, complete INTEGER NOT NULL DEFAULT 0, "
+            "backfill_token TEXT, synced_at REAL)"
+        )
+        self.conn.commit()
+
+    def get_state(self, channel_id):
+        with self.lock:
+            row = self.conn.execute(
+                "SELECT playlist_id, complete, backfill_token, synced_at FROM channels WHERE channel_id = ?",
+                (channel_id,)
+            ).fetchone()
+        if row is None:
+            return {"playlist_id": None, "complete": False, "backfill_token": None, "synced_at": None}
+        return {"playlist_id": row[0], "complete": bool(row[1]), "backfill_token": row[2], "synced_at": row[3]}
+
+    def set_state(self, channel_id, playlist_id, complete, backfill_token):
+        with self.lock:
+            self.conn.execute(
+                "INSERT OR REPLACE INTO channels (channel_id, playlist_id, complete, backfill_token, synced_at) "
+                "VALUES (?, ?, ?, ?, ?)",
+                (channel_id, playlist_id, int(complete), backfill_token, time.time())
+            )
+            self.conn.commit()
+
+    def known_ids(self, channel_id):
+        with self.lock:
+            rows = self.conn.execute("SELECT video_id FROM videos WHERE channel_id = ?", (channel_id,))
+            return {row[0] for row in rows}
+
+    def count(self, channel_id):
+        with self.lock:
+            return self.conn.execute("SELECT COUNT(*) FROM videos WHERE channel_id = ?", (channel_id,)).fetchone()[0]
+
+    def add_videos(self, channel_id, videos):
+        with self.lock:
+            self.conn.executemany(
+                "INSERT OR IGNORE INTO videos (channel_id, video_id, published_at) VALUES (?, ?, ?)",
+                [(channel_id, v["video_id"], v["published_at"]) for v in videos]
+            )
+            self.conn.commit()
+
+    def list_videos(self, channel_id, offset=0, limit=None):
+        # Newest first, sorted by SQLite instead of in memory
+        with self.lock:
+            rows = self.conn.execute(
+                "SELECT video_id, published_at FROM videos WHERE channel_id = ? "
+                "ORDER BY published_at DESC LIMIT ? OFFSET ?",
+                (channel_id, -1 if limit is None else int(limit), int(offset))
+            ).fetchall()
+        return [{"video_id": row[0], "published_at": row[1]} for row in rows]
+
+    def record_metadata(self, channel_id, infos):
+        now = time.time()
+        with self.lock:
+            self.conn.executemany(
+                "UPDATE videos SET etag = ?, metadata = ?, fetched_at = ? WHERE channel_id = ? AND video_id = ?",
+                [
+                    (info.get("etag"), json.dumps(info, ensure_ascii=False), now, channel_id, info["video_id"])
+                    for info in infos if "error" not in info
+                ]
+            )
+            self.conn.commit()
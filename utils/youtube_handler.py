@@ -1,38 +1,218 @@
 # utils/youtube_handler.py
 
+import json
+import os
 import pandas as pd
-import time
 import re
+import threading
+import time
+from collections import OrderedDict
+from concurrent.futures import FIRST_COMPLETED, ThreadPoolExecutor, wait
+import requests
+from requests.adapters import HTTPAdapter
 from youtube_transcript_api import YouTubeTranscriptApi, TranscriptsDisabled, NoTranscriptFound
 from googleapiclient.discovery import build
+from googleapiclient.http import build_http
+
+from utils.cache import get_cache, make_key
+from utils.checkpoint import Checkpoint
+from utils.concurrency import DEFAULT_MAX_WORKERS, RateLimiter, run_in_pool
+from utils.export import OrderedSink
+from utils.llm import (
+    COMPLETION_TOKEN_ESTIMATE,
+    cached_chat_completion,
+    chat_completion,
+    completion_cache_key,
+    remember_completion,
+)
+from utils.openai_batch import DEFAULT_POLL_SECONDS, BatchJob
+from utils.quota import estimate_channel_export, track
+from utils.resilience import resilient_call
+from utils.seo_schema import SEO_FIELDS, SEO_RESPONSE_FORMAT, parse_seo, seo_error
+from utils.tracing import propagate, traced
+from utils.transcript_summary import summarize_transcript
+from utils.video_index import VideoIndex
+
+SEO_PROMPT_VERSION = "youtube-seo-v3"
+DEFAULT_SEO_BATCH_SIZE = 5
+# Packed prompts stop growing past this many characters of title/description/tags
+SEO_BATCH_MAX_CHARS = 12000
+SEO_BATCH_SCHEMA = {
+    "type": "object",
+    "properties": {
+        "videos": {
+            "type": "array",
+            "items": {
+                "type": "object",
+                "properties": {"video_id": {"type": "string"}, **SEO_FIELDS},
+                "required": ["video_id", *SEO_FIELDS],
+                "additionalProperties": False,
+            },
+        },
+    },
+    "required": ["videos"],
+    "additionalProperties": False,
+}
+
+TRANSCRIPT_OK = "ok"
+TRANSCRIPT_DISABLED = "disabled"
+TRANSCRIPT_NOT_FOUND = "not_found"
+TRANSCRIPT_NETWORK_ERROR = "network_error"
+TRANSCRIPT_TIMEOUT = "timeout"
+DEFAULT_TRANSCRIPT_WORKERS = 16
+DEFAULT_TRANSCRIPT_TIMEOUT = 20
+DEFAULT_TRANSCRIPT_RETRIES = 2
+# Keep-alive connections to YouTube kept for transcript fetches; more workers still run, just unpooled
+TRANSCRIPT_POOL_SIZE = 64
+
+TOP_TAGS_TTL_SECONDS = 24 * 3600
+TOP_TAGS_MEMO_SIZE = 256
+_top_tags_memo = OrderedDict()
+_top_tags_lock = threading.Lock()
+
+_youtube_clients = {}
+_youtube_clients_lock = threading.Lock()
+
+_transcript_apis = {}
+_transcript_apis_lock = threading.Lock()
+
+class _HttpPool:
+    """Lends an idle httplib2.Http to each request made through a shared discovery client.
+
+    httplib2 connections aren't thread-safe, so concurrent requests never share
+    one; the pool only grows to the peak number of requests in flight and keeps
+    their keep-alive connections for the next run.
+    """
+
+    def __init__(self):
+        self.lock = threading.Lock()
+        self.idle = []
+
+    def request(self, *args, **kwargs):
+        with self.lock:
+            http = self.idle.pop() if self.idle else build_http()
+        try:
+            return http.request(*args, **kwargs)
+        finally:
+            with self.lock:
+                self.idle.append(http)
+
+
+class _TimeoutSession(requests.Session):
+    """requests.Session with a default timeout, since youtube_transcript_api passes none of its own."""
+
+    def __init__(self, timeout):
+        super().__init__()
+        self.timeout = timeout
+
+    def request(self, *args, **kwargs):
+        kwargs.setdefault("timeout", self.timeout)
+        return super().request(*args, **kwargs)
+
+
+def build_youtube(api_key):
+    # Every request made through this client is charged to the local quota ledger.
+    # YOUTUBE_API_ENDPOINT points the client at another server (e.g. the benchmark fake).
+    # The discovery document bundled with googleapiclient is used, so building never hits the network.
+    endpoint = os.environ.get("YOUTUBE_API_ENDPOINT")
+    client_options = {"api_endpoint": endpoint} if endpoint else None
+    youtube = build("youtube", "v3", developerKey=api_key, client_options=client_options, static_discovery=True,
+                    cache_discovery=False, http=_HttpPool())
+    return track(youtube, api_key)
+
+def get_youtube(api_key):
+    # One client per key for the whole process, shared by every thread, run and Streamlit session;
+    # its _HttpPool gives each in-flight request its own connection
+    key = (api_key, os.environ.get("YOUTUBE_API_ENDPOINT"))
+    with _youtube_clients_lock:
+        if key not in _youtube_clients:
+            _youtube_clients[key] = build_youtube(api_key)
+        return _youtube_clients[key]
+
+@traced("top_tags")
+def _search_top_tags(youtube, topic, max_results):
+    search_res = youtube.search().list(
+        q=topic,
+        part="snippet",
+        type="video",
+        order="viewCount",
+        maxResults=max_results
+    ).execute()
+    video_ids = [item["id"]["videoId"] for item in search_res["items"]]
+    if not video_ids:
+        return []
+    # One batched lookup for every result's tags instead of a videos().list per video
+    res = youtube.videos().list(
+        part="snippet",
+        id=",".join(video_ids),
+        maxResults=len(video_ids),
+        fields="items(snippet/tags)"
+    ).execute()
+    tags = [tag for item in res.get("items", []) for tag in item["snippet"].get("tags", [])]
+    tag_freq = pd.Series(tags, dtype="object").value_counts()
+    return tag_freq.index.tolist()[:20]
+
+def top_tags_for_topic(youtube_factory, topic, max_results=20):
+    # In-process LRU first, then the shared disk cache, and only then the 101-unit API lookup.
+    # youtube_factory is only called on a miss, so cached lookups never build a client.
+    key = make_key("top-tags-v1", topic.strip().lower(), max_results)
+    now = time.monotonic()
+    with _top_tags_lock:
+        hit = _top_tags_memo.get(key)
+        if hit and now - hit[0] < TOP_TAGS_TTL_SECONDS:
+            _top_tags_memo.move_to_end(key)
+            return list(hit[1])
+    disk = get_cache("top_tags", ttl_seconds=TOP_TAGS_TTL_SECONDS)
+    tags = disk.get(key)
+    if tags is None:
+        tags = _search_top_tags(youtube_factory(), topic, max_results)
+        disk.set(key, tags)
+    with _top_tags_lock:
+        _top_tags_memo[key] = (now, tags)
+        _top_tags_memo.move_to_end(key)
+        while len(_top_tags_memo) > TOP_TAGS_MEMO_SIZE:
+            _top_tags_memo.popitem(last=False)
+    return list(tags)
 
 def get_top_video_tags(api_key, topic, max_results=20):
     try:
-        youtube = build("youtube", "v3", developerKey=api_key)
-        search_res = youtube.search().list(
-            q=topic,
-            part="snippet",
-            type="video",
-            order="viewCount",
-            maxResults=max_results
-        ).execute()
-        video_ids = [item["id"]["videoId"] for item in search_res["items"]]
-        tags = []
-        for vid in video_ids:
-            res = youtube.videos().list(part="snippet", id=vid).execute()
-            if res["items"]:
-                tags.extend(res["items"][0]["snippet"].get("tags", []))
-        tag_freq = pd.Series(tags).value_counts()
-        return tag_freq.index.tolist()[:20]
+        return top_tags_for_topic(lambda: get_youtube(api_key), topic, max_results)
     except Exception:
         return []
 
-def get_video_info(youtube, video_id):
-    res = youtube.videos().list(part="snippet,statistics", id=video_id).execute()
-    if not res["items"]:
-        return {"video_id": video_id, "error": "Video not found or unavailable"}
-    item = res["items"][0]
-    return {
+@traced("topic_search")
+def _search_video_ids(youtube, topic, max_results):
+    search_res = youtube.search().list(
+        q=topic,
+        part="snippet",
+        type="video",
+        order="viewCount",
+        maxResults=max_results,
+        fields="items(id/videoId)"
+    ).execute()
+    return [item["id"]["videoId"] for item in search_res["items"]]
+
+def search_topics(api_key, topics, max_results, max_workers=DEFAULT_MAX_WORKERS, on_progress=None):
+    # Returns [(topic, video_ids, error), ...] in topic order; the workers share one pooled client
+    def search(topic):
+        try:
+            return topic, _search_video_ids(get_youtube(api_key), topic, max_results), None
+        except Exception as e:
+            return topic, [], str(e)
+
+    return run_in_pool(search, topics, max_workers=max_workers, on_progress=on_progress)
+
+def group_topic_results(topic_results):
+    # video_id -> [(topic, rank), ...], in first-seen order, so each video is fetched and processed once
+    grouped = {}
+    for topic, video_ids, _ in topic_results:
+        for rank, video_id in enumerate(video_ids, 1):
+            grouped.setdefault(video_id, []).append((topic, rank))
+    return grouped
+
+def _video_record(item, include_etag=False):
+    video_id = item["id"]
+    record = {
         "video_id": video_id,
         "title": item["snippet"]["title"],
         "description": item["snippet"]["description"],
@@ -41,15 +221,161 @@ def get_video_info(youtube, video_id):
         "published_date": item["snippet"]["publishedAt"],
         "url": f"https://www.youtube.com/watch?v={video_id}"
     }
+    if include_etag:
+        record["etag"] = item.get("etag")
+    return record
 
-def fetch_transcript(video_id):
+@traced("video_metadata")
+def get_videos_info(youtube, video_ids, chunk_size=50, include_etag=False):
+    # videos().list accepts up to 50 comma-joined IDs, so one call covers a whole chunk
+    unique_ids = list(dict.fromkeys(video_ids))
+    results = {}
+    for i in range(0, len(unique_ids), chunk_size):
+        chunk = unique_ids[i:i + chunk_size]
+        res = youtube.videos().list(
+            part="snippet,statistics",
+            id=",".join(chunk),
+            maxResults=len(chunk)
+        ).execute()
+        for item in res.get("items", []):
+            results[item["id"]] = _video_record(item, include_etag)
+        for vid in chunk:
+            if vid not in results:
+                results[vid] = {"video_id": vid, "error": "Video not found or unavailable"}
+    return results
+
+def get_video_info(youtube, video_id):
+    return get_videos_info(youtube, [video_id])[video_id]
+
+def get_upload_playlist(youtube, channel_id):
+    data = youtube.channels().list(part="contentDetails", id=channel_id).execute()
+    if not data.get("items"):
+        raise ValueError(f"No channel found for ID: {channel_id}")
+    return data["items"][0]["contentDetails"]["relatedPlaylists"]["uploads"]
+
+def _playlist_page(youtube, playlist_id, page_token):
+    res = youtube.playlistItems().list(
+        part="contentDetails,snippet",
+        playlistId=playlist_id,
+        maxResults=50,
+        pageToken=page_token
+    ).execute()
+    videos = [{
+        "video_id": item["contentDetails"]["videoId"],
+        "published_at": item["contentDetails"].get("videoPublishedAt") or item["snippet"]["publishedAt"]
+    } for item in res["items"]]
+    return videos, res.get("nextPageToken")
+
+def sync_channel(youtube, index, channel_id, min_videos=None):
+    # Uploads are listed newest first: page until the first already-indexed video, then only
+    # resume the older-history backfill if the index still holds fewer than min_videos.
+    state = index.get_state(channel_id)
+    playlist_id = state["playlist_id"] or get_upload_playlist(youtube, channel_id)
+    known = index.known_ids(channel_id)
+    complete = state["complete"]
+    backfill_token = state["backfill_token"]
+    pages = 0
+
+    new_videos = []
+    token = None
+    while True:
+        page, token = _playlist_page(youtube, playlist_id, token)
+        pages += 1
+        fresh = [v for v in page if v["video_id"] not in known]
+        new_videos.extend(fresh)
+        if len(fresh) < len(page) or not token:
+            break
+        if not known and min_videos and len(new_videos) >= min_videos:
+            break
+    index.add_videos(channel_id, new_videos)
+    if not known:
+        backfill_token = token
+        complete = not token
+
+    while not complete and (min_videos is None or index.count(channel_id) < min_videos):
+        page, backfill_token = _playlist_page(youtube, playlist_id, backfill_token)
+        pages += 1
+        index.add_videos(channel_id, page)
+        complete = not backfill_token
+
+    index.set_state(channel_id, playlist_id, complete, backfill_token)
+    return {"new_videos": len(new_videos), "pages": pages, "total": index.count(channel_id)}
+
+@traced("channel_videos")
+def get_channel_videos(youtube, channel_id, start_index, num_videos, index=None):
+    index = index or VideoIndex()
+    sync_channel(youtube, index, channel_id, min_videos=start_index + num_videos)
+    return index.list_videos(channel_id, offset=start_index, limit=num_videos)
+
+def get_indexed_videos_info(youtube, channel_id, video_ids, index=None):
+    # Same as get_videos_info, but remembers each video's etag and metadata in the channel index
+    index = index or VideoIndex()
+    infos = get_videos_info(youtube, video_ids, include_etag=True)
+    index.record_metadata(channel_id, infos.values())
+    for info in infos.values():
+        info.pop("etag", None)
+    return infos
+
+def estimate_channel_job(channel_id, start_index, num_videos, index=None):
+    index = index or VideoIndex()
+    state = index.get_state(channel_id)
+    return estimate_channel_export(start_index, num_videos, indexed_videos=index.count(channel_id),
+                                   synced=state["playlist_id"] is not None)
+
+def get_channel_batch_info(youtube, channel_id, start_index, num_videos, index=None):
+    index = index or VideoIndex()
+    selected_batch = get_channel_videos(youtube, channel_id, start_index, num_videos, index)
+    infos = get_indexed_videos_info(youtube, channel_id, [v["video_id"] for v in selected_batch], index)
+    return [infos[v["video_id"]] for v in selected_batch]
+
+def get_transcript_api(timeout=DEFAULT_TRANSCRIPT_TIMEOUT):
+    # One API object per timeout for the whole process; its session's connection pool is thread-safe
+    with _transcript_apis_lock:
+        if timeout not in _transcript_apis:
+            session = _TimeoutSession(timeout)
+            session.mount("https://", HTTPAdapter(pool_connections=4, pool_maxsize=TRANSCRIPT_POOL_SIZE))
+            _transcript_apis[timeout] = YouTubeTranscriptApi(http_client=session)
+        return _transcript_apis[timeout]
+
+@traced("transcript", video_id=lambda video_id, *args, **kwargs: video_id)
+def fetch_transcript_result(video_id, timeout=DEFAULT_TRANSCRIPT_TIMEOUT, retries=DEFAULT_TRANSCRIPT_RETRIES):
+    # Returns (status, text); network errors, timeouts and throttling are retried by the "transcripts" endpoint.
+    # timeout bounds each connect and read on the session, so a stalled fetch frees the caller's worker.
     try:
-        transcript = YouTubeTranscriptApi.get_transcript(video_id)
-        return " ".join([seg["text"] for seg in transcript])
-    except (TranscriptsDisabled, NoTranscriptFound):
-        return "Transcript not found"
+        transcript = resilient_call("transcripts", lambda: get_transcript_api(timeout).fetch(video_id), retries)
+        return TRANSCRIPT_OK, " ".join(snippet.text for snippet in transcript)
+    except TranscriptsDisabled:
+        return TRANSCRIPT_DISABLED, ""
+    except NoTranscriptFound:
+        return TRANSCRIPT_NOT_FOUND, ""
+    except requests.Timeout:
+        return TRANSCRIPT_TIMEOUT, ""
     except Exception:
-        return "Transcript not found"
+        return TRANSCRIPT_NETWORK_ERROR, ""
+
+def fetch_transcript(video_id):
+    status, text = fetch_transcript_result(video_id)
+    return text if status == TRANSCRIPT_OK else "Transcript not found"
+
+def add_transcript_summary(video, client, limiter=None, force_refresh=False):
+    # Adds transcript_summary for videos whose transcript was fetched; SEO falls back to metadata if summarizing fails
+    if client and video.get("transcript_status") == TRANSCRIPT_OK and video.get("transcript"):
+        try:
+            video["transcript_summary"] = summarize_transcript(client, video["transcript"], limiter, force_refresh)
+        except Exception:
+            video.pop("transcript_summary", None)
+    return video
+
+def fetch_transcripts(video_ids, max_workers=DEFAULT_TRANSCRIPT_WORKERS, timeout=DEFAULT_TRANSCRIPT_TIMEOUT,
+                      retries=DEFAULT_TRANSCRIPT_RETRIES, on_progress=None):
+    video_ids = list(dict.fromkeys(video_ids))
+    results = run_in_pool(
+        lambda vid: fetch_transcript_result(vid, timeout, retries),
+        video_ids,
+        max_workers=max_workers,
+        on_progress=on_progress
+    )
+    return dict(zip(video_ids, results))
 
 def extract_video_ids_from_urls(file):
     content = file.read().decode("utf-8")
@@ -61,85 +387,384 @@ def extract_video_ids_from_urls(file):
             ids.append(match.group(1))
     return ids
 
-def handle_youtube_batch(api_key, channel_id, start_index, num_videos, enable_seo, client, top_tags):
-    youtube = build("youtube", "v3", developerKey=api_key)
-    data = youtube.channels().list(part="contentDetails", id=channel_id).execute()
-    playlist_id = data["items"][0]["contentDetails"]["relatedPlaylists"]["uploads"]
-
-    # Fetch video IDs
-    videos = []
-    next_token = None
-    while len(videos) < start_index + num_videos:
-        res = youtube.playlistItems().list(
-            part="contentDetails,snippet",
-            playlistId=playlist_id,
-            maxResults=min(50, start_index + num_videos - len(videos)),
-            pageToken=next_token
-        ).execute()
-        for item in res["items"]:
-            videos.append({
-                "video_id": item["contentDetails"]["videoId"],
-                "published_at": item["contentDetails"].get("videoPublishedAt") or item["snippet"]["publishedAt"]
-            })
-        next_token = res.get("nextPageToken")
-        if not next_token:
-            break
+def process_videos(videos, client, top_tags, enable_seo=True, enable_transcript=True,
+                   max_workers=DEFAULT_MAX_WORKERS, force_refresh=False, checkpoint=None, on_progress=None,
+                   transcript_workers=DEFAULT_TRANSCRIPT_WORKERS, on_record=None, seo_batch_size=1, seo_outputs=None):
+    # Each video's transcript is fetched and summarized on the transcript pool first; finished videos are
+    # then packed into groups of seo_batch_size (summaries count against SEO_BATCH_MAX_CHARS) and one SEO
+    # request covers each group, with at most max_workers in flight. A video is journaled the moment it is
+    # done. seo_outputs holds answers already fetched through the Batch API; those videos skip the live
+    # request (and the transcript summary).
+    limiter = RateLimiter()
+    videos = list(videos)
+    live_seo = enable_seo and client
+    packer = SeoPacker(seo_batch_size)
+    finished = [0]
 
-    selected_batch = sorted(videos, key=lambda x: x["published_at"], reverse=True)[start_index:start_index + num_videos]
-    results = []
-    for v in selected_batch:
-        info = get_video_info(youtube, v["video_id"])
-        if enable_seo and client:
-            info["seo_output"] = generate_seo_tags(info, client, top_tags)
-        info["transcript"] = fetch_transcript(v["video_id"])
-        results.append(info)
-        time.sleep(5)
-    return results
+    def prepare(info):
+        # Returns (info, needs_live_seo)
+        if enable_transcript and "error" not in info:
+            info["transcript_status"], info["transcript"] = fetch_transcript_result(info["video_id"])
+        if "error" in info:
+            return info, False
+        if seo_outputs and info["video_id"] in seo_outputs:
+            info.update(seo_outputs[info["video_id"]])
+            remember_completion(seo_outputs[info["video_id"]], _seo_cache_fields(info, top_tags),
+                                response_format=SEO_RESPONSE_FORMAT)
+            return info, False
+        if live_seo and enable_transcript:
+            add_transcript_summary(info, client, limiter, force_refresh)
+        cached = None if force_refresh or not live_seo else cached_seo(info, top_tags)
+        if cached is not None:
+            info.update(cached)
+            return info, False
+        return info, live_seo
+
+    def seo(group):
+        outputs = generate_seo_tags_batch(group, client, top_tags, limiter, force_refresh)
+        for info, output in zip(group, outputs):
+            info.update(output)
+        return group
 
-def handle_youtube_single(api_key, video_id, enable_seo, client, top_tags):
-    youtube = build("youtube", "v3", developerKey=api_key)
+    def finish(info):
+        # Runs on the calling thread, so checkpoint and on_record see one record at a time
+        if checkpoint and "seo_error" not in info:
+            checkpoint.append(info)
+        if on_record:
+            # Streaming callers keep nothing once the record has been handed off
+            on_record(dict(info))
+            info.clear()
+        finished[0] += 1
+        if on_progress:
+            on_progress(finished[0], len(videos))
+
+    with ThreadPoolExecutor(max_workers=max(1, transcript_workers)) as prepare_pool, \
+            ThreadPoolExecutor(max_workers=max(1, int(max_workers))) as seo_pool:
+        preparing = {prepare_pool.submit(propagate(prepare), info) for info in videos}
+        pending = set(preparing)
+
+        def submit(group):
+            if group:
+                pending.add(seo_pool.submit(propagate(seo), group))
+
+        while pending:
+            done, pending = wait(pending, return_when=FIRST_COMPLETED)
+            for future in done:
+                if future not in preparing:
+                    for info in future.result():
+                        finish(info)
+                    continue
+                preparing.discard(future)
+                info, needs_seo = future.result()
+                if needs_seo:
+                    submit(packer.add(info))
+                else:
+                    finish(info)
+            if not preparing:
+                submit(packer.flush())
+    return [None] * len(videos) if on_record else videos
+
+def handle_youtube_batch(api_key, channel_id, start_index, num_videos, enable_seo, client, top_tags,
+                         max_workers=DEFAULT_MAX_WORKERS, force_refresh=False, enable_transcript=True, run_id=None,
+                         transcript_workers=DEFAULT_TRANSCRIPT_WORKERS, sink=None, on_progress=None,
+                         seo_batch_size=1, offline_seo=False, batch_poll_seconds=DEFAULT_POLL_SECONDS,
+                         on_batch_status=None):
+    youtube = get_youtube(api_key)
+    selected_batch = get_channel_videos(youtube, channel_id, start_index, num_videos)
+    return _process_ids(youtube, [v["video_id"] for v in selected_batch], enable_seo, client, top_tags,
+                        max_workers, force_refresh, enable_transcript, run_id, transcript_workers,
+                        channel_id=channel_id, sink=sink, on_progress=on_progress, seo_batch_size=seo_batch_size,
+                        offline_seo=offline_seo, batch_poll_seconds=batch_poll_seconds,
+                        on_batch_status=on_batch_status)
+
+def handle_youtube_single(api_key, video_id, enable_seo, client, top_tags, force_refresh=False,
+                          enable_transcript=True):
+    youtube = get_youtube(api_key)
     info = get_video_info(youtube, video_id)
-    if enable_seo and client:
-        info["seo_output"] = generate_seo_tags(info, client, top_tags)
-    info["transcript"] = fetch_transcript(video_id)
+    if enable_transcript and "error" not in info:
+        info["transcript_status"], info["transcript"] = fetch_transcript_result(video_id)
+    if enable_seo and client and "error" not in info:
+        add_transcript_summary(info, client, force_refresh=force_refresh)
+        info.update(generate_seo_tags(info, client, top_tags, force_refresh=force_refresh))
     return [info]
 
-def handle_youtube_urls(api_key, uploaded_file, enable_seo, client, top_tags):
-    youtube = build("youtube", "v3", developerKey=api_key)
+def handle_youtube_urls(api_key, uploaded_file, enable_seo, client, top_tags, max_workers=DEFAULT_MAX_WORKERS,
+                        force_refresh=False, enable_transcript=True, run_id=None,
+                        transcript_workers=DEFAULT_TRANSCRIPT_WORKERS, sink=None, on_progress=None,
+                        seo_batch_size=1, offline_seo=False, batch_poll_seconds=DEFAULT_POLL_SECONDS,
+                        on_batch_status=None):
     video_ids = extract_video_ids_from_urls(uploaded_file)
-    results = []
-    for vid in video_ids:
-        info = get_video_info(youtube, vid)
-        if enable_seo and client:
-            info["seo_output"] = generate_seo_tags(info, client, top_tags)
-        info["transcript"] = fetch_transcript(vid)
-        results.append(info)
-        time.sleep(5)
-    return results
+    return handle_youtube_ids(api_key, video_ids, enable_seo, client, top_tags, max_workers=max_workers,
+                              force_refresh=force_refresh, enable_transcript=enable_transcript, run_id=run_id,
+                              transcript_workers=transcript_workers, sink=sink, on_progress=on_progress,
+                              seo_batch_size=seo_batch_size, offline_seo=offline_seo,
+                              batch_poll_seconds=batch_poll_seconds, on_batch_status=on_batch_status)
 
-def generate_seo_tags(video, client, top_tags=None):
+def handle_youtube_ids(api_key, video_ids, enable_seo, client, top_tags, max_workers=DEFAULT_MAX_WORKERS,
+                       force_refresh=False, enable_transcript=True, run_id=None,
+                       transcript_workers=DEFAULT_TRANSCRIPT_WORKERS, sink=None, on_progress=None,
+                       seo_batch_size=1, offline_seo=False, batch_poll_seconds=DEFAULT_POLL_SECONDS,
+                       on_batch_status=None):
+    youtube = get_youtube(api_key)
+    return _process_ids(youtube, video_ids, enable_seo, client, top_tags,
+                        max_workers, force_refresh, enable_transcript, run_id, transcript_workers, sink=sink,
+                        on_progress=on_progress, seo_batch_size=seo_batch_size, offline_seo=offline_seo,
+                        batch_poll_seconds=batch_poll_seconds, on_batch_status=on_batch_status)
+
+def _process_ids(youtube, video_ids, enable_seo, client, top_tags, max_workers, force_refresh,
+                 enable_transcript, run_id, transcript_workers, channel_id=None, sink=None, window=500,
+                 on_progress=None, seo_batch_size=1, offline_seo=False, batch_poll_seconds=DEFAULT_POLL_SECONDS,
+                 on_batch_status=None):
+    # Without a sink, returns the records in input order. With a sink, records are written to it in
+    # input order as they finish, metadata is fetched one window at a time, and the row count is returned.
+    checkpoint = Checkpoint(run_id) if run_id else None
+    done_ids = checkpoint.completed_ids() if checkpoint else set()
+    positions = {}
+    for position, vid in enumerate(video_ids):
+        positions.setdefault(vid, []).append(position)
+    ordered = OrderedSink(sink) if sink else None
+    results = None if sink else [None] * len(video_ids)
+
+    def emit(record):
+        for position in positions[record["video_id"]]:
+            if ordered:
+                ordered.put(position, dict(record))
+            else:
+                results[position] = dict(record)
+
+    if checkpoint:
+        resumed = set()
+        for record in checkpoint.iter_records():
+            if record["video_id"] in positions and record["video_id"] not in resumed:
+                resumed.add(record["video_id"])
+                emit(record)
+
+    pending = [vid for vid in positions if vid not in done_ids]
+    seo_outputs = None
+    if offline_seo and enable_seo and client:
+        if not run_id:
+            raise ValueError("Offline (Batch API) SEO needs a run ID so the batch survives restarts")
+        seo_outputs = run_offline_seo(youtube, client, pending, top_tags, run_id, channel_id=channel_id,
+                                      force_refresh=force_refresh, window=window,
+                                      poll_seconds=batch_poll_seconds, on_status=on_batch_status)
+    for start in range(0, len(pending), window):
+        chunk = pending[start:start + window]
+        if channel_id:
+            infos = get_indexed_videos_info(youtube, channel_id, chunk)
+        else:
+            infos = get_videos_info(youtube, chunk)
+        # Progress counts across all windows, so it runs 0..len(pending) once
+        window_progress = None
+        if on_progress:
+            window_progress = lambda done, _, offset=start: on_progress(offset + done, len(pending))
+        process_videos([infos.pop(vid) for vid in chunk], client, top_tags, enable_seo, enable_transcript,
+                       max_workers=max_workers, force_refresh=force_refresh, checkpoint=checkpoint,
+                       transcript_workers=transcript_workers, on_record=emit, on_progress=window_progress,
+                       seo_batch_size=seo_batch_size, seo_outputs=seo_outputs)
+    return len(video_ids) if sink else results
+
+def _summary_line(video):
+    summary = video.get("transcript_summary")
+    return f"Transcript summary: {summary}\n" if summary else ""
+
+def _seo_prompt(video, top_tags):
     tags_string = ", ".join(top_tags) if top_tags else ""
-    prompt = f"""
+    return f"""
     You are an expert YouTube SEO optimizer. Given this video metadata:
 
     Title: {video['title']}
     Description: {video['description']}
     Tags: {video['tags']}
     Views: {video['views']}
-
+    {_summary_line(video)}
     Top trending tags: {tags_string}
 
     Generate:
     - A compelling SEO-optimized YouTube title (under 70 characters, with keywords early)
     - A 150-word keyword-rich video description (2 paragraphs max)
     - A list of 10 relevant SEO hashtags
-    - A list of 10 comma-separated long-tail keywords
+    - A list of 10 long-tail keywords
     """
+
+def _seo_cache_fields(video, top_tags):
+    return {
+        "template": SEO_PROMPT_VERSION,
+        "title": video["title"],
+        "description": video["description"],
+        "tags": video["tags"],
+        "transcript_summary": video.get("transcript_summary", ""),
+        "top_tags": top_tags or [],
+    }
+
+def _seo_cache_key(video, top_tags):
+    # Single, packed and Batch API answers all live under this per-video key, whatever the grouping
+    return completion_cache_key("gpt-4o", _seo_cache_fields(video, top_tags), response_format=SEO_RESPONSE_FORMAT)
+
+def cached_seo(video, top_tags=None):
+    return get_cache("llm").get(_seo_cache_key(video, top_tags))
+
+@traced("seo_offline_batch")
+def run_offline_seo(youtube, client, video_ids, top_tags, run_id, channel_id=None, force_refresh=False, window=500,
+                    poll_seconds=DEFAULT_POLL_SECONDS, on_status=None):
+    # Submits one Batch API request per uncached video, waits for the batch and returns {video_id: SEO columns}.
+    # Metadata is fetched here only to build prompts; the export pass fetches it again, one window at a time.
+    job = BatchJob(client, run_id, poll_seconds=poll_seconds, response_format=SEO_RESPONSE_FORMAT)
+    cache = get_cache("llm")
+    to_submit = job.unsubmitted(video_ids)
+
+    def requests():
+        for start in range(0, len(to_submit), window):
+            chunk = to_submit[start:start + window]
+            if channel_id:
+                infos = get_indexed_videos_info(youtube, channel_id, chunk)
+            else:
+                infos = get_videos_info(youtube, chunk)
+            for vid in chunk:
+                info = infos[vid]
+                if "error" in info:
+                    continue
+                if not force_refresh and cache.get(_seo_cache_key(info, top_tags)):
+                    continue
+                yield vid, _seo_prompt(info, top_tags)
+
+    job.submit(requests())
+    job.wait(on_status)
+    outputs = {}
+    for vid, content in job.outputs().items():
+        # Answers that don't validate are left out and regenerated live during the export
+        try:
+            outputs[vid] = parse_seo(content)
+        except ValueError:
+            continue
+    return outputs
+
+@traced("seo", video_id=lambda video, *args, **kwargs: video.get("video_id"))
+def generate_seo_tags(video, client, top_tags=None, limiter=None, force_refresh=False):
+    # Returns the seo_* columns, or {"seo_error": ...} if the request fails or the answer doesn't validate
     try:
-        response = client.chat.completions.create(
-            model="gpt-4o",
-            messages=[{"role": "user", "content": prompt}]
-        )
-        return response.choices[0].message.content
+        return cached_chat_completion(client, _seo_prompt(video, top_tags), _seo_cache_fields(video, top_tags),
+                                      model="gpt-4o", limiter=limiter, force_refresh=force_refresh,
+                                      parse=parse_seo, response_format=SEO_RESPONSE_FORMAT)
     except Exception as e:
-        return f"OpenAI Error: {e}"
+        return seo_error(e)
+
+class SeoPacker:
+    """Packs videos into SEO request groups as they become ready.
+
+    add() returns a group as soon as it holds batch_size videos, or the group
+    packed so far when the new video would take it past max_chars of
+    title/description/tags/transcript summary (the new video then starts the
+    next group); flush() returns whatever is left.
+    """
+
+    def __init__(self, batch_size, max_chars=SEO_BATCH_MAX_CHARS):
+        self.batch_size = batch_size
+        self.max_chars = max_chars
+        self.batch = []
+        self.size = 0
+
+    def add(self, video):
+        length = len(video.get("title", "")) + len(video.get("description", "")) + len(str(video.get("tags", ""))) \
+            + len(video.get("transcript_summary", ""))
+        if self.batch and self.size + length > self.max_chars:
+            full = self.flush()
+            self.batch, self.size = [video], length
+            return full
+        self.batch.append(video)
+        self.size += length
+        return self.flush() if len(self.batch) >= self.batch_size else None
+
+    def flush(self):
+        batch, self.batch, self.size = self.batch, [], 0
+        return batch
+
+
+def seo_batches(videos, batch_size, max_chars=SEO_BATCH_MAX_CHARS):
+    # Groups of at most batch_size videos, cut early once the packed text would pass max_chars
+    packer = SeoPacker(batch_size, max_chars)
+    batches = [batch for batch in map(packer.add, videos) if batch]
+    last = packer.flush()
+    return batches + [last] if last else batches
+
+def _seo_batch_prompt(videos, top_tags):
+    tags_string = ", ".join(top_tags) if top_tags else ""
+    payload = json.dumps([{
+        "video_id": video["video_id"],
+        "title": video["title"],
+        "description": video["description"],
+        "tags": video["tags"],
+        "views": video["views"],
+        **({"transcript_summary": video["transcript_summary"]} if video.get("transcript_summary") else {}),
+    } for video in videos], ensure_ascii=False)
+    return f"""
+    You are an expert YouTube SEO optimizer. For each video in the JSON list below, generate:
+    - A compelling SEO-optimized YouTube title (under 70 characters, with keywords early)
+    - A 150-word keyword-rich video description (2 paragraphs max)
+    - A list of 10 relevant SEO hashtags
+    - A list of 10 long-tail keywords
+
+    Top trending tags: {tags_string}
+
+    Return exactly one entry per video, with its video_id copied unchanged.
+
+    Videos:
+    {payload}
+    """
+
+def _parse_seo_batch(content, video_ids):
+    # Only well-formed entries for requested IDs are kept; the rest fall back to single requests
+    try:
+        items = json.loads(content)["videos"]
+    except (ValueError, KeyError, TypeError):
+        return {}
+    parsed = {}
+    for item in items if isinstance(items, list) else []:
+        if not isinstance(item, dict) or item.get("video_id") not in video_ids:
+            continue
+        try:
+            parsed[item["video_id"]] = parse_seo(item)
+        except ValueError:
+            continue
+    return parsed
+
+@traced("seo_batch")
+def generate_seo_tags_batch(videos, client, top_tags=None, limiter=None, force_refresh=False, fallback=None):
+    # Returns one dict of seo_* columns (or seo_error) per video, in order. Videos already cached under their
+    # per-video key (by any earlier single, packed or Batch API request) are skipped; the rest share one structured
+    # request, and any video the reply leaves out goes through fallback (a single-video request by default).
+    fallback = fallback or (lambda video: generate_seo_tags(video, client, top_tags, limiter, force_refresh))
+    cache = get_cache("llm")
+    keys = [_seo_cache_key(video, top_tags) for video in videos]
+    outputs = [None if force_refresh else cache.get(key) for key in keys]
+    pending = {}
+    for i, video in enumerate(videos):
+        if outputs[i] is None:
+            pending.setdefault(video["video_id"], []).append(i)
+
+    if len(pending) > 1:
+        try:
+            content = chat_completion(
+                client,
+                _seo_batch_prompt([videos[indexes[0]] for indexes in pending.values()], top_tags),
+                model="gpt-4o",
+                limiter=limiter,
+                completion_tokens=COMPLETION_TOKEN_ESTIMATE * len(pending),
+                response_format={
+                    "type": "json_schema",
+                    "json_schema": {"name": "seo_batch", "strict": True, "schema": SEO_BATCH_SCHEMA},
+                }
+            )
+            parsed = _parse_seo_batch(content, pending)
+        except Exception:
+            parsed = {}
+        for video_id, output in parsed.items():
+            cache.set(keys[pending[video_id][0]], output)
+            for i in pending[video_id]:
+                outputs[i] = output
+
+    for indexes in pending.values():
+        if outputs[indexes[0]] is None:
+            output = fallback(videos[indexes[0]])
+            for i in indexes:
+                outputs[i] = output
+    return outputs
@@ -0,0 +1 @@
+# yt_seo: headless runner for the YouTube SEO export pipeline in utils/
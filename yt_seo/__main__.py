@@ -0,0 +1,5 @@
+import sys
+
+from yt_seo.cli import main
+
+sys.exit(main())
@@ -0,0 +1,186 @@
+# yt_seo/cli.py
+#
+# Usage:
+#   python -m yt_seo export --channel UC... --seo --transcripts --out videos.parquet
+#   python -m yt_seo export --urls-file urls.txt --shard 0/4 --out part0.csv
+
+import argparse
+import os
+import sys
+
+from utils.concurrency import DEFAULT_MAX_WORKERS
+from utils.openai_batch import DEFAULT_POLL_SECONDS
+from utils.export import StreamingExporter, TextPolicy
+from utils.llm import get_openai_client
+from utils.quota import DAILY_QUOTA, estimate_top_tags, estimate_units, estimate_video_ids, quota_summary
+from utils.resilience import endpoint_snapshots
+from utils.tracing import start_trace, stop_trace
+from utils.youtube_handler import (
+    DEFAULT_SEO_BATCH_SIZE,
+    DEFAULT_TRANSCRIPT_WORKERS,
+    estimate_channel_job,
+    extract_video_ids_from_urls,
+    get_channel_videos,
+    get_top_video_tags,
+    get_youtube,
+    handle_youtube_batch,
+    handle_youtube_ids,
+)
+
+
+def parse_shard(value):
+    try:
+        index, count = (int(part) for part in value.split("/"))
+    except ValueError:
+        raise argparse.ArgumentTypeError("shard must look like INDEX/COUNT, e.g. 0/4")
+    if count < 1 or not 0 <= index < count:
+        raise argparse.ArgumentTypeError("shard index must be in [0, COUNT)")
+    return index, count
+
+
+def build_parser():
+    parser = argparse.ArgumentParser(prog="yt-seo", description="YouTube SEO exporter without the Streamlit UI")
+    commands = parser.add_subparsers(dest="command", required=True)
+
+    export = commands.add_parser("export", help="Export video metadata, SEO suggestions and transcripts")
+    source = export.add_mutually_exclusive_group(required=True)
+    source.add_argument("--channel", help="Channel ID to export uploads from")
+    source.add_argument("--video", action="append", help="Video ID (repeatable)")
+    source.add_argument("--urls-file", help="Text/CSV file with one YouTube URL per line")
+    export.add_argument("--start", type=int, default=0, help="Offset into the channel's uploads, newest first")
+    export.add_argument("--count", type=int, default=500, help="Number of channel uploads to export")
+    export.add_argument("--shard", type=parse_shard, help="Only process every COUNT-th video starting at INDEX")
+    export.add_argument("--seo", action="store_true", help="Generate SEO suggestions with OpenAI")
+    export.add_argument("--seo-mode", choices=["online", "batch"], default="online",
+                        help="batch: submit SEO prompts through the OpenAI Batch API and wait (needs --run-id)")
+    export.add_argument("--batch-poll-seconds", type=float, default=DEFAULT_POLL_SECONDS,
+                        help="How often to check on submitted batches")
+    export.add_argument("--transcripts", action="store_true", help="Fetch transcripts")
+    export.add_argument("--topic", help="Topic used to collect top-ranking tags for the SEO prompt")
+    export.add_argument("--workers", type=int, default=DEFAULT_MAX_WORKERS, help="Max concurrent SEO requests")
+    export.add_argument("--seo-batch-size", type=int, default=DEFAULT_SEO_BATCH_SIZE,
+                        help="Videos packed into one SEO request (1 = one request per video)")
+    export.add_argument("--transcript-workers", type=int, default=DEFAULT_TRANSCRIPT_WORKERS,
+                        help="Max concurrent transcript fetches")
+    export.add_argument("--force-refresh", action="store_true", help="Ignore cached SEO outputs")
+    export.add_argument("--run-id", help="Journal finished videos under this ID; rerun with it to resume")
+    export.add_argument("--youtube-key", default=os.environ.get("YOUTUBE_API_KEY"),
+                        help="YouTube Data API key (default: $YOUTUBE_API_KEY)")
+    export.add_argument("--openai-key", default=os.environ.get("OPENAI_API_KEY"),
+                        help="OpenAI API key (default: $OPENAI_API_KEY)")
+    export.add_argument("--estimate-only", action="store_true", help="Print the estimated quota cost and exit")
+    export.add_argument("--ignore-quota", action="store_true",
+                        help="Run even if the estimate exceeds today's remaining quota")
+    export.add_argument("--out", required=True, help="Output file: .xlsx, .csv, .parquet or .jsonl")
+    export.add_argument("--text-policy", choices=["keep", "truncate", "offload"], default="keep",
+                        help="What to do with description/SEO/transcript cells longer than --max-text-chars")
+    export.add_argument("--max-text-chars", type=int, default=32767)
+    export.add_argument("--offload-dir", help="Directory for offloaded text (default: <out>_text/)")
+    export.add_argument("--trace", help="Write a Chrome trace (JSON) of every stage to this file")
+    export.add_argument("--timings", action="store_true", help="Print per-stage timings when the export finishes")
+    return parser
+
+
+def run_export(args):
+    if not args.youtube_key:
+        raise SystemExit("❌ YouTube API key required (--youtube-key or $YOUTUBE_API_KEY)")
+    client = get_openai_client(args.openai_key) if args.seo else None
+    if args.seo and not client:
+        raise SystemExit("❌ --seo needs an OpenAI API key (--openai-key or $OPENAI_API_KEY)")
+    if args.seo_mode == "batch" and not args.run_id:
+        raise SystemExit("❌ --seo-mode batch needs --run-id so the batch can be resumed")
+
+    options = dict(
+        max_workers=args.workers,
+        force_refresh=args.force_refresh,
+        enable_transcript=args.transcripts,
+        transcript_workers=args.transcript_workers,
+        run_id=args.run_id,
+        seo_batch_size=args.seo_batch_size,
+        offline_seo=args.seo_mode == "batch",
+        batch_poll_seconds=args.batch_poll_seconds,
+        on_batch_status=print_batch_status
+    )
+    video_ids = None
+    if args.video:
+        video_ids = args.video
+    elif args.urls_file:
+        with open(args.urls_file, "rb") as f:
+            video_ids = extract_video_ids_from_urls(f)
+    if video_ids is not None and args.shard:
+        index, count = args.shard
+        video_ids = video_ids[index::count]
+
+    if video_ids is None:
+        job_calls = estimate_channel_job(args.channel, args.start, args.count)
+        num_videos = args.count
+        if args.shard:
+            # Every shard lists the same uploads but only reads metadata for its own share of them
+            index, count = args.shard
+            num_videos = len(range(index, args.count, count))
+            job_calls = dict(job_calls, **estimate_video_ids(num_videos))
+    else:
+        num_videos = len(video_ids)
+        job_calls = estimate_video_ids(num_videos)
+    # Batch mode reads each video's metadata twice: once to build prompts, once for the export itself
+    prompt_calls = estimate_video_ids(num_videos) if args.seo and args.seo_mode == "batch" else {}
+    summary = quota_summary(args.youtube_key, estimate_units(job_calls, prompt_calls,
+                                                             estimate_top_tags() if args.topic else {}))
+    print(f"📊 Estimated quota: {summary['estimated']:,} units "
+          f"(used today: {summary['used_today']:,} / {DAILY_QUOTA:,})", file=sys.stderr)
+    if args.estimate_only:
+        return 0
+    if not summary["fits"] and not args.ignore_quota:
+        print(f"❌ Only {summary['remaining']:,} units remain today; split the job or pass --ignore-quota",
+              file=sys.stderr)
+        return 2
+    if video_ids is None and args.shard:
+        # Listed only now, so --estimate-only and an over-quota stop never spend units on it
+        index, count = args.shard
+        uploads = get_channel_videos(get_youtube(args.youtube_key), args.channel, args.start, args.count)
+        video_ids = [v["video_id"] for v in uploads][index::count]
+
+    tracer = start_trace(record_events=bool(args.trace)) if args.trace or args.timings else None
+    top_tags = get_top_video_tags(args.youtube_key, args.topic) if args.topic else []
+    offload_dir = args.offload_dir or os.path.splitext(args.out)[0] + "_text"
+    text_policy = TextPolicy(args.text_policy, args.max_text_chars,
+                             offload_dir=offload_dir if args.text_policy == "offload" else None)
+    with StreamingExporter.for_path(args.out, text_policy=text_policy) as exporter:
+        if video_ids is None:
+            handle_youtube_batch(args.youtube_key, args.channel, args.start, args.count,
+                                 args.seo, client, top_tags, sink=exporter, **options)
+        else:
+            handle_youtube_ids(args.youtube_key, video_ids, args.seo, client, top_tags, sink=exporter, **options)
+
+    print(f"✅ Exported {exporter.rows} videos to {args.out}", file=sys.stderr)
+    if tracer:
+        stop_trace()
+        print_timings(tracer)
+        if args.trace:
+            tracer.write_chrome_trace(args.trace)
+            print(f"⏱️ Trace written to {args.trace}", file=sys.stderr)
+    return 0
+
+
+def print_batch_status(batch):
+    counts = batch.request_counts
+    done = f" ({counts.completed + counts.failed}/{counts.total})" if counts else ""
+    print(f"⏳ Batch {batch.id}: {batch.status}{done}", file=sys.stderr)
+
+
+def print_timings(tracer):
+    print(f"{'stage':<16}{'calls':>8}{'errors':>8}{'total s':>10}{'p50 ms':>10}{'p99 ms':>10}", file=sys.stderr)
+    for row in tracer.summary():
+        print(f"{row['stage']:<16}{row['calls']:>8}{row['errors']:>8}{row['total_s']:>10.2f}"
+              f"{row['p50_ms']:>10.1f}{row['p99_ms']:>10.1f}", file=sys.stderr)
+    for endpoint in endpoint_snapshots():
+        print(f"{endpoint['endpoint']}: {endpoint['calls']} calls, {endpoint['retries']} retries, "
+              f"{endpoint['throttled']} throttled, {endpoint['failures']} failed, circuit {endpoint['state']}, "
+              f"concurrency limit {endpoint['limit']}", file=sys.stderr)
+
+
+def main(argv=None):
+    args = build_parser().parse_args(argv)
+    if args.command == "export":
+        return run_export(args)
+    return 1